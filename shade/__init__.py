@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import concurrent.futures
 import logging
 import warnings
 
@@ -24,6 +25,7 @@ from shade.exc import *  # noqa
 from shade.openstackcloud import OpenStackCloud
 from shade.operatorcloud import OperatorCloud
 from shade import _log
+from shade import _utils
 
 __version__ = pbr.version.VersionInfo('shade').version_string()
 
@@ -55,7 +57,8 @@ def simple_logging(debug=False, http_debug=False):
     log = _log.setup_logging('keystoneauth.identity.generic.base')
 
 
-def openstack_clouds(config=None, debug=False, cloud=None, strict=False):
+def openstack_clouds(
+        config=None, debug=False, cloud=None, strict=False, compact=False):
     if not config:
         config = os_client_config.OpenStackConfig()
     try:
@@ -65,6 +68,7 @@ def openstack_clouds(config=None, debug=False, cloud=None, strict=False):
                     cloud=f.name, debug=debug,
                     cloud_config=f,
                     strict=strict,
+                    compact=compact,
                     **f.config)
                 for f in config.get_all_clouds()
             ]
@@ -74,6 +78,7 @@ def openstack_clouds(config=None, debug=False, cloud=None, strict=False):
                     cloud=f.name, debug=debug,
                     cloud_config=f,
                     strict=strict,
+                    compact=compact,
                     **f.config)
                 for f in config.get_all_clouds()
                 if f.name == cloud
@@ -83,7 +88,42 @@ def openstack_clouds(config=None, debug=False, cloud=None, strict=False):
             "Invalid cloud configuration: {exc}".format(exc=str(e)))
 
 
-def openstack_cloud(config=None, strict=False, **kwargs):
+def warm_up_clouds(clouds, services=None, timeout=None):
+    """Warm up many clouds at once with :meth:`OpenStackCloud.warm_up`.
+
+    :param clouds: list of OpenStackCloud objects, such as the ones returned
+                   by :func:`openstack_clouds`.
+    :param services: (optional) list of service keys whose endpoints to
+                     look up in each cloud.
+    :param timeout: (optional) seconds to wait for all of the clouds.
+                    (Default None, wait forever)
+
+    :returns: a list of (cloud, exception) for each cloud that failed or
+              did not finish in time. These clouds can still be used, they
+              will just try again when they are.
+    """
+    failures = []
+    if not clouds:
+        return failures
+    # Daemon threads, so that a cloud that never finishes does not keep the
+    # process from exiting after the timeout
+    futures = [
+        _utils.daemon_future(cloud.warm_up, services=services)
+        for cloud in clouds]
+    done, not_done = concurrent.futures.wait(futures, timeout=timeout)
+    for cloud, future in zip(clouds, futures):
+        if future in not_done:
+            failures.append((cloud, OpenStackCloudTimeout(
+                "Timeout warming up {cloud}:{region} after {timeout}"
+                " seconds".format(
+                    cloud=cloud.name, region=cloud.region_name,
+                    timeout=timeout))))
+        elif future.exception() is not None:
+            failures.append((cloud, future.exception()))
+    return failures
+
+
+def openstack_cloud(config=None, strict=False, compact=False, **kwargs):
     if not config:
         config = os_client_config.OpenStackConfig()
     try:
@@ -91,10 +131,11 @@ def openstack_cloud(config=None, strict=False, **kwargs):
     except keystoneauth1.exceptions.auth_plugins.NoMatchingPlugin as e:
         raise OpenStackCloudException(
             "Invalid cloud configuration: {exc}".format(exc=str(e)))
-    return OpenStackCloud(cloud_config=cloud_config, strict=strict)
+    return OpenStackCloud(
+        cloud_config=cloud_config, strict=strict, compact=compact)
 
 
-def operator_cloud(config=None, strict=False, **kwargs):
+def operator_cloud(config=None, strict=False, compact=False, **kwargs):
     if 'interface' not in kwargs:
         kwargs['interface'] = 'admin'
     if not config:
@@ -104,4 +145,5 @@ def operator_cloud(config=None, strict=False, **kwargs):
     except keystoneauth1.exceptions.auth_plugins.NoMatchingPlugin as e:
         raise OpenStackCloudException(
             "Invalid cloud configuration: {exc}".format(exc=str(e)))
-    return OperatorCloud(cloud_config=cloud_config, strict=strict)
+    return OperatorCloud(
+        cloud_config=cloud_config, strict=strict, compact=compact)
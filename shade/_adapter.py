@@ -15,7 +15,12 @@
 ''' Wrapper around keystoneauth Session to wrap calls in TaskManager '''
 
 import functools
+import threading
+import time
+
 from keystoneauth1 import adapter
+from keystoneauth1 import session
+from requests.packages.urllib3 import connectionpool
 from six.moves import urllib
 
 from shade import exc
@@ -81,6 +86,71 @@ def extract_name(url):
     return [part for part in name_parts if part]
 
 
+class _TimedPoolMixin(object):
+    """Add up how long requests wait to get a connection from the pool."""
+
+    def __init__(self, *args, **kwargs):
+        super(_TimedPoolMixin, self).__init__(*args, **kwargs)
+        self.wait_time = 0.0
+        self._wait_time_lock = threading.Lock()
+
+    def _get_conn(self, timeout=None):
+        start = time.time()
+        try:
+            return super(_TimedPoolMixin, self)._get_conn(timeout=timeout)
+        finally:
+            with self._wait_time_lock:
+                self.wait_time += time.time() - start
+
+
+class _TimedHTTPConnectionPool(
+        _TimedPoolMixin, connectionpool.HTTPConnectionPool):
+    pass
+
+
+class _TimedHTTPSConnectionPool(
+        _TimedPoolMixin, connectionpool.HTTPSConnectionPool):
+    pass
+
+
+class PooledHTTPAdapter(session.TCPKeepAliveAdapter):
+    """A keep-alive transport adapter that can report on its pools.
+
+    requests keeps up to pool_maxsize connections open to each host.
+    Requests made beyond that either wait for a connection to be free, if
+    pool_block is True, or open a connection that is closed again after the
+    request.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+    def get_pool_stats(self):
+        """Return a dict of usage counters for each host, keyed by host:port.
+
+        Each value has the number of ``requests`` made, ``connections``
+        opened, how many requests ``reused`` a connection and the total
+        ``wait_time`` in seconds spent getting a connection from the pool.
+        """
+        stats = {}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = '{host}:{port}'.format(host=pool.host, port=pool.port)
+            stats[host] = dict(
+                requests=pool.num_requests,
+                connections=pool.num_connections,
+                reused=max(0, pool.num_requests - pool.num_connections),
+                wait_time=getattr(pool, 'wait_time', 0.0))
+        return stats
+
+
 class ShadeAdapter(adapter.Adapter):
 
     def __init__(self, shade_logger, manager, *args, **kwargs):
@@ -88,7 +158,7 @@ class ShadeAdapter(adapter.Adapter):
         self.shade_logger = shade_logger
         self.manager = manager
 
-    def _munch_response(self, response, result_key=None):
+    def _munch_response(self, response, result_key=None, raw=False):
         exc.raise_from_response(response)
 
         if not response.content:
@@ -104,6 +174,11 @@ class ShadeAdapter(adapter.Adapter):
         except Exception:
             return response
 
+        if raw:
+            # The caller asked for the decoded body exactly as the service
+            # sent it - no unwrapping and no conversion to Munch.
+            return result_json
+
         request_id = response.headers.get('x-openstack-request-id')
 
         if task_manager._is_listlike(result_json):
@@ -129,7 +204,8 @@ class ShadeAdapter(adapter.Adapter):
             return meta.obj_to_dict(result, request_id=request_id)
         return result
 
-    def request(self, url, method, run_async=False, *args, **kwargs):
+    def request(
+            self, url, method, run_async=False, raw=False, *args, **kwargs):
         name_parts = extract_name(url)
         name = '.'.join([self.service_type, method] + name_parts)
         class_name = "".join([
@@ -153,5 +229,10 @@ class ShadeAdapter(adapter.Adapter):
         response = self.manager.submit_task(RequestTask(**kwargs))
         if run_async:
             return response
+        elif kwargs.get('stream'):
+            # Looking at the content would read the whole body, which is
+            # what the caller asked us not to do.
+            exc.raise_from_response(response)
+            return response
         else:
-            return self._munch_response(response)
+            return self._munch_response(response, raw=raw)
@@ -0,0 +1,119 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+''' Hashes of local files that outlive the process that worked them out '''
+
+import contextlib
+import os
+import sqlite3
+import time
+
+from shade import _log
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def _stat_key(stat):
+    # st_mtime_ns is not there on python 2
+    mtime_ns = getattr(stat, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(stat.st_mtime * 1000000000)
+    return (stat.st_dev, stat.st_ino, stat.st_size, mtime_ns)
+
+
+class FileHashCache(object):
+    """md5 and sha256 of files, kept in a sqlite database.
+
+    Files are known by device, inode, size and modification time, so a file
+    that is changed, replaced or moved to another filesystem is hashed
+    again. sqlite does the locking, so any number of processes can share a
+    database. Only the max_entries most recently used files are kept.
+
+    The cache is only ever an optimization. Errors from the database are
+    logged and treated as a miss.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.log = _log.setup_logging('shade')
+        self._created = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # A connection per call keeps this usable from any thread
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                if not self._created:
+                    connection.execute(
+                        'CREATE TABLE IF NOT EXISTS hashes ('
+                        ' dev INTEGER, ino INTEGER, size INTEGER,'
+                        ' mtime_ns INTEGER, md5 TEXT, sha256 TEXT,'
+                        ' used REAL,'
+                        ' PRIMARY KEY (dev, ino, size, mtime_ns))')
+                    self._created = True
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, stat):
+        """Return (md5, sha256) for the file with this os.stat, or None."""
+        key = _stat_key(stat)
+        try:
+            with self._connect() as connection:
+                row = connection.execute(
+                    'SELECT md5, sha256 FROM hashes WHERE dev = ?'
+                    ' AND ino = ? AND size = ? AND mtime_ns = ?',
+                    key).fetchone()
+                if row is None:
+                    return None
+                connection.execute(
+                    'UPDATE hashes SET used = ? WHERE dev = ?'
+                    ' AND ino = ? AND size = ? AND mtime_ns = ?',
+                    (time.time(),) + key)
+        except sqlite3.Error:
+            self.log.debug(
+                "Could not read hash cache %(path)s",
+                {'path': self.path}, exc_info=True)
+            return None
+        return (row[0], row[1])
+
+    def set(self, stat, md5, sha256):
+        """Remember the hashes of the file with this os.stat."""
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO hashes'
+                    ' (dev, ino, size, mtime_ns, md5, sha256, used)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    _stat_key(stat) + (md5, sha256, time.time()))
+                connection.execute(
+                    'DELETE FROM hashes WHERE rowid IN (SELECT rowid'
+                    ' FROM hashes ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,))
+        except sqlite3.Error:
+            self.log.debug(
+                "Could not write hash cache %(path)s",
+                {'path': self.path}, exc_info=True)
+
+    def get_file_hashes(self, filename, hash_func):
+        """Return (md5, sha256) of filename, calling hash_func on a miss."""
+        stat = os.stat(filename)
+        hashes = self.get(stat)
+        if hashes is not None:
+            return hashes
+        hashes = hash_func(filename)
+        # Don't keep hashes of a file that changed while being read
+        if _stat_key(os.stat(filename)) == _stat_key(stat):
+            self.set(stat, *hashes)
+        return hashes
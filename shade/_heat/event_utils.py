@@ -15,7 +15,9 @@
 import time
 
 from shade._heat import utils
-import heatclient.exc as exc
+from shade import _utils
+
+exc = _utils.LazyModule('heatclient.exc')
 
 
 def get_events(hc, stack_id, event_args, nested_depth=0,
@@ -12,6 +12,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+
+try:
+    from collections import abc as collections_abc
+except ImportError:
+    import collections as collections_abc
+
 import munch
 import six
 
@@ -62,6 +68,62 @@ _COMPUTE_LIMITS_FIELDS = (
 )
 
 
+_COMPACT_SERVER_FIELDS = _SERVER_FIELDS + (
+    'disk_config',
+    'flavor',
+    'has_config_drive',
+    'host_id',
+    'id',
+    'image',
+    'interface_ip',
+    'launched_at',
+    'location',
+    'name',
+    'power_state',
+    'progress',
+    'task_state',
+    'terminated_at',
+    'vm_state',
+    'volumes',
+)
+
+_COMPACT_IMAGE_FIELDS = _IMAGE_FIELDS + (
+    'created_at',
+    'is_protected',
+    'is_public',
+    'location',
+    'locations',
+    'min_disk',
+    'min_ram',
+    'size',
+    'status',
+    'tags',
+    'updated_at',
+    'visibility',
+)
+
+_COMPACT_PORT_FIELDS = (
+    'admin_state_up',
+    'device_id',
+    'device_owner',
+    'fixed_ips',
+    'id',
+    'mac_address',
+    'name',
+    'network_id',
+    'security_groups',
+    'status',
+    'tenant_id',
+)
+
+
+class _DELETED(object):
+    """Marks a passed-through key that was deleted from a compact resource.
+
+    This is a class rather than an instance so that it survives pickling.
+    """
+
+
 _pushdown_fields = {
     'project': [
         'domain'
@@ -115,6 +177,234 @@ def _pop_or_get(resource, key, default, strict):
         return resource.get(key, default)
 
 
+class CompactResource(collections_abc.MutableMapping):
+    """Memory-lean, dict-compatible stand-in for a normalized ``munch.Munch``.
+
+    Documented fields live in ``__slots__`` on the per-resource subclass.
+    Everything else from the remote payload stays in the dict it arrived in
+    and is only wrapped in a ``munch.Munch`` the first time ``properties`` is
+    looked at. When passthrough is on (non-strict mode), keys from that dict
+    are answered from it directly instead of being copied to the top level.
+
+    Keys and attributes can be read and written just like on a Munch. Use
+    ``toDict`` to get a plain dict, for instance before serializing to JSON.
+
+    It is a ``MutableMapping`` rather than a ``dict``, so ``isinstance(x,
+    dict)`` is False for it. Subclassing dict would not help: C code such
+    as ``json.dumps`` and ``**`` unpacking reads a dict's own storage, which
+    would be empty. Code in shade that tells a resource from a name or id
+    checks for ``(dict, CompactResource)`` instead.
+    """
+
+    __slots__ = ('_raw', '_extra', '_passthrough')
+
+    # Names of the documented fields stored in slots
+    _fields = ()
+    # Whether the remaining payload is exposed under a 'properties' key
+    _has_properties = True
+
+    def __init__(self, raw=None, passthrough=True, **fields):
+        object.__setattr__(self, '_raw', {} if raw is None else raw)
+        object.__setattr__(self, '_extra', None)
+        object.__setattr__(self, '_passthrough', passthrough)
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_munch(cls, resource, passthrough=True):
+        """Build a compact resource from a normalized Munch."""
+        resource = dict(resource)
+        raw = resource.pop('properties', {}) if cls._has_properties else {}
+        return cls(raw=raw, passthrough=passthrough, **resource)
+
+    @classmethod
+    def from_raw(cls, resource):
+        """Build a compact resource straight from a remote payload."""
+        raw = dict(resource)
+        ret = cls(raw=raw, passthrough=True)
+        for field in cls._fields:
+            if field in raw:
+                object.__setattr__(ret, field, raw.pop(field))
+        return ret
+
+    @property
+    def properties(self):
+        if not self._has_properties:
+            raise AttributeError('properties')
+        if not isinstance(self._raw, munch.Munch):
+            # Materialize once and keep it, so that changes made through
+            # properties are seen by passthrough lookups as well.
+            object.__setattr__(self, '_raw', munch.Munch(self._raw))
+        return self._raw
+
+    def _lookup(self, key):
+        if key in self._fields:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if key == 'properties' and self._has_properties:
+            return self.properties
+        if self._extra and key in self._extra:
+            value = self._extra[key]
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+        if self._passthrough and key in self._raw:
+            return self._raw[key]
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        return self._lookup(key)
+
+    def __setitem__(self, key, value):
+        if key in self._fields:
+            object.__setattr__(self, key, value)
+        elif key == 'properties' and self._has_properties:
+            object.__setattr__(self, '_raw', value)
+        else:
+            if self._extra is None:
+                object.__setattr__(self, '_extra', {})
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        # Make sure the key exists, raising KeyError otherwise
+        self._lookup(key)
+        if key in self._fields:
+            object.__delattr__(self, key)
+        elif key == 'properties' and self._has_properties:
+            raise KeyError(key)
+        elif self._passthrough and key in self._raw:
+            self[key] = _DELETED
+        else:
+            del self._extra[key]
+
+    def _keys(self):
+        for key in self._fields:
+            try:
+                object.__getattribute__(self, key)
+            except AttributeError:
+                continue
+            yield key
+        if self._has_properties:
+            yield 'properties'
+        seen = set()
+        if self._extra:
+            for key, value in self._extra.items():
+                seen.add(key)
+                if value is not _DELETED:
+                    yield key
+        if self._passthrough:
+            for key in self._raw:
+                if (key not in seen and key not in self._fields
+                        and key != 'properties'):
+                    yield key
+
+    def __iter__(self):
+        return self._keys()
+
+    def __len__(self):
+        return sum(1 for _ in self._keys())
+
+    def __contains__(self, key):
+        try:
+            self._lookup(key)
+        except KeyError:
+            return False
+        return True
+
+    def __getattr__(self, name):
+        # Only called when normal attribute lookup fails
+        if name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return self._lookup(name)
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name == 'properties':
+            self['properties'] = value
+        elif name in self.__slots__ or name in CompactResource.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            self[name] = value
+
+    def __getstate__(self):
+        fields = dict(
+            (key, object.__getattribute__(self, key))
+            for key in self._fields if hasattr(self, key))
+        return (fields, self._raw, self._extra, self._passthrough)
+
+    def __setstate__(self, state):
+        fields, raw, extra, passthrough = state
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_extra', extra)
+        object.__setattr__(self, '_passthrough', passthrough)
+        for key, value in fields.items():
+            object.__setattr__(self, key, value)
+
+    def __repr__(self):
+        return '{name}({data!r})'.format(
+            name=type(self).__name__, data=self.toDict())
+
+    def copy(self):
+        return munch.Munch(self.items())
+
+    def toDict(self):
+        """Return a plain, recursively unmunched, dict."""
+        return munch.unmunchify(dict(self.items()))
+
+
+class ServerResource(CompactResource):
+    __slots__ = _COMPACT_SERVER_FIELDS
+    _fields = frozenset(_COMPACT_SERVER_FIELDS)
+
+
+class ImageResource(CompactResource):
+    __slots__ = _COMPACT_IMAGE_FIELDS
+    _fields = frozenset(_COMPACT_IMAGE_FIELDS)
+
+
+class PortResource(CompactResource):
+    __slots__ = _COMPACT_PORT_FIELDS
+    _fields = frozenset(_COMPACT_PORT_FIELDS)
+    _has_properties = False
+
+
+class SharedMunch(munch.Munch):
+    """A read-only Munch that is shared between many resources.
+
+    Normalizing a list of resources gives every record the same location, so
+    the Normalizer hands out one interned instance per distinct location
+    instead of building a new one for each record. Writing to it would change
+    every resource at once, so it refuses modification; call ``copy()`` to
+    get a plain, modifiable ``munch.Munch``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(
+            "{name} is shared between resources, call copy() to get a"
+            " modifiable copy".format(name=self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __setattr__ = __delattr__ = _read_only
+    update = setdefault = pop = popitem = clear = _read_only
+
+    def __setstate__(self, state):
+        dict.update(self, state)
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def copy(self):
+        return munch.Munch(
+            (key, value.copy() if isinstance(value, SharedMunch) else value)
+            for key, value in self.items())
+
+
 class Normalizer(object):
     '''Mix-in class to provide the normalization functions.
 
@@ -122,6 +412,23 @@ class Normalizer(object):
     reasons.
     '''
 
+    def _get_current_location(self, project_id=None, zone=None):
+        # The returned location is interned and shared by every resource
+        # with the same project and zone, so it is read-only. Callers that
+        # need to change it must copy() it first.
+        key = (self.name, self.region_name, project_id, zone)
+        try:
+            return self._locations[key]
+        except KeyError:
+            pass
+        location = SharedMunch(
+            cloud=self.name,
+            region_name=self.region_name,
+            zone=zone,
+            project=self._get_project_info(project_id),
+        )
+        return self._locations.setdefault(key, location)
+
     def _normalize_compute_limits(self, limits, project_id=None):
         """ Normalize a limits object.
 
@@ -265,16 +572,30 @@ class Normalizer(object):
 
         # Backwards compat with glance
         if not self.strict_mode:
-            for key, val in properties.items():
-                new_image[key] = val
+            if not self.compact_mode:
+                for key, val in properties.items():
+                    new_image[key] = val
             new_image['protected'] = protected
             new_image['metadata'] = properties
             new_image['created'] = new_image['created_at']
             new_image['updated'] = new_image['updated_at']
             new_image['minDisk'] = new_image['min_disk']
             new_image['minRam'] = new_image['min_ram']
+        if self.compact_mode:
+            return ImageResource.from_munch(
+                new_image, passthrough=not self.strict_mode)
         return new_image
 
+    def _normalize_ports(self, ports):
+        """Normalize a list of port objects
+
+        Ports are passed through untouched unless compact mode is on, in
+        which case each one is turned into a ``PortResource``.
+        """
+        if not self.compact_mode:
+            return ports
+        return [PortResource.from_raw(port) for port in ports]
+
     def _normalize_secgroups(self, groups):
         """Normalize the structure of security groups
 
@@ -441,7 +762,11 @@ class Normalizer(object):
             ret[field] = server.pop(field, None)
         ret['interface_ip'] = ''
 
-        ret['properties'] = server.copy()
+        if self.compact_mode:
+            # server is already our own copy, no need for another one
+            ret['properties'] = server
+        else:
+            ret['properties'] = server.copy()
 
         # Backwards compat
         if not self.strict_mode:
@@ -452,8 +777,12 @@ class Normalizer(object):
             ret['region'] = self.region_name
             ret['cloud'] = self.name
             ret['az'] = az
-            for key, val in ret['properties'].items():
-                ret.setdefault(key, val)
+            if not self.compact_mode:
+                for key, val in ret['properties'].items():
+                    ret.setdefault(key, val)
+        if self.compact_mode:
+            return ServerResource.from_munch(
+                ret, passthrough=not self.strict_mode)
         return ret
 
     def _normalize_floating_ips(self, ips):
@@ -582,7 +911,7 @@ class Normalizer(object):
         is_enabled = project.pop('enabled', True)
 
         # Projects are global - strip region
-        location = self._get_current_location(project_id=project_id)
+        location = self._get_current_location(project_id=project_id).copy()
         location['region_name'] = None
 
         # v3 additions
@@ -773,3 +1102,52 @@ class Normalizer(object):
         usage.pop('request_ids', None)
 
         return munch.Munch(usage)
+
+
+class NormalizerContext(Normalizer):
+    """The cloud state the list normalizers need, in a picklable form.
+
+    Normalizing a very large listing can be sharded across worker processes.
+    A cloud object holds sessions, locks and clients and cannot be sent to
+    another process, so this carries just the cloud name, region, mode flags
+    and current project that ``_normalize_servers``, ``_normalize_images`` and
+    ``_normalize_volumes`` look at.
+    """
+
+    def __init__(self, name, region_name, strict_mode, compact_mode, project):
+        self.name = name
+        self.region_name = region_name
+        self.strict_mode = strict_mode
+        self.compact_mode = compact_mode
+        self.project = dict(project)
+        self._project_info = {}
+        self._locations = {}
+
+    def __getstate__(self):
+        # The interned objects are rebuilt on the other side
+        return (
+            self.name, self.region_name, self.strict_mode, self.compact_mode,
+            self.project)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def _get_project_info(self, project_id=None):
+        try:
+            return self._project_info[project_id]
+        except KeyError:
+            pass
+        if not project_id or project_id == self.project['id']:
+            project_info = SharedMunch(self.project)
+        else:
+            project_info = SharedMunch(
+                id=project_id, name=None, domain_id=None, domain_name=None)
+        return self._project_info.setdefault(project_id, project_info)
+
+
+def normalize_chunk(context, method, items):
+    """Run the list normalizer ``method`` of context over items.
+
+    This is the unit of work handed to a worker process.
+    """
+    return getattr(context, method)(items)
@@ -0,0 +1,151 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+''' Parallel download of objects and images in byte ranges '''
+
+import concurrent.futures
+import hashlib
+import threading
+
+from shade import exc
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RANGE_SIZE = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class RangesNotSupported(Exception):
+    """The server sent the whole body in answer to a ranged request."""
+
+
+def write_response(response, outfile, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write the body of a streamed response to outfile.
+
+    :returns: The md5 hexdigest of the body.
+    """
+    digest = hashlib.md5()
+    for chunk in response.iter_content(chunk_size, decode_unicode=False):
+        digest.update(chunk)
+        outfile.write(chunk)
+    return digest.hexdigest()
+
+
+class RangeDownloader(object):
+    """Download a large body in byte ranges, several at once.
+
+    The file is made its full size first and each range is written at its
+    own offset through a file handle of its own, so the ranges can arrive
+    in any order. The md5 of the file is worked out as it downloads: a
+    thread reads each range back, in order, as soon as it and all of the
+    ranges before it have been written, while they are still in the page
+    cache.
+    """
+
+    def __init__(
+            self, get, concurrency=DEFAULT_CONCURRENCY,
+            range_size=DEFAULT_RANGE_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Make a downloader.
+
+        :param get: Callable taking a dict of extra request headers that
+                    makes a streamed GET of the body and returns the
+                    response.
+        :param concurrency: Number of ranges to download at once.
+        :param range_size: Number of bytes to ask for in each request.
+        :param chunk_size: Number of bytes to read from the wire and buffer
+                           at one time for each range.
+        """
+        self.get = get
+        self.concurrency = max(1, int(concurrency))
+        self.range_size = int(range_size)
+        self.chunk_size = int(chunk_size)
+
+    def _fetch_range(self, path, start, end):
+        response = self.get(
+            {'Range': 'bytes={start}-{end}'.format(start=start, end=end)})
+        length = 0
+        try:
+            if response.status_code != 206:
+                raise RangesNotSupported()
+            with open(path, 'r+b') as outfile:
+                outfile.seek(start)
+                for chunk in response.iter_content(
+                        self.chunk_size, decode_unicode=False):
+                    outfile.write(chunk)
+                    length += len(chunk)
+        finally:
+            response.close()
+        if length != end - start + 1:
+            raise exc.OpenStackCloudException(
+                "Received {length} bytes for range {start}-{end}".format(
+                    length=length, start=start, end=end))
+
+    def _hash_ranges(self, path, ranges, written, failed, digest):
+        # Unbuffered, so that nothing read ahead of a range that has not
+        # been written yet is kept
+        with open(path, 'rb', 0) as infile:
+            for (start, end), range_written in zip(ranges, written):
+                range_written.wait()
+                if failed.is_set():
+                    return
+                infile.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = infile.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+
+    def download(self, path, size):
+        """Download the body, which is size bytes long, to the file at path.
+
+        :returns: The md5 hexdigest of the file.
+        :raises: RangesNotSupported if the server does not answer ranged
+                 requests with ranges.
+        """
+        ranges = [
+            (start, min(start + self.range_size, size) - 1)
+            for start in range(0, size, self.range_size)]
+        with open(path, 'wb') as outfile:
+            outfile.truncate(size)
+        written = [threading.Event() for byte_range in ranges]
+        failed = threading.Event()
+        digest = hashlib.md5()
+        hasher = threading.Thread(
+            target=self._hash_ranges,
+            args=(path, ranges, written, failed, digest))
+        hasher.daemon = True
+        hasher.start()
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(ranges)))
+        futures = {}
+        finished = False
+        try:
+            for index, (start, end) in enumerate(ranges):
+                future = executor.submit(self._fetch_range, path, start, end)
+                futures[future] = index
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                written[futures[future]].set()
+            finished = True
+        finally:
+            if not finished:
+                # Let the hashing thread give up
+                failed.set()
+                for range_written in written:
+                    range_written.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            hasher.join()
+        return digest.hexdigest()
@@ -0,0 +1,231 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+''' Parallel upload of the segments of a large object '''
+
+import concurrent.futures
+import hashlib
+import time
+
+import keystoneauth1.exceptions
+import six
+
+from shade import _log
+from shade import exc
+
+DEFAULT_CONCURRENCY = 10
+DEFAULT_ATTEMPTS = 3
+DEFAULT_BACKOFF = 1.0
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Streams are held in memory a segment at a time, so are cut smaller
+DEFAULT_STREAM_SEGMENT_SIZE = 64 * 1024 * 1024
+# Client errors that are worth trying again
+_RETRY_STATUS_CODES = (408, 429)
+
+
+def _is_retriable(e):
+    if isinstance(e, keystoneauth1.exceptions.RetriableConnectionFailure):
+        return True
+    if isinstance(e, exc.OpenStackCloudHTTPError):
+        response = getattr(e, 'response', None)
+        if response is None:
+            return True
+        return (response.status_code >= 500
+                or response.status_code in _RETRY_STATUS_CODES)
+    return False
+
+
+class SegmentUploader(object):
+    """Upload the segments of a large object in parallel.
+
+    The segments are uploaded by a pool of threads of its own, so how many
+    go at once does not depend on the TaskManager. Each segment only has
+    its file open while it is being sent, so no more than concurrency files
+    are open at once however many segments there are.
+
+    A segment that fails with a connection error, a server error or a
+    timeout or rate limit from the server is sent again, up to attempts
+    times in all. The first retry waits backoff seconds and each one after
+    that waits twice as long as the one before.
+    """
+
+    def __init__(
+            self, put, concurrency=DEFAULT_CONCURRENCY,
+            attempts=DEFAULT_ATTEMPTS, backoff=DEFAULT_BACKOFF):
+        """Make an uploader.
+
+        :param put: Callable taking a segment name and a FileSegment that
+                    uploads the segment and returns the response.
+        :param concurrency: Number of segments to upload at once.
+        :param attempts: Number of times to try each segment.
+        :param backoff: Seconds to wait before the first retry.
+        """
+        self.log = _log.setup_logging('shade')
+        self.put = put
+        self.concurrency = max(1, int(concurrency))
+        self.attempts = max(1, int(attempts))
+        self.backoff = backoff
+
+    def _upload_segment(self, name, segment):
+        attempt = 0
+        while True:
+            try:
+                segment.seek(0)
+                response = self.put(name, segment)
+                return response.headers.get('Etag')
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.attempts or not _is_retriable(e):
+                    raise
+                delay = self.backoff * 2 ** (attempt - 1)
+                self.log.debug(
+                    "Segment %(name)s failed, retrying in %(delay)s"
+                    " seconds: %(e)s",
+                    {'name': name, 'delay': delay, 'e': str(e)})
+                time.sleep(delay)
+            finally:
+                segment.close()
+
+    def upload(self, segments, done=None):
+        """Upload segments.
+
+        Segments are taken from segments only as there is room for them to
+        be uploaded, so at most concurrency of them are held at once. That
+        lets segments be cut from a stream as the stream is read.
+
+        :param segments: iterable of (name, segment) to upload, where
+                         segment is a file-like object such as a
+                         FileSegment or a BytesIO.
+        :param done: (optional) Callable called with the name, etag and
+                     segment of each segment as soon as it has been
+                     uploaded. It is called from the calling thread.
+
+        :returns: list of the etags of the segments, in the same order.
+        :raises: The exception of the first segment that could not be
+                 uploaded, once the segments that had already started are
+                 finished. No more segments are started after a failure.
+        """
+        etags = []
+        segments = iter(segments)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency)
+        running = {}
+        error = None
+        try:
+            while True:
+                while error is None and len(running) < self.concurrency:
+                    try:
+                        (name, segment) = next(segments)
+                    except StopIteration:
+                        break
+                    future = executor.submit(
+                        self._upload_segment, name, segment)
+                    running[future] = (len(etags), name, segment)
+                    etags.append(None)
+                if not running:
+                    break
+                (finished, unfinished) = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    (index, name, segment) = running.pop(future)
+                    try:
+                        etags[index] = future.result()
+                    except Exception as e:
+                        if error is None:
+                            error = e
+                        continue
+                    if done:
+                        done(name, etags[index], segment)
+        finally:
+            executor.shutdown(wait=True)
+        if error is not None:
+            raise error
+        return etags
+
+
+class BufferSegment(six.BytesIO):
+    """A segment of a stream, held in memory until it has been uploaded."""
+
+    def __init__(self, data):
+        six.BytesIO.__init__(self, data)
+        self.length = len(data)
+
+    def close(self):
+        # Keep the data, in case the segment has to be sent again
+        pass
+
+
+def _read_stream(data, chunk_size):
+    if isinstance(data, six.binary_type):
+        yield data
+    elif hasattr(data, 'read'):
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in data:
+            yield chunk
+
+
+class StreamSegments(object):
+    """Cut a stream of unknown length into segments as it is read.
+
+    Iterating over it reads the stream and yields bytes of segment_size,
+    apart from the last, which can be shorter. There is always at least
+    one, even if the stream is empty. Once it has all been read, md5,
+    sha256 and size are those of the whole stream.
+    """
+
+    def __init__(self, data, segment_size, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Get ready to read a stream.
+
+        :param data: Bytes, a file-like object opened in binary mode, or
+                     an iterable of bytes.
+        :param segment_size: Number of bytes in each segment.
+        :param chunk_size: Number of bytes to read from a file-like object
+                           at a time.
+        """
+        self.data = data
+        self.segment_size = int(segment_size)
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._digests = (hashlib.md5(), hashlib.sha256())
+
+    @property
+    def md5(self):
+        return self._digests[0].hexdigest()
+
+    @property
+    def sha256(self):
+        return self._digests[1].hexdigest()
+
+    def __iter__(self):
+        pieces = []
+        length = 0
+        for chunk in _read_stream(self.data, self.chunk_size):
+            for digest in self._digests:
+                digest.update(chunk)
+            self.size += len(chunk)
+            view = memoryview(chunk)
+            while len(view):
+                piece = view[:self.segment_size - length]
+                pieces.append(piece.tobytes())
+                length += len(piece)
+                view = view[len(piece):]
+                if length == self.segment_size:
+                    yield b''.join(pieces)
+                    pieces = []
+                    length = 0
+        if pieces or not self.size:
+            yield b''.join(pieces)
@@ -0,0 +1,136 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+''' Feed one stream of data to several consumers at once '''
+
+import concurrent.futures
+import hashlib
+import threading
+
+from six.moves import queue
+
+from shade import exc
+
+DEFAULT_BUFFER_CHUNKS = 64
+# How long to wait for room in a buffer before looking again at whether
+# its consumer has finished
+_PUT_INTERVAL = 0.1
+_END = object()
+
+
+class _Branch(object):
+    """The stream as one consumer sees it, an iterable of bytes."""
+
+    def __init__(self, buffer_chunks):
+        self.queue = queue.Queue(maxsize=buffer_chunks)
+        self.finished = threading.Event()
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def put(self, item):
+        while not self.finished.is_set():
+            try:
+                self.queue.put(item, timeout=_PUT_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+
+class StreamTee(object):
+    """Read a stream once and feed it to several consumers at once.
+
+    Each consumer runs in a thread of its own and reads the stream through
+    a buffer of buffer_chunks chunks, so no more than that is held for each
+    of them and the stream is read as fast as the slowest consumer takes
+    it. A consumer that returns without reading all of the stream is not
+    fed any more of it.
+
+    If md5 is given, the md5 of the stream is worked out as it is read. If
+    it does not match, the consumers get an exception where the end of the
+    stream would be, so that none of them finish with bad data.
+    """
+
+    def __init__(self, chunks, md5=None, buffer_chunks=DEFAULT_BUFFER_CHUNKS):
+        """Get ready to read a stream.
+
+        :param chunks: Iterable of the bytes of the stream.
+        :param md5: md5 hexdigest the stream should have, or None if it is
+                    not known.
+        :param buffer_chunks: Number of chunks to hold for each consumer.
+        """
+        self.chunks = chunks
+        self.md5 = md5
+        self.buffer_chunks = max(1, int(buffer_chunks))
+
+    def run(self, consumers):
+        """Read the stream and feed it to consumers.
+
+        :param consumers: list of callables, each taking an iterable of
+                          bytes.
+
+        :returns: list of the finished concurrent.futures.Future of each
+                  consumer, in the same order.
+        :raises: The exception that reading the stream raised, or
+                 OpenStackCloudException if it does not match md5, once the
+                 consumers have finished.
+        """
+        branches = [_Branch(self.buffer_chunks) for consumer in consumers]
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, len(consumers)))
+        futures = []
+        error = None
+        read = False
+        try:
+            for (consumer, branch) in zip(consumers, branches):
+                future = executor.submit(consumer, branch)
+                future.add_done_callback(
+                    lambda future, branch=branch: branch.finished.set())
+                futures.append(future)
+            digest = hashlib.md5()
+            for chunk in self.chunks:
+                if not chunk:
+                    continue
+                live = [
+                    branch for branch in branches
+                    if not branch.finished.is_set()]
+                if not live:
+                    break
+                digest.update(chunk)
+                for branch in live:
+                    branch.put(chunk)
+            else:
+                if self.md5 and digest.hexdigest() != self.md5:
+                    error = exc.OpenStackCloudException(
+                        "Stream has md5 {actual} rather than {md5}".format(
+                            actual=digest.hexdigest(), md5=self.md5))
+            read = True
+        except Exception as e:
+            error = e
+        finally:
+            end = error
+            if end is None:
+                # Don't let a consumer take a cut short stream for all of it
+                end = _END if read else exc.OpenStackCloudException(
+                    "Stream was not read to the end")
+            for branch in branches:
+                branch.put(end)
+            executor.shutdown(wait=True)
+        if error is not None:
+            raise error
+        return futures
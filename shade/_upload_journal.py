@@ -0,0 +1,121 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+''' Record of the segments of a large object upload that are done '''
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from shade import _hash_cache
+from shade import _log
+
+
+class UploadJournal(object):
+    """Segments of one large object upload that are known to be uploaded.
+
+    There is a file per upload in directory. The first line describes the
+    local file and each line after it is a segment that was uploaded, with
+    its etag. Lines are only ever appended, so a process that dies leaves
+    at worst a partial last line, which is ignored. If the local file has
+    changed since the journal was started it is not used.
+
+    With no directory nothing is kept, and the journal only marks that the
+    upload should be resumed from the segments found in the container.
+
+    Like the hash cache, the journal is only ever an optimization. Errors
+    writing it are logged and otherwise ignored.
+    """
+
+    def __init__(self, directory, endpoint, filename, segment_size):
+        self.directory = directory
+        self.log = _log.setup_logging('shade')
+        filename = os.path.abspath(filename)
+        self._header = dict(
+            endpoint=endpoint, filename=filename, segment_size=segment_size,
+            stat=list(_hash_cache._stat_key(os.stat(filename))))
+        self._lock = threading.Lock()
+        if directory:
+            key = hashlib.md5(json.dumps(
+                [endpoint, filename, segment_size]).encode('utf-8'))
+            self.path = os.path.join(
+                directory, 'upload-{key}.journal'.format(
+                    key=key.hexdigest()))
+        else:
+            self.path = None
+
+    def load(self):
+        """Return {segment name: etag} of the segments already uploaded."""
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r') as journal:
+                lines = journal.read().split('\n')
+        except (IOError, OSError):
+            return {}
+        try:
+            if json.loads(lines[0]) != self._header:
+                return {}
+        except ValueError:
+            return {}
+        segments = {}
+        # The last line is either empty or was not finished
+        for line in lines[1:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            segments[entry['name']] = entry['etag']
+        return segments
+
+    def start(self, segments):
+        """Start the journal over with {segment name: etag}."""
+        if not self.path:
+            return
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            (fd, temp_path) = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'w') as journal:
+                journal.write(json.dumps(self._header) + '\n')
+                for name in sorted(segments):
+                    journal.write(json.dumps(
+                        dict(name=name, etag=segments[name])) + '\n')
+            os.rename(temp_path, self.path)
+        except (IOError, OSError):
+            self.log.debug(
+                "Could not write upload journal %(path)s",
+                {'path': self.path}, exc_info=True)
+
+    def record(self, name, etag):
+        """Note that the segment called name has been uploaded."""
+        if not self.path:
+            return
+        line = json.dumps(dict(name=name, etag=etag)) + '\n'
+        try:
+            with self._lock:
+                with open(self.path, 'a') as journal:
+                    journal.write(line)
+        except (IOError, OSError):
+            self.log.debug(
+                "Could not write upload journal %(path)s",
+                {'path': self.path}, exc_info=True)
+
+    def remove(self):
+        if not self.path:
+            return
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
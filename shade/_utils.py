@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import concurrent.futures
 import contextlib
 import fnmatch
+import hashlib
+import importlib
 import inspect
 import jmespath
 import munch
@@ -21,11 +24,10 @@ import netifaces
 import re
 import six
 import sys
+import threading
 import time
 
 from decorator import decorator
-from heatclient import exc as heat_exc
-from neutronclient.common import exceptions as neutron_exc
 
 from shade import _log
 from shade import exc
@@ -33,6 +35,34 @@ from shade import meta
 
 _decorated_methods = []
 
+# Files are hashed in chunks of this size, with at most _HASH_QUEUE_DEPTH
+# chunks read ahead of each digest
+_HASH_CHUNK_SIZE = 1024 * 1024
+_HASH_QUEUE_DEPTH = 4
+
+
+class LazyModule(object):
+    """Stand in for a module that is imported when first used.
+
+    The python-*client libraries take a long time to import and most users
+    of shade only touch a few services, so modules such as their exceptions,
+    which are needed at the top level for except clauses, are only imported
+    once one of their attributes is looked up.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+heat_exc = LazyModule('heatclient.exc')
+neutron_exc = LazyModule('neutronclient.common.exceptions')
+
 
 def _exc_clear():
     """Because sys.exc_clear is gone in py3 and is not in six."""
@@ -76,6 +106,33 @@ def _iterate_timeout(timeout, message, wait=2):
     raise exc.OpenStackCloudTimeout(message)
 
 
+def daemon_future(func, *args, **kwargs):
+    """Call func in a daemon thread of its own.
+
+    Unlike the threads of a ThreadPoolExecutor, the thread does not hold
+    up the exit of the interpreter if the call never returns, so a caller
+    can give up on it after a timeout.
+
+    :returns: concurrent.futures.Future of the call.
+    """
+    future = concurrent.futures.Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
 def _filter_list(data, name_or_id, filters):
     """Filter a list by name/ID and arbitrary meta data.
 
@@ -196,15 +253,21 @@ def normalize_keystone_services(services):
     return meta.obj_list_to_dict(ret)
 
 
+_localhost_supports_ipv6 = None
+
+
 def localhost_supports_ipv6():
     """Determine whether the local host supports IPv6
 
     We look for a default route that supports the IPv6 address family,
     and assume that if it is present, this host has globally routable
-    IPv6 connectivity.
+    IPv6 connectivity. The routes are only looked at once per process.
     """
-
-    return netifaces.AF_INET6 in netifaces.gateways()['default']
+    global _localhost_supports_ipv6
+    if _localhost_supports_ipv6 is None:
+        _localhost_supports_ipv6 = (
+            netifaces.AF_INET6 in netifaces.gateways()['default'])
+    return _localhost_supports_ipv6
 
 
 def normalize_users(users):
@@ -622,27 +685,102 @@ def generate_patches_from_kwargs(operation, **kwargs):
     return patches
 
 
+def _update_digest(digest, chunks):
+    for chunk in iter(chunks.get, None):
+        digest.update(chunk)
+
+
+def hash_file(filename, chunk_size=_HASH_CHUNK_SIZE):
+    """Return the md5 and sha256 hexdigests of a file, reading it once.
+
+    hashlib lets go of the GIL while it hashes large buffers, so for files
+    of more than one chunk each digest is updated on its own thread while
+    the next chunk is read.
+    """
+    digests = (hashlib.md5(), hashlib.sha256())
+    with open(filename, 'rb') as file_obj:
+        chunk = file_obj.read(chunk_size)
+        if len(chunk) < chunk_size:
+            for digest in digests:
+                digest.update(chunk)
+            return tuple(digest.hexdigest() for digest in digests)
+
+        queues = [
+            six.moves.queue.Queue(maxsize=_HASH_QUEUE_DEPTH)
+            for digest in digests]
+        threads = [
+            threading.Thread(target=_update_digest, args=(digest, chunks))
+            for digest, chunks in zip(digests, queues)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            while chunk:
+                for chunks in queues:
+                    chunks.put(chunk)
+                chunk = file_obj.read(chunk_size)
+        finally:
+            for chunks in queues:
+                chunks.put(None)
+            for thread in threads:
+                thread.join()
+    return tuple(digest.hexdigest() for digest in digests)
+
+
+def segment_md5(segment, chunk_size=_HASH_CHUNK_SIZE):
+    """Return the md5 hexdigest of a FileSegment, as swift has for its etag.
+
+    The segment is left closed at its start, ready to be uploaded.
+    """
+    digest = hashlib.md5()
+    segment.seek(0)
+    try:
+        for chunk in iter(lambda: segment.read(chunk_size), b''):
+            digest.update(chunk)
+    finally:
+        segment.seek(0)
+        segment.close()
+    return digest.hexdigest()
+
+
 class FileSegment(object):
-    """File-like object to pass to requests."""
+    """File-like object to pass to requests.
+
+    The file is only opened when the segment is read, and can be closed
+    again between reads, so that a large file can be split into many
+    segments without holding a file descriptor for each of them.
+    """
 
     def __init__(self, filename, offset, length):
         self.filename = filename
         self.offset = offset
         self.length = length
         self.pos = 0
-        self._file = open(filename, 'rb')
-        self.seek(0)
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.filename, 'rb')
+            self._file.seek(self.offset + self.pos)
+        return self._file
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
     def tell(self):
-        return self._file.tell() - self.offset
+        return self.pos
 
     def seek(self, offset, whence=0):
         if whence == 0:
-            self._file.seek(self.offset + offset, whence)
+            self.pos = offset
         elif whence == 1:
-            self._file.seek(offset, whence)
+            self.pos += offset
         elif whence == 2:
-            self._file.seek(self.offset + self.length - offset, 0)
+            self.pos = self.length - offset
+        if self._file is not None:
+            self._file.seek(self.offset + self.pos)
 
     def read(self, size=-1):
         remaining = self.length - self.pos
@@ -650,10 +788,10 @@ class FileSegment(object):
             return b''
 
         to_read = remaining if size < 0 else min(size, remaining)
-        chunk = self._file.read(to_read)
+        chunk = self._open().read(to_read)
         self.pos += len(chunk)
 
         return chunk
 
     def reset(self):
-        self._file.seek(self.offset, 0)
+        self.seek(0)
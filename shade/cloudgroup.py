@@ -0,0 +1,184 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import concurrent.futures
+import functools
+
+from shade import _log
+from shade import _utils
+from shade import exc
+
+_MERGED_PREFIXES = ('list_', 'search_')
+_FIRST_PREFIXES = ('get_',)
+
+
+class GroupResult(list):
+    """The merged results of a call on a CloudGroup.
+
+    ``failures`` is a list of (cloud, exception) for each cloud that was
+    left out of the results of this call.
+    """
+
+    def __init__(self, results=(), failures=()):
+        super(GroupResult, self).__init__(results)
+        self.failures = list(failures)
+
+
+class CloudGroupFailure(exc.OpenStackCloudException):
+    """A call on a CloudGroup could not be answered.
+
+    ``failures`` is a list of (cloud, exception) for each cloud that
+    failed the call.
+    """
+
+    def __init__(self, message, failures):
+        super(CloudGroupFailure, self).__init__(message)
+        self.failures = failures
+
+
+class CloudGroup(object):
+    """Run the same query against many clouds at once.
+
+    Any ``list_*``, ``search_*`` or ``get_*`` method of the clouds can be
+    called on the group with the same arguments. The call is made on every
+    cloud concurrently. For ``list_*`` and ``search_*`` the results of all
+    of the clouds are returned in one list, in the order of the clouds, with
+    the ``location`` of each result telling which cloud it came from. For
+    ``get_*`` the first result that is not None is returned as soon as it
+    arrives, without waiting for the other clouds.
+
+    Clouds that raise an exception or do not answer within ``timeout`` are
+    left out of the results. They are listed as (cloud, exception) in the
+    ``failures`` of the :class:`GroupResult` that ``list_*`` and
+    ``search_*`` return. If every cloud fails, or a ``get_*`` finds nothing
+    while some clouds failed, :class:`CloudGroupFailure` is raised with
+    the ``failures``. Calls share nothing, so a group can be used from
+    many threads at once.
+
+    For example::
+
+        import shade
+        from shade import cloudgroup
+
+        group = cloudgroup.CloudGroup(shade.openstack_clouds(), timeout=30)
+        server = group.get_server('web1')
+        images = group.search_images('ubuntu*')
+    """
+
+    def __init__(self, clouds, timeout=None):
+        """Group some clouds.
+
+        :param clouds: list of OpenStackCloud objects, such as the ones
+                       returned by :func:`shade.openstack_clouds`.
+        :param timeout: (optional) seconds to wait for each cloud to answer
+                        a call. (Default None, wait forever)
+        """
+        self.log = _log.setup_logging('shade.cloudgroup')
+        self.clouds = list(clouds)
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        if name.startswith(_MERGED_PREFIXES):
+            collect = self._merge_results
+        elif name.startswith(_FIRST_PREFIXES):
+            collect = self._first_result
+        else:
+            raise AttributeError(name)
+        methods = [
+            getattr(cloud, name) for cloud in self.clouds
+            if hasattr(cloud, name)]
+        if not methods:
+            raise AttributeError(name)
+
+        @functools.wraps(methods[0])
+        def call(*args, **kwargs):
+            return collect(name, args, kwargs)
+        return call
+
+    def _cloud_failed(self, failures, cloud, e):
+        failures.append((cloud, e))
+        self.log.warning(
+            "Skipping %(cloud)s:%(region)s: %(e)s",
+            {'cloud': cloud.name, 'region': cloud.region_name, 'e': str(e)})
+
+    def _fan_out(self, name, args, kwargs, failures):
+        """Yield (cloud, index, result) for each cloud as soon as it answers.
+
+        The clouds that fail are added to failures. Raises
+        CloudGroupFailure if every cloud failed.
+        """
+        clouds = [cloud for cloud in self.clouds if hasattr(cloud, name)]
+        # Daemon threads, so that a cloud that never answers does not keep
+        # the process from exiting once it has been given up on
+        futures = dict(
+            (_utils.daemon_future(getattr(cloud, name), *args, **kwargs),
+             index)
+            for index, cloud in enumerate(clouds))
+        try:
+            for future in concurrent.futures.as_completed(
+                    futures, timeout=self.timeout):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self._cloud_failed(failures, clouds[index], e)
+                    continue
+                yield clouds[index], index, result
+        except concurrent.futures.TimeoutError:
+            for future, index in sorted(futures.items(), key=lambda f: f[1]):
+                if future.done():
+                    continue
+                cloud = clouds[index]
+                self._cloud_failed(failures, cloud, exc.OpenStackCloudTimeout(
+                    "Timeout waiting for {name} on {cloud}:{region}"
+                    " after {timeout} seconds".format(
+                        name=name, cloud=cloud.name,
+                        region=cloud.region_name, timeout=self.timeout)))
+        # In the order of the clouds, whatever order they failed in
+        failures.sort(key=lambda failure: clouds.index(failure[0]))
+        if len(failures) == len(clouds):
+            raise CloudGroupFailure(
+                "{name} failed on all {count} clouds: {e}".format(
+                    name=name, count=len(clouds), e=str(failures[0][1])),
+                failures)
+
+    def _merge_results(self, name, args, kwargs):
+        results = {}
+        failures = []
+        for cloud, index, result in self._fan_out(
+                name, args, kwargs, failures):
+            for item in result or []:
+                if hasattr(item, 'setdefault') and 'location' not in item:
+                    item['location'] = cloud.current_location
+            results[index] = result or []
+        merged = GroupResult(failures=failures)
+        # Keep the order of the clouds, whatever order they answered in
+        for index in sorted(results):
+            merged.extend(results[index])
+        return merged
+
+    def _first_result(self, name, args, kwargs):
+        failures = []
+        results = self._fan_out(name, args, kwargs, failures)
+        try:
+            for cloud, index, result in results:
+                if result is not None:
+                    return result
+        finally:
+            results.close()
+        if failures:
+            # It might have been on one of the clouds that failed
+            raise CloudGroupFailure(
+                "{name} found nothing, but {count} clouds failed: {e}".format(
+                    name=name, count=len(failures), e=str(failures[0][1])),
+                failures)
+        return None
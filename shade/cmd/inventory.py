@@ -22,20 +22,88 @@ import shade
 import shade.inventory
 
 
-def output_format_dict(data, use_yaml):
+def output_format_dict(data, use_yaml, compact=False):
     if use_yaml:
         return yaml.safe_dump(data, default_flow_style=False)
+    elif compact:
+        return json.dumps(data, sort_keys=True, separators=(',', ':'))
     else:
         return json.dumps(data, sort_keys=True, indent=2)
 
 
+def _indent(text, depth):
+    return text.replace('\n', '\n' + ' ' * depth)
+
+
+def write_json_inventory(out, hostvars, groups, compact=False):
+    """Write an Ansible inventory as JSON, one host at a time.
+
+    :param out: file to write to.
+    :param hostvars: iterable of (host name, host), which may fill in
+                     groups as it goes.
+    :param groups: dict of sets of host names, keyed by group name. It is
+                   only read once hostvars is exhausted.
+    :param compact: leave out all of the optional whitespace.
+    """
+    if compact:
+        newline, depth, separator = '', 0, ':'
+    else:
+        newline, depth, separator = '\n', 2, ': '
+
+    def dump(data, level):
+        return _indent(
+            output_format_dict(data, False, compact), depth * level)
+
+    def write_key(key, level):
+        out.write(newline + ' ' * depth * level + json.dumps(key) + separator)
+
+    out.write('{')
+    write_key('_meta', 1)
+    out.write('{')
+    write_key('hostvars', 2)
+    out.write('{')
+    empty = True
+    for host_name, host in hostvars:
+        if not empty:
+            out.write(',')
+        empty = False
+        write_key(host_name, 3)
+        out.write(dump(host, 3))
+    out.write('}' if empty else newline + ' ' * depth * 2 + '}')
+    out.write(newline + ' ' * depth + '}')
+    for group in sorted(groups):
+        out.write(',')
+        write_key(group, 1)
+        out.write(dump(sorted(groups[group]), 1))
+    out.write(newline + '}' + newline)
+
+
+def write_yaml_inventory(out, hostvars, groups):
+    """Write an Ansible inventory as YAML, one host at a time.
+
+    Takes the same arguments as :func:`write_json_inventory`.
+    """
+    out.write('_meta:\n  hostvars:')
+    empty = True
+    for host_name, host in hostvars:
+        if empty:
+            out.write('\n')
+        empty = False
+        out.write('    ' + _indent(
+            output_format_dict({host_name: host}, True), 4).rstrip(' '))
+    if empty:
+        out.write(' {}\n')
+    for group in sorted(groups):
+        out.write(output_format_dict({group: sorted(groups[group])}, True))
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description='OpenStack Inventory Module')
     parser.add_argument('--refresh', action='store_true',
                         help='Refresh cached information')
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('--list', action='store_true',
-                       help='List active servers')
+                       help='List active servers and their groups')
     group.add_argument('--host', help='List details about the specific host')
     parser.add_argument('--private', action='store_true', default=False,
                         help='Use private IPs for interface_ip')
@@ -43,6 +111,13 @@ def parse_args():
                         help='Return data for one cloud only')
     parser.add_argument('--yaml', action='store_true', default=False,
                         help='Output data in nicely readable yaml')
+    parser.add_argument('--compact', action='store_true', default=False,
+                        help='Output json without indentation')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Seconds to wait for the clouds to answer')
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help='Seconds to reuse the hosts of an earlier run'
+                             ' for (default 0, always ask the clouds)')
     parser.add_argument('--debug', action='store_true', default=False,
                         help='Enable debug output')
     return parser.parse_args()
@@ -54,12 +129,19 @@ def main():
         shade.simple_logging(debug=args.debug)
         inventory = shade.inventory.OpenStackInventory(
             refresh=args.refresh, private=args.private,
-            cloud=args.cloud)
+            cloud=args.cloud, timeout=args.timeout,
+            cache_ttl=args.cache_ttl)
         if args.list:
-            output = inventory.list_hosts()
+            groups = {}
+            hostvars = inventory.iter_ansible_hostvars(groups)
+            if args.yaml:
+                write_yaml_inventory(sys.stdout, hostvars, groups)
+            else:
+                write_json_inventory(
+                    sys.stdout, hostvars, groups, compact=args.compact)
         elif args.host:
             output = inventory.get_host(args.host)
-        print(output_format_dict(output, args.yaml))
+            print(output_format_dict(output, args.yaml, args.compact))
     except shade.OpenStackCloudException as e:
         sys.stderr.write(e.message + '\n')
         sys.exit(1)
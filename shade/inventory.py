@@ -12,12 +12,125 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import concurrent.futures
+import contextlib
 import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import munch
 import os_client_config
 
 import shade
+from shade import _log
 from shade import _utils
+from shade import meta
+
+# Width of the trailer line that holds the offset of the index
+_TRAILER_FORMAT = '{offset:020d}\n'
+_TRAILER_SIZE = 21
+
+
+class _HostCache(object):
+    """A file of hosts that can be looked up by id or name without parsing.
+
+    Each host is a line of JSON. They are followed by an index line that maps
+    ids and names to the byte offset of their host line, and by a fixed width
+    trailer holding the offset of the index line. The file is replaced with a
+    rename, so a reader that has it open always sees one consistent version.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold an exclusive lock while rebuilding the cache.
+
+        Other processes that find the cache stale wait for the one holding
+        the lock and use what it wrote, rather than all asking the clouds.
+        """
+        if fcntl is None:
+            yield
+            return
+        self._make_directory()
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def open(self):
+        """Return the open cache file and its index, or None if stale."""
+        try:
+            hosts_file = open(self.path, 'rb')
+        except (IOError, OSError):
+            return None
+        try:
+            hosts_file.seek(-_TRAILER_SIZE, os.SEEK_END)
+            hosts_file.seek(int(hosts_file.read(_TRAILER_SIZE)))
+            index = json.loads(hosts_file.readline().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            hosts_file.close()
+            return None
+        if time.time() - index['time'] >= self.ttl:
+            hosts_file.close()
+            return None
+        return hosts_file, index
+
+    def _make_directory(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Another process may have made it in the meantime
+                if not os.path.isdir(directory):
+                    raise
+        return directory
+
+    def write(self, hosts):
+        directory = self._make_directory()
+        ids = {}
+        names = {}
+        with tempfile.NamedTemporaryFile(
+                dir=directory, delete=False) as hosts_file:
+            for host in hosts:
+                offset = hosts_file.tell()
+                ids.setdefault(host.get('id'), []).append(offset)
+                names.setdefault(host.get('name'), []).append(offset)
+                hosts_file.write(
+                    json.dumps(host, sort_keys=True).encode('utf-8') + b'\n')
+            offset = hosts_file.tell()
+            index = dict(time=time.time(), ids=ids, names=names)
+            hosts_file.write(json.dumps(index).encode('utf-8') + b'\n')
+            hosts_file.write(
+                _TRAILER_FORMAT.format(offset=offset).encode('utf-8'))
+        os.rename(hosts_file.name, self.path)
+
+    @staticmethod
+    def read_host(hosts_file, offset):
+        hosts_file.seek(offset)
+        return munch.Munch.fromDict(
+            json.loads(hosts_file.readline().decode('utf-8')))
+
+    @classmethod
+    def iter_hosts(cls, hosts_file, index):
+        offsets = set()
+        for host_offsets in index['ids'].values():
+            offsets.update(host_offsets)
+        for offset in sorted(offsets):
+            yield cls.read_host(hosts_file, offset)
 
 
 class OpenStackInventory(object):
@@ -27,7 +140,23 @@ class OpenStackInventory(object):
 
     def __init__(
             self, config_files=None, refresh=False, private=False,
-            config_key=None, config_defaults=None, cloud=None):
+            config_key=None, config_defaults=None, cloud=None, timeout=None,
+            cache_ttl=0, cache_path=None):
+        """Set up the clouds to build an inventory from.
+
+        :param timeout: (optional) seconds to wait for the clouds to list
+                        their hosts. Clouds that have not answered by then
+                        are treated as failed. (Default None, wait forever)
+        :param cache_ttl: (optional) seconds to keep the hosts in a file,
+                          for later inventories to look them up in rather
+                          than ask the clouds. (Default 0, no cache file)
+        :param cache_path: (optional) directory for the cache file.
+                           (Default the os-client-config cache path)
+        """
+        self.log = _log.setup_logging('shade.inventory')
+        self.timeout = timeout
+        # (cloud, exception) for each cloud that failed the last listing
+        self.failures = []
         if config_files is None:
             config_files = []
         config = os_client_config.config.OpenStackConfig(
@@ -35,6 +164,11 @@ class OpenStackInventory(object):
         self.extra_config = config.get_extra_config(
             config_key, config_defaults)
 
+        # Different arguments give different hosts, so each combination
+        # gets its own cache file
+        cache_key = hashlib.md5(json.dumps(
+            [config_files, cloud, private]).encode('utf-8')).hexdigest()
+
         if cloud is None:
             self.clouds = [
                 shade.OpenStackCloud(cloud_config=cloud_config)
@@ -58,19 +192,171 @@ class OpenStackInventory(object):
             for cloud in self.clouds:
                 cloud._cache.invalidate()
 
+        self._host_caches = {}
+        if cache_ttl:
+            if cache_path is None:
+                cache_path = config.get_cache_path()
+            for expand in (True, False):
+                self._host_caches[expand] = _HostCache(
+                    os.path.join(cache_path, 'inventory-{key}-{expand}'.format(
+                        key=cache_key, expand=int(expand))),
+                    cache_ttl)
+        self._refresh = set(self._host_caches) if refresh else set()
+
+    def _cloud_failed(self, cloud, e, fail_on_cloud_config):
+        self.failures.append((cloud, e))
+        if fail_on_cloud_config:
+            raise e
+        # Don't fail on one particular cloud as others may work
+        self.log.warning(
+            "Skipping hosts of %(cloud)s:%(region)s: %(e)s",
+            {'cloud': cloud.name, 'region': cloud.region_name, 'e': str(e)})
+
+    def _iter_cloud_hosts(self, expand, fail_on_cloud_config):
+        """Yield (index, hosts) for each cloud as soon as it has listed them.
+
+        All of the clouds are asked at the same time, so the total time is
+        that of the slowest cloud rather than the sum of all of them.
+        """
+        self.failures = []
+        if not self.clouds:
+            return
+        # Daemon threads, so that a cloud that never answers does not keep
+        # the process from exiting once it has been given up on
+        futures = dict(
+            (_utils.daemon_future(cloud.list_servers, detailed=expand), index)
+            for index, cloud in enumerate(self.clouds))
+        pending = set(futures)
+        # Only the time spent waiting for the clouds counts towards the
+        # timeout, not the time the caller spends on the hosts
+        waited = 0.0
+        while pending:
+            remaining = None
+            if self.timeout is not None:
+                remaining = self.timeout - waited
+                if remaining <= 0:
+                    break
+            started = time.time()
+            (done, pending) = concurrent.futures.wait(
+                pending, timeout=remaining,
+                return_when=concurrent.futures.FIRST_COMPLETED)
+            waited += time.time() - started
+            for future in sorted(done, key=futures.get):
+                index = futures[future]
+                try:
+                    hosts = future.result()
+                except shade.OpenStackCloudException as e:
+                    self._cloud_failed(
+                        self.clouds[index], e, fail_on_cloud_config)
+                    continue
+                yield index, hosts
+        for future in sorted(pending, key=futures.get):
+            cloud = self.clouds[futures[future]]
+            self._cloud_failed(
+                cloud,
+                shade.OpenStackCloudTimeout(
+                    "Timeout waiting for the hosts of {cloud}:{region}"
+                    " after {timeout} seconds".format(
+                        cloud=cloud.name, region=cloud.region_name,
+                        timeout=self.timeout)),
+                fail_on_cloud_config)
+
+    def iter_hosts(
+            self, expand=True, fail_on_cloud_config=True, ordered=False):
+        """Yield the hosts of all clouds as each cloud finishes listing them.
+
+        Hosts come grouped by cloud, but the clouds come in the order they
+        answer in, unless ordered is True. Then they come in the order of
+        the clouds, each as soon as it and the clouds before it have
+        answered. If there is a cache file, the hosts are read from it one
+        at a time, in the order of the clouds.
+        """
+        if self._host_caches:
+            with self._open_host_cache(
+                    expand, fail_on_cloud_config) as (opened, hosts):
+                if opened:
+                    hosts = _HostCache.iter_hosts(*opened)
+                for host in hosts:
+                    yield host
+            return
+        cloud_hosts = self._iter_cloud_hosts(expand, fail_on_cloud_config)
+        if ordered:
+            cloud_hosts = self._in_cloud_order(cloud_hosts)
+        for index, hosts in cloud_hosts:
+            for host in hosts:
+                yield host
+
+    def _in_cloud_order(self, cloud_hosts):
+        """Yield the (index, hosts) of cloud_hosts in the order of the clouds.
+
+        The clouds that failed are skipped as soon as they have failed.
+        """
+        results = {}
+        next_index = 0
+        for index, hosts in cloud_hosts:
+            results[index] = hosts
+            failed = set(id(cloud) for (cloud, e) in self.failures)
+            while next_index < len(self.clouds):
+                if next_index in results:
+                    yield next_index, results.pop(next_index)
+                elif id(self.clouds[next_index]) not in failed:
+                    break
+                next_index += 1
+        for index in sorted(results):
+            yield index, results[index]
+
+    @contextlib.contextmanager
+    def _open_host_cache(self, expand, fail_on_cloud_config):
+        """Open the cache file for expand, rebuilding it if it is stale.
+
+        Yields ((hosts_file, index), None) when the cache could be used.
+        If a cloud failed while rebuilding it, the partial listing is not
+        cached and (None, hosts) is yielded instead. (None, None) means that
+        there is no cache.
+        """
+        cache = self._host_caches.get(expand)
+        if cache is None:
+            yield None, None
+            return
+        opened = None
+        if expand not in self._refresh:
+            opened = cache.open()
+        if opened is None:
+            with cache.lock():
+                # Whoever held the lock before us may just have rebuilt it
+                if expand not in self._refresh:
+                    opened = cache.open()
+                if opened is None:
+                    hosts = self._list_hosts(expand, fail_on_cloud_config)
+                    if self.failures:
+                        # Don't keep a partial inventory around
+                        yield None, hosts
+                        return
+                    cache.write(hosts)
+                    self._refresh.discard(expand)
+                    opened = cache.open()
+        if opened is None:
+            yield None, None
+            return
+        with opened[0]:
+            yield opened, None
+
     def list_hosts(self, expand=True, fail_on_cloud_config=True):
-        hostvars = []
+        with self._open_host_cache(
+                expand, fail_on_cloud_config) as (opened, hosts):
+            if opened:
+                return list(_HostCache.iter_hosts(*opened))
+        if hosts is None:
+            hosts = self._list_hosts(expand, fail_on_cloud_config)
+        return hosts
 
-        for cloud in self.clouds:
-            try:
-                # Cycle on servers
-                for server in cloud.list_servers(detailed=expand):
-                    hostvars.append(server)
-            except shade.OpenStackCloudException:
-                # Don't fail on one particular cloud as others may work
-                if fail_on_cloud_config:
-                    raise
+    def _list_hosts(self, expand, fail_on_cloud_config):
+        results = dict(self._iter_cloud_hosts(expand, fail_on_cloud_config))
 
+        hostvars = []
+        # Keep the order of the clouds, whatever order they answered in
+        for index in sorted(results):
+            hostvars.extend(results[index])
         return hostvars
 
     def search_hosts(self, name_or_id=None, filters=None, expand=True):
@@ -78,8 +364,68 @@ class OpenStackInventory(object):
         return _utils._filter_list(hosts, name_or_id, filters)
 
     def get_host(self, name_or_id, filters=None, expand=True):
+        if (self._host_caches and not filters
+                and not hasattr(name_or_id, 'id')
+                and not any(char in str(name_or_id) for char in '*?[')):
+            with self._open_host_cache(expand, True) as (opened, hosts):
+                if opened:
+                    return self._get_cached_host(name_or_id, *opened)
         if expand:
             func = self.search_hosts
         else:
             func = functools.partial(self.search_hosts, expand=False)
         return _utils._get_entity(func, name_or_id, filters)
+
+    def iter_ansible_hostvars(
+            self, groups, expand=True, fail_on_cloud_config=True):
+        """Yield (host name, host) for each host, as :meth:`iter_hosts` does.
+
+        Hosts are named by their name, or by their id when an earlier host
+        already had that name. The hosts come in the order of the clouds,
+        so which of the hosts of a name keeps it does not depend on which
+        cloud answered first. Each host name is added to the groups from
+        :func:`shade.meta.get_groups_from_server` as it is yielded.
+
+        :param groups: dict of sets of host names, keyed by group name.
+        """
+        clouds = dict(
+            ((cloud.name, cloud.region_name), cloud) for cloud in self.clouds)
+        names = set()
+        for host in self.iter_hosts(
+                expand=expand, fail_on_cloud_config=fail_on_cloud_config,
+                ordered=True):
+            if host['name'] in names:
+                host_name = host['id']
+            else:
+                host_name = host['name']
+                names.add(host_name)
+            cloud = clouds[
+                (host['location']['cloud'], host['location']['region_name'])]
+            for group in meta.get_groups_from_server(cloud, host, host):
+                groups.setdefault(group, set()).add(host_name)
+            yield host_name, host
+
+    def get_ansible_inventory(self, expand=True, fail_on_cloud_config=True):
+        """Return the hosts in the Ansible dynamic inventory format.
+
+        The variables of each host are in ``_meta.hostvars`` so Ansible does
+        not need to ask for each host. See :meth:`iter_ansible_hostvars` for
+        how hosts are named and grouped.
+        """
+        groups = {}
+        hostvars = dict(self.iter_ansible_hostvars(
+            groups, expand=expand, fail_on_cloud_config=fail_on_cloud_config))
+        inventory = dict(
+            (group, sorted(members)) for group, members in groups.items())
+        inventory['_meta'] = {'hostvars': hostvars}
+        return inventory
+
+    def _get_cached_host(self, name_or_id, hosts_file, index):
+        offsets = set(index['ids'].get(str(name_or_id), []))
+        offsets.update(index['names'].get(str(name_or_id), []))
+        if not offsets:
+            return None
+        if len(offsets) > 1:
+            raise shade.OpenStackCloudException(
+                "Multiple matches found for %s" % name_or_id)
+        return _HostCache.read_host(hosts_file, offsets.pop())
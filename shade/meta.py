@@ -13,17 +13,27 @@
 # limitations under the License.
 
 
+import inspect
+import logging
 import munch
 import ipaddress
 import six
 import socket
 
 from shade import _log
+from shade import _normalize
 from shade import exc
 
 
 NON_CALLABLES = (six.string_types, bool, dict, int, float, list, type(None))
 
+# Looked up once here rather than on every object we convert
+_request_id_log = _log.setup_logging('shade.request_ids')
+
+# Per-class cache of the class level attribute names obj_to_dict needs to
+# look at. See _get_attribute_plan.
+_attribute_plans = {}
+
 
 def find_nova_addresses(addresses, ext_tag=None, key_name=None, version=4):
 
@@ -331,7 +341,46 @@ def _make_address_dict(fip, port):
     return address
 
 
-def _get_supplemental_addresses(cloud, server):
+def _has_nova_floating_ip(server):
+    for network in server['addresses'].values():
+        for address in network:
+            if (address['version'] != 6
+                    and address.get('OS-EXT-IPS:type') == 'floating'):
+                return True
+    return False
+
+
+def _index_supplemental_resources(cloud, servers):
+    """List ports and floating IPs once for a whole list of servers.
+
+    _get_supplemental_addresses would otherwise search both for each server.
+    The ports are keyed by device_id and the floating IPs by port_id, which
+    are the filters those searches use.
+
+    :returns: A tuple of the two dicts. Both are empty if no server needs
+              them or if they could not be listed.
+    """
+    ports = {}
+    floating_ips = {}
+    if not any(
+            server.get('status') == 'ACTIVE'
+            and not _has_nova_floating_ip(server)
+            for server in servers):
+        return ports, floating_ips
+    if not cloud._has_floating_ips():
+        return ports, floating_ips
+    try:
+        for port in cloud.list_ports():
+            ports.setdefault(port.get('device_id'), []).append(port)
+        for fip in cloud.list_floating_ips():
+            floating_ips.setdefault(fip.get('port_id'), []).append(fip)
+    except exc.OpenStackCloudException:
+        # Same as failing to search them one server at a time
+        return {}, {}
+    return ports, floating_ips
+
+
+def _get_supplemental_addresses(cloud, server, ports=None, floating_ips=None):
     fixed_ip_mapping = {}
     for name, network in server['addresses'].items():
         for address in network:
@@ -345,10 +394,18 @@ def _get_supplemental_addresses(cloud, server):
         # Don't bother doing this before the server is active, it's a waste
         # of an API call while polling for a server to come up
         if cloud._has_floating_ips() and server['status'] == 'ACTIVE':
-            for port in cloud.search_ports(
-                    filters=dict(device_id=server['id'])):
-                for fip in cloud.search_floating_ips(
-                        filters=dict(port_id=port['id'])):
+            if ports is None:
+                server_ports = cloud.search_ports(
+                    filters=dict(device_id=server['id']))
+            else:
+                server_ports = ports.get(server['id'], [])
+            for port in server_ports:
+                if floating_ips is None:
+                    port_fips = cloud.search_floating_ips(
+                        filters=dict(port_id=port['id']))
+                else:
+                    port_fips = floating_ips.get(port['id'], [])
+                for fip in port_fips:
                         # This SHOULD return one and only one FIP - but doing
                         # it as a search/list lets the logic work regardless
                     if fip['fixed_ip_address'] not in fixed_ip_mapping:
@@ -371,7 +428,7 @@ def _get_supplemental_addresses(cloud, server):
     return server['addresses']
 
 
-def add_server_interfaces(cloud, server):
+def add_server_interfaces(cloud, server, ports=None, floating_ips=None):
     """Add network interface information to server.
 
     Query the cloud as necessary to add information to the server record
@@ -379,10 +436,16 @@ def add_server_interfaces(cloud, server):
 
     Ensures that public_v4, public_v6, private_v4, private_v6, interface_ip,
                  accessIPv4 and accessIPv6 are always set.
+
+    :param ports: (optional) ports keyed by device_id to use instead of
+                  searching the cloud for the ports of this server.
+    :param floating_ips: (optional) floating IPs keyed by port_id to use
+                         instead of searching the cloud for them.
     """
     # First, add an IP address. Set it to '' rather than None if it does
     # not exist to remain consistent with the pre-existing missing values
-    server['addresses'] = _get_supplemental_addresses(cloud, server)
+    server['addresses'] = _get_supplemental_addresses(
+        cloud, server, ports=ports, floating_ips=floating_ips)
     server['public_v4'] = get_server_external_ipv4(cloud, server) or ''
     server['public_v6'] = get_server_external_ipv6(server) or ''
     server['private_v4'] = get_server_private_ip(server, cloud) or ''
@@ -401,6 +464,20 @@ def add_server_interfaces(cloud, server):
     return server
 
 
+def add_server_list_interfaces(cloud, servers):
+    """Add network interface information to a list of servers.
+
+    Does the same as calling add_server_interfaces on each server, but lists
+    the ports and floating IPs needed to find floating addresses neutron
+    knows about once, rather than searching for them server by server.
+    """
+    ports, floating_ips = _index_supplemental_resources(cloud, servers)
+    return [
+        add_server_interfaces(
+            cloud, server, ports=ports, floating_ips=floating_ips)
+        for server in servers]
+
+
 def expand_server_security_groups(cloud, server):
     try:
         groups = cloud.list_server_security_groups(server)
@@ -457,6 +534,91 @@ def get_hostvars_from_server(cloud, server, mounts=None):
     return server_vars
 
 
+def _index_by_id_and_name(resources):
+    """Map each id and name to the resources that have it, in list order."""
+    index = {}
+    for resource in resources:
+        keys = set(
+            str(key) for key in (resource.get('id'), resource.get('name'))
+            if key)
+        for key in keys:
+            index.setdefault(key, []).append(resource)
+    return index
+
+
+def _is_glob(name_or_id):
+    return any(char in str(name_or_id) for char in '*?[')
+
+
+def get_hostvars_from_servers(cloud, servers):
+    """Expand additional server information for a list of servers.
+
+    The result is the same as calling get_hostvars_from_server on each
+    server. The difference is that flavors, images and volumes are listed
+    once and joined onto all of the servers by id, instead of being searched
+    again for every server. The per server security group requests are all
+    submitted before waiting on any of them.
+    """
+    servers = add_server_list_interfaces(cloud, servers)
+    if not servers:
+        return servers
+
+    flavors = _index_by_id_and_name(cloud.list_flavors(get_extra=False))
+    security_groups = cloud._list_servers_security_groups(servers)
+
+    images = None
+    volumes = None
+    if cloud.has_service('volume'):
+        volumes = {}
+        try:
+            for volume in cloud.list_volumes():
+                for attach in volume['attachments']:
+                    volumes.setdefault(attach['server_id'], []).append(volume)
+        except exc.OpenStackCloudException:
+            pass
+
+    for server in servers:
+        flavor_id = server['flavor']['id']
+        if _is_glob(flavor_id):
+            flavor_name = cloud.get_flavor_name(flavor_id)
+        else:
+            matches = flavors.get(str(flavor_id), [])
+            if len(matches) > 1:
+                raise exc.OpenStackCloudException(
+                    "Multiple matches found for %s" % flavor_id)
+            flavor_name = matches[0]['name'] if matches else None
+        if flavor_name:
+            server['flavor']['name'] = flavor_name
+
+        server['security_groups'] = security_groups[server['id']]
+
+        # OpenStack can return image as a string when you've booted from volume
+        if str(server['image']) == server['image']:
+            image_id = server['image']
+            server['image'] = dict(id=image_id)
+        else:
+            image_id = server['image'].get('id', None)
+        if image_id:
+            if _is_glob(image_id):
+                image_name = cloud.get_image_name(image_id)
+            else:
+                if images is None:
+                    images = _index_by_id_and_name(cloud.list_images())
+                matches = images.get(str(image_id))
+                image_name = matches[0]['name'] if matches else None
+            if image_name:
+                server['image']['name'] = image_name
+
+        server_volumes = []
+        for volume in (volumes or {}).get(server['id'], []):
+            # Make things easier to consume elsewhere
+            volume['device'] = volume['attachments'][0]['device']
+            server_volumes.append(volume)
+        server['volumes'] = server_volumes
+
+    return servers
+
+
 def _log_request_id(obj, request_id):
     # Add it, if passed in, even though we're going to pop in a second,
     # just to make the logic simpler
@@ -467,24 +629,64 @@ def _log_request_id(obj, request_id):
     request_ids = obj.pop('x_openstack_request_ids', None)
     if request_ids:
         request_id = request_ids[0]
-    if request_id:
+    if request_id and _request_id_log.isEnabledFor(logging.DEBUG):
         # Log the request id and object id in a specific logger. This way
         # someone can turn it on if they're interested in this kind of tracing.
-        log = _log.setup_logging('shade.request_ids')
         obj_id = None
         if isinstance(obj, dict):
             obj_id = obj.get('id', obj.get('uuid'))
         if obj_id:
-            log.debug("Retrieved object %(id)s. Request ID %(request_id)s",
-                      {'id': obj.get('id', obj.get('uuid')),
-                       'request_id': request_id})
+            _request_id_log.debug(
+                "Retrieved object %(id)s. Request ID %(request_id)s",
+                {'id': obj.get('id', obj.get('uuid')),
+                 'request_id': request_id})
         else:
-            log.debug("Retrieved a response. Request ID %(request_id)s",
-                      {'request_id': request_id})
+            _request_id_log.debug(
+                "Retrieved a response. Request ID %(request_id)s",
+                {'request_id': request_id})
 
     return obj
 
 
+def _get_attribute_plan(cls):
+    """Return the class level attribute names obj_to_dict should look at.
+
+    Scanning dir() of every object is expensive, and for a list of objects
+    of the same class it produces the same answer over and over. What can
+    vary per object is its instance __dict__, so that is still looked at
+    for every object, but the class level part only needs to be worked out
+    once. Methods are left out since their values are never data. Classes
+    that customize __dir__, and classes themselves being passed in as
+    objects, get None, meaning dir() has to be used.
+    """
+    try:
+        return _attribute_plans[cls]
+    except KeyError:
+        pass
+    if (issubclass(cls, type)
+            or getattr(cls, '__dir__', object.__dir__) is not object.__dir__):
+        plan = None
+    else:
+        plan = []
+        for key in dir(cls):
+            if key.startswith('_'):
+                continue
+            for klass in inspect.getmro(cls):
+                if key in klass.__dict__:
+                    value = klass.__dict__[key]
+                    break
+            else:
+                # Comes from a metaclass, which instances don't see
+                continue
+            if (inspect.isroutine(value)
+                    or isinstance(value, (classmethod, staticmethod))):
+                continue
+            plan.append(key)
+        plan = tuple(plan)
+    _attribute_plans[cls] = plan
+    return plan
+
+
 def obj_to_dict(obj, request_id=None):
     """ Turn an object with attributes into a dict suitable for serializing.
 
@@ -496,10 +698,15 @@ def obj_to_dict(obj, request_id=None):
     """
     if obj is None:
         return None
-    elif isinstance(obj, munch.Munch) or hasattr(obj, 'mock_add_spec'):
+    elif (isinstance(obj, (munch.Munch, _normalize.CompactResource))
+            or hasattr(obj, 'mock_add_spec')):
         # If we obj_to_dict twice, don't fail, just return the munch
         # Also, don't try to modify Mock objects - that way lies madness
         return obj
+    elif type(obj) is dict:
+        # Plain dicts, such as decoded JSON, have no data attributes to
+        # pick up, so skip the attribute scan entirely.
+        return _log_request_id(munch.Munch(obj), request_id)
     elif isinstance(obj, dict):
         # The new request-id tracking spec:
         # https://specs.openstack.org/openstack/nova-specs/specs/juno/approved/log-request-id-mappings.html
@@ -512,7 +719,17 @@ def obj_to_dict(obj, request_id=None):
     else:
         instance = munch.Munch()
 
-    for key in dir(obj):
+    plan = _get_attribute_plan(type(obj))
+    if plan is None:
+        keys = dir(obj)
+    else:
+        keys = set(plan)
+        keys.update(
+            key for key in getattr(obj, '__dict__', ())
+            if not key.startswith('_'))
+        keys = sorted(keys)
+
+    for key in keys:
         try:
             value = getattr(obj, key)
         # some attributes can be defined as a @propierty, so we can't assure
@@ -532,16 +749,12 @@ def obj_list_to_dict(obj_list, request_id=None):
     and in order to expose the data structures as JSON, we need to facilitate
     the conversion to lists of dictonaries.
     """
-    new_list = []
     if not request_id:
         request_id = getattr(obj_list, 'request_ids', [None])[0]
     if request_id:
-        log = _log.setup_logging('shade.request_ids')
-        log.debug("Retrieved a list. Request ID %(request_id)s",
-                  {'request_id': request_id})
-    for obj in obj_list:
-        new_list.append(obj_to_dict(obj))
-    return new_list
+        _request_id_log.debug("Retrieved a list. Request ID %(request_id)s",
+                              {'request_id': request_id})
+    return [obj_to_dict(obj) for obj in obj_list]
 
 
 def warlock_to_dict(obj):
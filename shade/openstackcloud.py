@@ -11,11 +11,13 @@
 # limitations under the License.
 
 import collections
+import concurrent.futures
 import functools
-import hashlib
 import ipaddress
+import itertools
 import json
 import jsonpatch
+import munch
 import operator
 import os
 import os_client_config
@@ -26,33 +28,34 @@ import time
 import warnings
 
 import dogpile.cache
-import munch
+import requests.adapters
 import requestsexceptions
 from six.moves import urllib
 
-import cinderclient.exceptions as cinder_exceptions
-import heatclient.client
-import magnumclient.exceptions as magnum_exceptions
-from heatclient import exc as heat_exceptions
 import keystoneauth1.exceptions
-import keystoneclient.client
-import magnumclient.client
-import neutronclient.neutron.client
-import novaclient.client
-import novaclient.exceptions as nova_exceptions
-import designateclient.client
 
 from shade.exc import *  # noqa
 from shade import _adapter
+from shade import _hash_cache
 from shade._heat import event_utils
 from shade._heat import template_utils
 from shade import _log
+from shade import _upload_journal
 from shade import _normalize
+from shade import _range_download
+from shade import _segment_uploader
+from shade import _stream_tee
 from shade import meta
 from shade import task_manager
 from shade import _tasks
 from shade import _utils
 
+# The client libraries are only imported when they are used
+cinder_exceptions = _utils.LazyModule('cinderclient.exceptions')
+heat_exceptions = _utils.LazyModule('heatclient.exc')
+magnum_exceptions = _utils.LazyModule('magnumclient.exceptions')
+nova_exceptions = _utils.LazyModule('novaclient.exceptions')
+
 OBJECT_MD5_KEY = 'x-object-meta-x-shade-md5'
 OBJECT_SHA256_KEY = 'x-object-meta-x-shade-sha256'
 IMAGE_MD5_KEY = 'owner_specified.shade.md5'
@@ -66,6 +69,11 @@ DEFAULT_MAX_FILE_SIZE = (5 * 1024 * 1024 * 1024 + 2) / 2
 DEFAULT_SERVER_AGE = 5
 DEFAULT_PORT_AGE = 5
 DEFAULT_FLOAT_AGE = 5
+# Below this many records, shipping a list to worker processes costs more
+# than normalizing it in place.
+DEFAULT_NORMALIZE_THRESHOLD = 2000
+# The bulk delete middleware's default when the cloud does not say
+DEFAULT_MAX_BULK_DELETES = 10000
 
 
 OBJECT_CONTAINER_ACLS = {
@@ -85,7 +93,7 @@ def _no_pending_volumes(volumes):
 def _no_pending_images(images):
     """If there are any images not in a steady state, don't cache"""
     for image in images:
-        if image.status not in ('active', 'deleted', 'killed'):
+        if image['status'] not in ('active', 'deleted', 'killed'):
             return False
     return True
 
@@ -124,6 +132,44 @@ class OpenStackCloud(_normalize.Normalizer):
                                       will enable that behavior.
     :param bool strict: Only return documented attributes for each resource
                         as per the shade Data Model contract. (Default False)
+    :param bool compact: Return servers, images and ports as memory-lean
+                         ``CompactResource`` objects instead of
+                         ``munch.Munch``. They behave like dicts, but are
+                         not ``dict`` instances, so check for
+                         ``collections.abc.Mapping`` rather than ``dict``,
+                         and call ``toDict()`` before handing them to a
+                         JSON or YAML serializer. (Default False)
+    :param int normalize_workers: Number of worker processes to normalize
+                                  very large server, image and volume lists
+                                  in. (Default 0, normalize in process)
+    :param int normalize_threshold: Lists with fewer records than this are
+                                    always normalized in process.
+                                    (Default 2000)
+    :param int pool_maxsize: Number of connections to keep open to each
+                             host. (Default the number of TaskManager
+                             workers plus the largest of the requests
+                             default of 10, upload_concurrency and
+                             download_concurrency)
+    :param bool pool_block: Wait for a pooled connection to be free rather
+                            than open one that is closed after the request.
+                            (Default False)
+    :param string hash_cache_path: Path of a sqlite database to keep the
+                                   md5 and sha256 of uploaded files in, so
+                                   that later processes need not hash them
+                                   again. (Default None, only keep them in
+                                   memory)
+    :param string upload_journal_dir: Directory to keep a record of the
+                                      segments uploaded by create_object
+                                      with resume=True in, so that a retry
+                                      need not list them. (Default None,
+                                      list the segments in the container)
+    :param int upload_concurrency: Number of segments of a large object to
+                                   upload, or of objects to delete when
+                                   there is no bulk delete, at once.
+                                   (Default 10)
+    :param int download_concurrency: Number of byte ranges of a large
+                                     object or image to download at once.
+                                     (Default 8)
     :param CloudConfig cloud_config: Cloud config object from os-client-config
                                      In the future, this will be the only way
                                      to pass in cloud configuration, but is
@@ -135,6 +181,15 @@ class OpenStackCloud(_normalize.Normalizer):
             cloud_config=None,
             manager=None, log_inner_exceptions=False,
             strict=False,
+            compact=False,
+            normalize_workers=0,
+            normalize_threshold=DEFAULT_NORMALIZE_THRESHOLD,
+            pool_maxsize=None,
+            pool_block=False,
+            hash_cache_path=None,
+            upload_journal_dir=None,
+            upload_concurrency=None,
+            download_concurrency=None,
             **kwargs):
 
         if log_inner_exceptions:
@@ -157,6 +212,11 @@ class OpenStackCloud(_normalize.Normalizer):
         self.secgroup_source = cloud_config.config['secgroup_source']
         self.force_ipv4 = cloud_config.force_ipv4
         self.strict_mode = strict
+        self.compact_mode = compact
+        self.normalize_workers = normalize_workers
+        self.normalize_threshold = normalize_threshold
+        self._normalize_pool = None
+        self._normalize_pool_lock = threading.Lock()
 
         if manager is not None:
             self.manager = manager
@@ -164,6 +224,33 @@ class OpenStackCloud(_normalize.Normalizer):
             self.manager = task_manager.TaskManager(
                 name=':'.join([self.name, self.region_name]), client=self)
 
+        if upload_concurrency is None:
+            upload_concurrency = cloud_config.config.get(
+                'upload_concurrency',
+                _segment_uploader.DEFAULT_CONCURRENCY)
+        self.upload_concurrency = int(upload_concurrency)
+        if download_concurrency is None:
+            download_concurrency = cloud_config.config.get(
+                'download_concurrency',
+                _range_download.DEFAULT_CONCURRENCY)
+        self.download_concurrency = int(download_concurrency)
+
+        if pool_maxsize is None:
+            pool_maxsize = cloud_config.config.get('pool_maxsize')
+        if pool_maxsize is None:
+            # Leave the usual room for the calling threads, or for the
+            # segment uploads or range downloads if there are more of them,
+            # on top of the connections that the TaskManager workers can
+            # hold at once
+            pool_maxsize = (
+                getattr(self.manager, 'workers', 0)
+                + max(requests.adapters.DEFAULT_POOLSIZE,
+                      self.upload_concurrency,
+                      self.download_concurrency))
+        self.pool_maxsize = int(pool_maxsize)
+        self.pool_block = pool_block
+        self._http_adapter = None
+
         # Provide better error message for people with stale OCC
         if cloud_config.set_session_constructor is None:
             raise OpenStackCloudException(
@@ -207,6 +294,9 @@ class OpenStackCloud(_normalize.Normalizer):
 
         self._disable_warnings = {}
 
+        self._project_info = {}
+        self._locations = {}
+
         self._servers = None
         self._servers_time = 0
         self._servers_lock = threading.Lock()
@@ -287,6 +377,20 @@ class OpenStackCloud(_normalize.Normalizer):
 
         self._container_cache = dict()
         self._file_hash_cache = dict()
+        # The image list the index was built from, and the index
+        self._image_checksum_index = (None, {})
+        if hash_cache_path is None:
+            hash_cache_path = cloud_config.config.get('hash_cache_path')
+        if hash_cache_path:
+            self._persistent_hash_cache = _hash_cache.FileHashCache(
+                os.path.expanduser(hash_cache_path))
+        else:
+            self._persistent_hash_cache = None
+        if upload_journal_dir is None:
+            upload_journal_dir = cloud_config.config.get('upload_journal_dir')
+        if upload_journal_dir:
+            upload_journal_dir = os.path.expanduser(upload_journal_dir)
+        self._upload_journal_dir = upload_journal_dir
 
         self._keystone_session = None
 
@@ -303,10 +407,43 @@ class OpenStackCloud(_normalize.Normalizer):
 
         self._raw_clients = {}
 
-        self._local_ipv6 = _utils.localhost_supports_ipv6()
+        # Looked up when first needed, see _local_ipv6
+        self._local_ipv6_value = None
 
         self.cloud_config = cloud_config
 
+    @property
+    def _local_ipv6(self):
+        if self._local_ipv6_value is None:
+            self._local_ipv6_value = _utils.localhost_supports_ipv6()
+        return self._local_ipv6_value
+
+    @_local_ipv6.setter
+    def _local_ipv6(self, value):
+        self._local_ipv6_value = value
+
+    def warm_up(self, services=None):
+        """Authenticate and find service endpoints before they are needed.
+
+        Nothing is sent to a cloud until it is first used, so the first call
+        also pays for authenticating and reading the catalog. Calling this
+        moves that cost to a time of the caller's choosing. See
+        :func:`shade.warm_up_clouds` to warm up many clouds at once.
+
+        :param services: (optional) list of service keys, such as
+                         ``compute``, whose endpoints to look up.
+
+        :raises: OpenStackCloudException if authenticating fails.
+        """
+        with _utils.shade_exceptions(
+                "Error authenticating to {cloud}:{region}".format(
+                    cloud=self.name, region=self.region_name)):
+            self.keystone_session.get_token()
+        for service_key in services or []:
+            self.has_service(service_key)
+        # Nothing to do with the cloud, but also slow the first time
+        _utils.localhost_supports_ipv6()
+
     def _make_cache(self, cache_class, expiration_time, arguments):
         return dogpile.cache.make_region(
             function_key_generator=self._make_cache_key
@@ -361,7 +498,7 @@ class OpenStackCloud(_normalize.Normalizer):
     def _get_raw_client(self, service_key):
         return _adapter.ShadeAdapter(
             manager=self.manager,
-            session=self.cloud_config.get_session(),
+            session=self.keystone_session,
             service_type=self.cloud_config.get_service_type(service_key),
             service_name=self.cloud_config.get_service_name(service_key),
             interface=self.cloud_config.get_interface(service_key),
@@ -543,6 +680,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
     @property
     def nova_client(self):
+        import novaclient.client
         if self._nova_client is None:
             self._nova_client = self._get_client(
                 'compute', novaclient.client.Client)
@@ -552,14 +690,35 @@ class OpenStackCloud(_normalize.Normalizer):
     def keystone_session(self):
         if self._keystone_session is None:
             try:
-                self._keystone_session = self.cloud_config.get_session()
+                keystone_session = self.cloud_config.get_session()
             except Exception as e:
                 raise OpenStackCloudException(
                     "Error authenticating to keystone: %s " % str(e))
+            self._mount_http_adapter(keystone_session)
+            self._keystone_session = keystone_session
         return self._keystone_session
 
+    def _mount_http_adapter(self, keystone_session):
+        self._http_adapter = _adapter.PooledHTTPAdapter(
+            pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        for scheme in ('https://', 'http://'):
+            keystone_session.session.mount(scheme, self._http_adapter)
+
+    def get_connection_pool_stats(self):
+        """Return how the HTTP connections to each host have been used.
+
+        :returns: dict keyed by host:port. Each value has the number of
+                  ``requests`` made, ``connections`` opened, how many
+                  requests ``reused`` an open connection and the
+                  ``wait_time`` in seconds spent waiting for one.
+        """
+        if self._http_adapter is None:
+            return {}
+        return self._http_adapter.get_pool_stats()
+
     @property
     def keystone_client(self):
+        import keystoneclient.client
         if self._keystone_client is None:
             self._keystone_client = self._get_client(
                 'identity', keystoneclient.client.Client)
@@ -593,10 +752,16 @@ class OpenStackCloud(_normalize.Normalizer):
     @property
     def current_project(self):
         """Return a ``munch.Munch`` describing the current project"""
-        return self._get_project_info()
+        return self._get_project_info().copy()
 
     def _get_project_info(self, project_id=None):
-        project_info = munch.Munch(
+        # Normalizing a listing asks for the same few projects over and over,
+        # and the answer cannot change for the life of this object.
+        try:
+            return self._project_info[project_id]
+        except KeyError:
+            pass
+        project_info = _normalize.SharedMunch(
             id=project_id,
             name=None,
             domain_id=None,
@@ -614,24 +779,63 @@ class OpenStackCloud(_normalize.Normalizer):
             # an object from a different project, so adding info from the
             # current token would be wrong.
             auth_args = self.cloud_config.config.get('auth', {})
-            project_info['id'] = self.current_project_id
-            project_info['name'] = auth_args.get('project_name')
-            project_info['domain_id'] = auth_args.get('project_domain_id')
-            project_info['domain_name'] = auth_args.get('project_domain_name')
+            project_info = _normalize.SharedMunch(
+                id=self.current_project_id,
+                name=auth_args.get('project_name'),
+                domain_id=auth_args.get('project_domain_id'),
+                domain_name=auth_args.get('project_domain_name'),
+            )
+        self._project_info[project_id] = project_info
         return project_info
 
     @property
     def current_location(self):
         """Return a ``munch.Munch`` explaining the current cloud location."""
-        return self._get_current_location()
-
-    def _get_current_location(self, project_id=None, zone=None):
-        return munch.Munch(
-            cloud=self.name,
-            region_name=self.region_name,
-            zone=zone,
-            project=self._get_project_info(project_id),
-        )
+        return self._get_current_location().copy()
+
+    def _normalize_list(self, method, items):
+        """Run the list normalizer ``method`` over items.
+
+        Large enough lists are split into chunks and normalized in a pool of
+        worker processes, so that the CPU bound work does not hold the GIL of
+        this one. If the pool cannot be used the list is normalized in process.
+        """
+        normalize = getattr(self, method)
+        if (not self.normalize_workers
+                or len(items) < self.normalize_threshold):
+            return normalize(items)
+
+        context = _normalize.NormalizerContext(
+            self.name, self.region_name, self.strict_mode, self.compact_mode,
+            self._get_project_info())
+        # A few chunks per worker evens out the load a little
+        chunk_count = self.normalize_workers * 4
+        chunk_size = -(-len(items) // chunk_count)
+        chunks = [
+            items[start:start + chunk_size]
+            for start in range(0, len(items), chunk_size)]
+        try:
+            results = list(self._normalize_executor.map(
+                _normalize.normalize_chunk,
+                [context] * len(chunks), [method] * len(chunks), chunks))
+        except Exception as e:
+            self.log.debug(
+                "Normalizing in worker processes failed, normalizing in"
+                " process instead: {e}".format(e=str(e)))
+            with self._normalize_pool_lock:
+                if self._normalize_pool is not None:
+                    self._normalize_pool.shutdown(wait=False)
+                    self._normalize_pool = None
+            return normalize(items)
+        return [item for chunk in results for item in chunk]
+
+    @property
+    def _normalize_executor(self):
+        with self._normalize_pool_lock:
+            if self._normalize_pool is None:
+                self._normalize_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.normalize_workers)
+            return self._normalize_pool
 
     @property
     def _project_manager(self):
@@ -1097,6 +1301,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
     @property
     def heat_client(self):
+        import heatclient.client
         if self._heat_client is None:
             self._heat_client = self._get_client(
                 'orchestration', heatclient.client.Client)
@@ -1198,6 +1403,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
     @property
     def magnum_client(self):
+        import magnumclient.client
         if self._magnum_client is None:
             # Workaround for os-client-config <=1.24.0 which thought of
             # this as container rather than container-infra (so did we all)
@@ -1212,6 +1418,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
     @property
     def neutron_client(self):
+        import neutronclient.neutron.client
         if self._neutron_client is None:
             self._neutron_client = self._get_client(
                 'network', neutronclient.neutron.client.Client)
@@ -1219,6 +1426,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
     @property
     def designate_client(self):
+        import designateclient.client
         if self._designate_client is None:
             self._designate_client = self._get_client(
                 'dns', designateclient.client.Client)
@@ -1680,13 +1888,47 @@ class OpenStackCloud(_normalize.Normalizer):
             return self.manager.submit_task(
                 _tasks.SubnetList(**filters))['subnets']
 
-    def list_ports(self, filters=None):
+    def _list_raw(self, client, endpoint, key, params=None, next_client=None):
+        """Page through a REST collection without converting the results.
+
+        Follows both the ``{key}_links`` next links that nova and neutron
+        return and the bare ``next`` link glance returns.
+
+        :param client: The REST client to issue the first request with.
+        :param endpoint: The collection endpoint.
+        :param key: The key in the response body holding the items.
+        :param params: (optional) query parameters for the first request.
+        :param next_client: (optional) client to follow next links with, if
+                            it differs from ``client``.
+        :returns: A list of the decoded JSON items, as the service sent them.
+        """
+        next_client = next_client or client
+        items = []
+        while endpoint:
+            data = client.get(endpoint, params=params, raw=True)
+            items.extend(data.get(key, []))
+            endpoint = data.get('next')
+            for link in data.get('{key}_links'.format(key=key), []):
+                if link.get('rel') == 'next':
+                    endpoint = link['href']
+            # Next links already carry the query string
+            client = next_client
+            params = None
+        return items
+
+    def list_ports(self, filters=None, raw=False):
         """List all available ports.
 
         :param filters: (optional) dict of filter conditions to push down
+        :param raw: (optional) return the port dicts exactly as neutron sent
+                    them, skipping the local cache and any conversion.
         :returns: A list of port ``munch.Munch``.
 
         """
+        if raw:
+            return self._list_raw(
+                self._network_client, '/ports.json', 'ports',
+                params=filters)
         # If pushdown filters are specified, bypass local caching.
         if filters:
             return self._list_ports(filters)
@@ -1712,8 +1954,8 @@ class OpenStackCloud(_normalize.Normalizer):
 
     def _list_ports(self, filters):
         with _utils.neutron_exceptions("Error fetching port list"):
-            return self.manager.submit_task(
-                _tasks.PortList(**filters))['ports']
+            return self._normalize_ports(self.manager.submit_task(
+                _tasks.PortList(**filters))['ports'])
 
     @_utils.cache_on_arguments(should_cache_fn=_no_pending_volumes)
     def list_volumes(self, cache=True):
@@ -1726,7 +1968,8 @@ class OpenStackCloud(_normalize.Normalizer):
             warnings.warn('cache argument to list_volumes is deprecated. Use '
                           'invalidate instead.')
         with _utils.shade_exceptions("Error fetching volume list"):
-            return self._normalize_volumes(
+            return self._normalize_list(
+                '_normalize_volumes',
                 self.manager.submit_task(_tasks.VolumeList()))
 
     @_utils.cache_on_arguments()
@@ -1796,6 +2039,48 @@ class OpenStackCloud(_normalize.Normalizer):
 
         return self._normalize_secgroups(groups)
 
+    def _list_servers_security_groups(self, servers):
+        """List the security groups of many servers at once.
+
+        There is still one request per server, but they are all submitted to
+        the task manager before waiting on any of them.
+
+        :returns: A dict mapping server id to a list of security group
+                  ``munch.Munch``. As with expand_server_security_groups, a
+                  server whose groups could not be listed gets an empty list.
+        """
+        if not self._has_secgroups():
+            return dict((server['id'], []) for server in servers)
+
+        groups = {}
+        pending = []
+        for server in servers:
+            task = _tasks.ServerListSecurityGroups(server=server['id'])
+            task.run_async = True
+            try:
+                pending.append((server['id'], self.manager.submit_task(task)))
+            except Exception as e:
+                self._log_server_security_groups_error(server['id'], e)
+                groups[server['id']] = []
+
+        for server_id, result in pending:
+            # Task managers that do not support run_async hand back the
+            # result directly
+            if isinstance(result, concurrent.futures.Future):
+                try:
+                    result = result.result()
+                except Exception as e:
+                    self._log_server_security_groups_error(server_id, e)
+                    groups[server_id] = []
+                    continue
+            groups[server_id] = self._normalize_secgroups(result)
+        return groups
+
+    def _log_server_security_groups_error(self, server_id, e):
+        self.log.debug(
+            "Error listing security groups of server {id}: {e}".format(
+                id=server_id, e=str(e)))
+
     def list_security_groups(self, filters=None):
         """List all available security groups.
 
@@ -1829,12 +2114,23 @@ class OpenStackCloud(_normalize.Normalizer):
                     _tasks.NovaSecurityGroupList(search_opts=filters))
         return self._normalize_secgroups(groups)
 
-    def list_servers(self, detailed=False):
+    def list_servers(self, detailed=False, raw=False):
         """List all available servers.
 
+        :param detailed: (optional) return full hostvars for each server.
+        :param raw: (optional) return the server dicts exactly as nova sent
+                    them, skipping the local cache, normalization and the
+                    interface lookups. ``detailed`` is ignored when set.
         :returns: A list of server ``munch.Munch``.
 
         """
+        if raw:
+            with _utils.shade_exceptions(
+                    "Error fetching server list on {cloud}:{region}:".format(
+                        cloud=self.name,
+                        region=self.region_name)):
+                return self._list_raw(
+                    self._compute_client, '/servers/detail', 'servers')
         if (time.time() - self._servers_time) >= self._SERVER_AGE:
             # Since we're using cached data anyway, we don't need to
             # have more than one thread actually submit the list
@@ -1858,19 +2154,14 @@ class OpenStackCloud(_normalize.Normalizer):
                 "Error fetching server list on {cloud}:{region}:".format(
                     cloud=self.name,
                     region=self.region_name)):
-            servers = self._normalize_servers(
+            servers = self._normalize_list(
+                '_normalize_servers',
                 self.manager.submit_task(_tasks.ServerList()))
 
             if detailed:
-                return [
-                    meta.get_hostvars_from_server(self, server)
-                    for server in servers
-                ]
+                return meta.get_hostvars_from_servers(self, servers)
             else:
-                return [
-                    meta.add_server_interfaces(self, server)
-                    for server in servers
-                ]
+                return meta.add_server_list_interfaces(self, servers)
 
     def list_server_groups(self):
         """List all available server groups.
@@ -1910,12 +2201,16 @@ class OpenStackCloud(_normalize.Normalizer):
         return self._normalize_compute_limits(limits, project_id=project_id)
 
     @_utils.cache_on_arguments(should_cache_fn=_no_pending_images)
-    def list_images(self, filter_deleted=True):
+    def list_images(self, filter_deleted=True, raw=False):
         """Get available glance images.
 
         :param filter_deleted: Control whether deleted images are returned.
+        :param raw: (optional) return the image dicts exactly as the image
+                    service sent them, without normalization.
         :returns: A list of glance images.
         """
+        if raw:
+            return self._list_raw_images(filter_deleted)
         # First, try to actually get images from glance, it's more efficient
         images = []
         image_list = []
@@ -1949,7 +2244,26 @@ class OpenStackCloud(_normalize.Normalizer):
                 images.append(image)
             elif image.status.lower() != 'deleted':
                 images.append(image)
-        return self._normalize_images(images)
+        return self._normalize_list('_normalize_images', images)
+
+    def _list_raw_images(self, filter_deleted):
+        if self.cloud_config.get_api_version('image') == '2':
+            endpoint = '/images'
+        else:
+            endpoint = '/images/detail'
+        try:
+            images = self._list_raw(
+                self._image_client, endpoint, 'images',
+                next_client=self._raw_image_client)
+        except keystoneauth1.exceptions.catalog.EndpointNotFound:
+            # We didn't have glance, let's try nova
+            images = self._list_raw(
+                self._compute_client, '/images/detail', 'images')
+        if not filter_deleted:
+            return images
+        return [
+            image for image in images
+            if image['status'].lower() != 'deleted']
 
     def list_floating_ip_pools(self):
         """List all available floating IP pools.
@@ -2576,7 +2890,7 @@ class OpenStackCloud(_normalize.Normalizer):
                  or if something else unforseen happens
         """
 
-        if not isinstance(server, dict):
+        if not isinstance(server, (dict, _normalize.CompactResource)):
             server = self.get_server(server)
 
         if not server:
@@ -2672,11 +2986,83 @@ class OpenStackCloud(_normalize.Normalizer):
         """
         return _utils._get_entity(self.search_images, name_or_id, filters)
 
+    def get_image_by_checksum(self, md5=None, sha256=None):
+        """Get an active image with the given content.
+
+        Images are looked up in an index of the checksums of the images
+        from list_images, which is only built again when list_images
+        returns a new list. An image is indexed under the md5 glance keeps
+        in checksum and under os_hash_value if glance gives one. The md5
+        and sha256 shade stores in image properties can be set to anything
+        by the owner of the image, so they are only indexed for images
+        owned by the current project. If both md5 and sha256 are given,
+        the image has to be known to have both.
+
+        :param str md5: md5 hexdigest of the image data.
+        :param str sha256: sha256 hexdigest of the image data.
+
+        :returns: An image ``munch.Munch`` or None if no image has that
+                  content
+        """
+        wanted = dict(
+            (algorithm, value)
+            for (algorithm, value) in (('md5', md5), ('sha256', sha256))
+            if value)
+        if not wanted:
+            return None
+        index = self._get_image_checksum_index()
+        (algorithm, value) = sorted(wanted.items())[0]
+        for (image, hashes) in index.get((algorithm, value), []):
+            if all(hashes.get(algorithm) == value
+                   for (algorithm, value) in wanted.items()):
+                return image
+        return None
+
+    def _get_image_checksum_index(self):
+        """Index the active images by the hashes known for them.
+
+        :returns: dict of (algorithm, hexdigest) to a list of (image,
+                  dict of algorithm to hexdigest) of the images with it.
+        """
+        images = self.list_images()
+        (indexed_images, index) = self._image_checksum_index
+        if indexed_images is images:
+            return index
+        project_id = self.current_project_id
+        index = {}
+        for image in images:
+            if image.get('status') != 'active':
+                continue
+            properties = image.get('properties', {})
+
+            def get(name):
+                return image.get(name, properties.get(name))
+
+            hashes = {}
+            if project_id and image.get('owner') == project_id:
+                hashes['md5'] = get(IMAGE_MD5_KEY)
+                hashes['sha256'] = get(IMAGE_SHA256_KEY)
+            if get('os_hash_algo') and get('os_hash_value'):
+                hashes[get('os_hash_algo')] = get('os_hash_value')
+            if image.get('checksum'):
+                hashes['md5'] = image['checksum']
+            hashes = dict(
+                (algorithm, value) for (algorithm, value) in hashes.items()
+                if value)
+            for key in hashes.items():
+                index.setdefault(key, []).append((image, hashes))
+        self._image_checksum_index = (images, index)
+        return index
+
     def download_image(
             self, name_or_id, output_path=None, output_file=None,
-            chunk_size=1024):
+            chunk_size=_range_download.DEFAULT_CHUNK_SIZE):
         """Download an image from glance by name or ID
 
+        Large images written to output_path are downloaded in byte ranges,
+        download_concurrency of them at once. The data is checked against
+        the checksum of the image as it is written.
+
         :param str name_or_id: Name or ID of the image.
         :param output_path: the output path to write the image to. Either this
             or output_file must be specified
@@ -2684,10 +3070,11 @@ class OpenStackCloud(_normalize.Normalizer):
             image data to. Only write() will be called on this object. Either
             this or output_path must be specified
         :param int chunk_size: size in bytes to read from the wire and buffer
-            at one time. Defaults to 1024
+            at one time. Defaults to 65536
 
         :raises: OpenStackCloudException in the event download_image is called
-            without exactly one of either output_path or output_file
+            without exactly one of either output_path or output_file, or if
+            the data does not match the checksum of the image
         :raises: OpenStackCloudResourceNotFound if no images are found matching
             the name or id provided
         """
@@ -2709,18 +3096,120 @@ class OpenStackCloud(_normalize.Normalizer):
         else:
             endpoint = '/images/{id}'.format(id=image[0]['id'])
 
-        response = self._image_client.get(endpoint, stream=True)
+        def get(headers):
+            return self._image_client.get(
+                endpoint, stream=True, headers=headers)
 
         with _utils.shade_exceptions("Unable to download image"):
-            if output_path:
-                with open(output_path, 'wb') as fd:
-                    for chunk in response.iter_content(chunk_size=chunk_size):
-                        fd.write(chunk)
-                return
-            elif output_file:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    output_file.write(chunk)
-                return
+            self._download(
+                get, image[0].get('size'), image[0].get('checksum'),
+                chunk_size, output_path=output_path, output_file=output_file)
+
+    def replicate_image(
+            self, name_or_id, destinations, name=None, wait=False,
+            timeout=3600, buffer_chunks=_stream_tee.DEFAULT_BUFFER_CHUNKS,
+            chunk_size=_range_download.DEFAULT_CHUNK_SIZE, **kwargs):
+        """Copy an image from this cloud to other clouds or regions.
+
+        The image data is read from this cloud once and streamed to all of
+        the destinations at once, without being written to disk. Each
+        destination uploads it with create_image, so with a PUT to glance,
+        or through segments in swift on clouds that import images with
+        tasks. Each destination is fed through a buffer of buffer_chunks
+        chunks of chunk_size bytes, and the image is read only as fast as
+        the slowest destination takes it. The data is checked against the
+        checksum of the image as it is read, and if it does not match the
+        uploads fail rather than finish.
+
+        A destination that already has an image of that name with the same
+        md5 is left alone, so it is safe to run again after a failure.
+
+        :param str name_or_id: Name or ID of the image to copy.
+        :param destinations: OpenStackCloud, or list of them, to copy the
+                             image to.
+        :param str name: Name for the copies. (optional, defaults to the
+                         name of the image)
+        :param bool wait: See create_image.
+        :param timeout: See create_image.
+        :param int buffer_chunks: Number of chunks to buffer for each
+                                  destination.
+        :param int chunk_size: Number of bytes to read from the wire at a
+                               time.
+
+        Additional kwargs are passed to create_image for each destination,
+        after the disk and container formats, min_disk and min_ram of the
+        image, which they can override.
+
+        :returns: list of the image ``munch.Munch`` made in each
+                  destination, in the same order.
+
+        :raises: OpenStackCloudResourceNotFound if no image is found
+                 matching the name or id provided.
+        :raises: OpenStackCloudException if the image could not be read,
+                 or, once the others have finished, if any destination
+                 could not be uploaded to.
+        """
+        if isinstance(destinations, OpenStackCloud):
+            destinations = [destinations]
+        image = self.get_image(name_or_id)
+        if not image:
+            raise OpenStackCloudResourceNotFound(
+                "No images with name or id %s were found" % name_or_id, None)
+        if self.cloud_config.get_api_version('image') == '2':
+            endpoint = '/images/{id}/file'.format(id=image['id'])
+        else:
+            endpoint = '/images/{id}'.format(id=image['id'])
+
+        image_kwargs = dict(
+            disk_format=image.get('disk_format'),
+            container_format=image.get('container_format'),
+            min_disk=image.get('min_disk'), min_ram=image.get('min_ram'))
+        image_kwargs = dict(
+            (key, value) for (key, value) in image_kwargs.items()
+            if value is not None)
+        image_kwargs.update(kwargs)
+        image_kwargs['md5'] = image.get('checksum') or None
+        image_name = name or image['name']
+
+        def consumer(destination):
+            def create_image(data):
+                return destination.create_image(
+                    image_name, data=data, wait=wait, timeout=timeout,
+                    **image_kwargs)
+            return create_image
+
+        with _utils.shade_exceptions("Unable to replicate image"):
+            response = self._image_client.get(endpoint, stream=True)
+            try:
+                tee = _stream_tee.StreamTee(
+                    response.iter_content(chunk_size, decode_unicode=False),
+                    md5=image.get('checksum'), buffer_chunks=buffer_chunks)
+                futures = tee.run(
+                    [consumer(destination) for destination in destinations])
+            finally:
+                response.close()
+
+        images = []
+        errors = []
+        for (destination, future) in zip(destinations, futures):
+            try:
+                images.append(future.result())
+            except Exception as e:
+                self.log.debug(
+                    "Replicating image %(name)s to %(cloud)s:%(region)s"
+                    " failed", {'name': image_name, 'cloud': destination.name,
+                                'region': destination.region_name},
+                    exc_info=True)
+                errors.append('{cloud}:{region}: {e}'.format(
+                    cloud=destination.name, region=destination.region_name,
+                    e=str(e)))
+        if errors:
+            raise OpenStackCloudException(
+                "Replicating image {name} failed for {count} of {total}"
+                " destinations: {errors}".format(
+                    name=image_name, count=len(errors),
+                    total=len(destinations), errors='; '.join(errors)))
+        return images
 
     def get_floating_ip(self, id, filters=None):
         """Get a floating IP by ID
@@ -3165,7 +3654,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
         :raises: OpenStackCloudException if there are problems uploading
         """
-        if not isinstance(server, dict):
+        if not isinstance(server, (dict, _normalize.CompactResource)):
             server_obj = self.get_server(server)
             if not server_obj:
                 raise OpenStackCloudException(
@@ -3271,7 +3760,8 @@ class OpenStackCloud(_normalize.Normalizer):
             disk_format=None, container_format=None,
             disable_vendor_agent=True,
             wait=False, timeout=3600,
-            allow_duplicates=False, meta=None, volume=None, **kwargs):
+            allow_duplicates=False, meta=None, volume=None, data=None,
+            deduplicate=False, **kwargs):
         """Upload an image to Glance.
 
         :param str name: Name of the image to create. If it is a pathname
@@ -3310,6 +3800,22 @@ class OpenStackCloud(_normalize.Normalizer):
         :param volume: Name or ID or volume object of a volume to create an
                        image from. Mutually exclusive with (optional, defaults
                        to None)
+        :param data: Bytes, a file-like object opened in binary mode, or an
+                     iterable of bytes, such as a generator, to upload
+                     instead of a file. name is then used as it is. Unless
+                     md5 or sha256 are given, data is always uploaded, even
+                     if an image of the same name exists. As with a stale
+                     file, that image is left as it is and a new one of the
+                     same name is created next to it. (optional, defaults
+                     to None)
+        :param bool deduplicate: If an active image with the same content
+                                 and formats exists, return it instead of
+                                 uploading the data again, whatever its
+                                 name. The content is looked up by md5 and
+                                 sha256 with get_image_by_checksum, so with
+                                 data it is only looked up if md5 or
+                                 sha256 are given. (optional, defaults to
+                                 False)
 
         Additional kwargs will be passed to the image creation as additional
         metadata for the image and will have all values converted to string
@@ -3357,10 +3863,15 @@ class OpenStackCloud(_normalize.Normalizer):
                 container_format=container_format, disk_format=disk_format,
                 wait=wait, timeout=timeout)
 
-        # If there is no filename, see if name is actually the filename
-        if not filename:
+        if data is not None:
+            if filename:
+                raise OpenStackCloudException(
+                    "Only one of filename and data can be given to"
+                    " create_image")
+        elif not filename:
+            # If there is no filename, see if name is actually the filename
             name, filename = self._get_name_and_filename(name)
-        if not (md5 or sha256):
+        if not (md5 or sha256) and data is None:
             (md5, sha256) = self._get_file_hashes(filename)
         if allow_duplicates:
             current_image = None
@@ -3377,6 +3888,17 @@ class OpenStackCloud(_normalize.Normalizer):
                         "image %(name)s exists and is up to date",
                         {'name': name})
                     return current_image
+        if deduplicate and (md5 or sha256):
+            same_image = self.get_image_by_checksum(md5=md5, sha256=sha256)
+            if (same_image
+                    and same_image.get('disk_format') == disk_format
+                    and same_image.get('container_format')
+                    == container_format):
+                self.log.debug(
+                    "image %(name)s has the same content as image %(id)s,"
+                    " not uploading it",
+                    {'name': name, 'id': same_image['id']})
+                return same_image
         kwargs[IMAGE_MD5_KEY] = md5 or ''
         kwargs[IMAGE_SHA256_KEY] = sha256 or ''
         kwargs[IMAGE_OBJECT_KEY] = '/'.join([container, name])
@@ -3404,7 +3926,7 @@ class OpenStackCloud(_normalize.Normalizer):
                     current_image=current_image,
                     wait=wait, timeout=timeout,
                     md5=md5, sha256=sha256,
-                    meta=meta, **kwargs)
+                    meta=meta, data=data, **kwargs)
             else:
                 # If a user used the v1 calling format, they will have
                 # passed a dict called properties along
@@ -3418,7 +3940,7 @@ class OpenStackCloud(_normalize.Normalizer):
 
                 return self._upload_image_put(
                     name, filename, meta=meta,
-                    wait=wait, timeout=timeout,
+                    wait=wait, timeout=timeout, data=data,
                     **image_kwargs)
         except OpenStackCloudException:
             self.log.debug("Image creation failed", exc_info=True)
@@ -3532,15 +4054,23 @@ class OpenStackCloud(_normalize.Normalizer):
         return image
 
     def _upload_image_put(
-            self, name, filename, meta, wait, timeout, **image_kwargs):
-        image_data = open(filename, 'rb')
-        # Because reasons and crying bunnies
-        if self.cloud_config.get_api_version('image') == '2':
-            image = self._upload_image_put_v2(
-                name, image_data, meta, **image_kwargs)
+            self, name, filename, meta, wait, timeout, data=None,
+            **image_kwargs):
+        if data is None:
+            image_data = open(filename, 'rb')
         else:
-            image = self._upload_image_put_v1(
-                name, image_data, meta, **image_kwargs)
+            image_data = data
+        try:
+            # Because reasons and crying bunnies
+            if self.cloud_config.get_api_version('image') == '2':
+                image = self._upload_image_put_v2(
+                    name, image_data, meta, **image_kwargs)
+            else:
+                image = self._upload_image_put_v1(
+                    name, image_data, meta, **image_kwargs)
+        finally:
+            if data is None:
+                image_data.close()
         self._get_cache(None).invalidate()
         if not wait:
             return image
@@ -3559,15 +4089,23 @@ class OpenStackCloud(_normalize.Normalizer):
 
     def _upload_image_task(
             self, name, filename, container, current_image,
-            wait, timeout, meta, md5=None, sha256=None, **image_kwargs):
+            wait, timeout, meta, md5=None, sha256=None, data=None,
+            **image_kwargs):
 
         parameters = image_kwargs.pop('parameters', {})
         image_kwargs.update(parameters)
 
         self.create_object(
             container, name, filename,
-            md5=md5, sha256=sha256,
+            md5=md5, sha256=sha256, data=data,
             **{'content-type': 'application/octet-stream'})
+        if not (md5 or sha256):
+            # The hashes of a stream are worked out as it is uploaded
+            object_metadata = self.get_object_metadata(container, name) or {}
+            image_kwargs[IMAGE_MD5_KEY] = object_metadata.get(
+                OBJECT_MD5_KEY, '')
+            image_kwargs[IMAGE_SHA256_KEY] = object_metadata.get(
+                OBJECT_SHA256_KEY, '')
         if not current_image:
             current_image = self.get_image(name)
         # TODO(mordred): Can we do something similar to what nodepool does
@@ -5337,7 +5875,7 @@ class OpenStackCloud(_normalize.Normalizer):
                 kwargs['nics'] = [{'net-id': default_network['id']}]
 
         if image:
-            if isinstance(image, dict):
+            if isinstance(image, (dict, _normalize.CompactResource)):
                 kwargs['image'] = image['id']
             else:
                 kwargs['image'] = self.get_image(image)
@@ -5724,7 +6262,22 @@ class OpenStackCloud(_normalize.Normalizer):
             self.set_container_access(name, 'public')
         return self.get_container(name, skip_cache=True)
 
-    def delete_container(self, name):
+    def delete_container(self, name, recursive=False):
+        """Delete a container.
+
+        :param string name: Name of the container to delete.
+        :param bool recursive: Whether to delete all of the objects in the
+                               container first, with delete_objects.
+                               (Default False, the container has to be
+                               empty)
+
+        :returns: True if delete succeeded, False if the container was not
+                  found.
+
+        :raises: OpenStackCloudException on operation error.
+        """
+        if recursive:
+            self.delete_objects(name)
         try:
             self._object_store_client.delete(name)
             return True
@@ -5735,8 +6288,8 @@ class OpenStackCloud(_normalize.Normalizer):
                 raise OpenStackCloudException(
                     'Attempt to delete container {container} failed. The'
                     ' container is not empty. Please delete the objects'
-                    ' inside it before deleting the container'.format(
-                        container=name))
+                    ' inside it before deleting the container, or pass'
+                    ' recursive=True'.format(container=name))
             raise
 
     def update_container(self, name, headers):
@@ -5764,21 +6317,22 @@ class OpenStackCloud(_normalize.Normalizer):
         raise OpenStackCloudException(
             "Could not determine container access for ACL: %s." % acl)
 
+    def _hash_file(self, filename):
+        self.log.debug(
+            'Calculating hashes for %(filename)s', {'filename': filename})
+        return _utils.hash_file(filename)
+
     def _get_file_hashes(self, filename):
         file_key = "{filename}:{mtime}".format(
             filename=filename,
             mtime=os.stat(filename).st_mtime)
         if file_key not in self._file_hash_cache:
-            self.log.debug(
-                'Calculating hashes for %(filename)s', {'filename': filename})
-            md5 = hashlib.md5()
-            sha256 = hashlib.sha256()
-            with open(filename, 'rb') as file_obj:
-                for chunk in iter(lambda: file_obj.read(8192), b''):
-                    md5.update(chunk)
-                    sha256.update(chunk)
-            self._file_hash_cache[file_key] = dict(
-                md5=md5.hexdigest(), sha256=sha256.hexdigest())
+            if self._persistent_hash_cache:
+                (md5, sha256) = self._persistent_hash_cache.get_file_hashes(
+                    filename, self._hash_file)
+            else:
+                (md5, sha256) = self._hash_file(filename)
+            self._file_hash_cache[file_key] = dict(md5=md5, sha256=sha256)
             self.log.debug(
                 "Image file %(filename)s md5:%(md5)s sha256:%(sha256)s",
                 {'filename': filename,
@@ -5832,6 +6386,11 @@ class OpenStackCloud(_normalize.Normalizer):
         self, container, name, filename, file_md5=None, file_sha256=None):
 
         metadata = self.get_object_metadata(container, name)
+        return self._is_object_stale(
+            metadata, container, name, filename, file_md5, file_sha256)
+
+    def _is_object_stale(
+            self, metadata, container, name, filename, file_md5, file_sha256):
         if not metadata:
             self.log.debug(
                 "swift stale check, no object: {container}/{name}".format(
@@ -5861,15 +6420,15 @@ class OpenStackCloud(_normalize.Normalizer):
     def create_object(
             self, container, name, filename=None,
             md5=None, sha256=None, segment_size=None,
-            use_slo=True, metadata=None,
-            **headers):
+            use_slo=True, metadata=None, resume=False, progress=None,
+            data=None, **headers):
         """Create a file object
 
         :param container: The name of the container to store the file in.
             This container will be created if it does not exist already.
         :param name: Name for the object within the container.
         :param filename: The path to the local file whose contents will be
-            uploaded.
+            uploaded. (Optional, defaults to name unless data is given)
         :param md5: A hexadecimal md5 of the file. (Optional), if it is known
             and can be passed here, it will save repeating the expensive md5
             process. It is assumed to be accurate.
@@ -5886,36 +6445,101 @@ class OpenStackCloud(_normalize.Normalizer):
             (optional, defaults to True)
         :param metadata: This dict will get changed into headers that set
             metadata of the object
+        :param resume: If the object is large enough to need to be a Large
+            Object, keep any segments left in the container by an earlier
+            upload of the same file rather than uploading them again.
+            Segments are kept if their size and etag match the md5 of that
+            part of the local file. (optional, defaults to False)
+        :param progress: If the object is large enough to need to be a Large
+            Object, this is called with the number of bytes of the file that
+            have been uploaded and the size of the file each time a segment
+            has been uploaded. For data, the size is not known, so it is
+            called with None instead. (optional)
+        :param data: Bytes, a file-like object opened in binary mode, or an
+            iterable of bytes, such as a generator, to upload instead of a
+            file. It is read once, and cut into segments as it is read if
+            it turns out to be large. Only segment_size bytes for each of
+            upload_concurrency segments are held in memory, so when data
+            is given segment_size defaults to 64MiB. (optional)
 
         :raises: ``OpenStackCloudException`` on operation error.
         """
         if not metadata:
             metadata = {}
 
-        if not filename:
+        if data is not None:
+            if filename:
+                raise OpenStackCloudException(
+                    "Only one of filename and data can be given to"
+                    " create_object")
+        elif not filename:
             filename = name
 
         # segment_size gets used as a step value in a range call, so needs
         # to be an int
         if segment_size:
             segment_size = int(segment_size)
+        elif data is not None:
+            segment_size = _segment_uploader.DEFAULT_STREAM_SEGMENT_SIZE
         segment_size = self.get_object_segment_size(segment_size)
-        file_size = os.path.getsize(filename)
+        if data is None:
+            file_size = os.path.getsize(filename)
 
-        if not (md5 or sha256):
-            (md5, sha256) = self._get_file_hashes(filename)
-        headers[OBJECT_MD5_KEY] = md5 or ''
-        headers[OBJECT_SHA256_KEY] = sha256 or ''
         for (k, v) in metadata.items():
             headers['x-object-meta-' + k] = v
 
         # On some clouds this is not necessary. On others it is. I'm confused.
         self.create_container(container)
 
-        if self.is_object_stale(container, name, filename, md5, sha256):
+        endpoint = '{container}/{name}'.format(container=container, name=name)
+        object_metadata = self.get_object_metadata(container, name)
+
+        if data is not None:
+            # The hashes of a stream are only known once it has been read,
+            # so it can only be skipped if we were told them
+            if (md5 or sha256) and object_metadata and (
+                    self._hashes_up_to_date(
+                        md5=md5, sha256=sha256,
+                        md5_key=object_metadata.get(OBJECT_MD5_KEY, ''),
+                        sha256_key=object_metadata.get(
+                            OBJECT_SHA256_KEY, ''))):
+                self.log.debug(
+                    "swift object up to date: %(endpoint)s",
+                    {'endpoint': endpoint})
+                return
+            return self._upload_stream(
+                endpoint, data, headers, segment_size, use_slo, progress)
+
+        if (not (md5 or sha256) and not object_metadata
+                and file_size > segment_size):
+            # There is nothing to compare the hashes with, and they are only
+            # needed for the manifest, so work them out while the segments
+            # are uploading.
+            self.log.debug(
+                "swift uploading %(filename)s to %(endpoint)s",
+                {'filename': filename, 'endpoint': endpoint})
+            journal = self._get_upload_journal(
+                endpoint, filename, segment_size, resume)
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1) as executor:
+                hashes = executor.submit(self._get_file_hashes, filename)
+                manifest = self._upload_segments(
+                    endpoint, filename, headers, file_size, segment_size,
+                    journal=journal, progress=progress)
+                (md5, sha256) = hashes.result()
+            headers[OBJECT_MD5_KEY] = md5
+            headers[OBJECT_SHA256_KEY] = sha256
+            return self._finish_resumed_large_object(
+                endpoint, headers, manifest, use_slo, journal)
+
+        if not (md5 or sha256):
+            (md5, sha256) = self._get_file_hashes(filename)
+        headers[OBJECT_MD5_KEY] = md5 or ''
+        headers[OBJECT_SHA256_KEY] = sha256 or ''
+
+        if self._is_object_stale(
+                object_metadata, container, name, filename, md5, sha256):
 
-            endpoint = '{container}/{name}'.format(
-                container=container, name=name)
             self.log.debug(
                 "swift uploading %(filename)s to %(endpoint)s",
                 {'filename': filename, 'endpoint': endpoint})
@@ -5925,11 +6549,62 @@ class OpenStackCloud(_normalize.Normalizer):
             else:
                 self._upload_large_object(
                     endpoint, filename, headers,
-                    file_size, segment_size, use_slo)
+                    file_size, segment_size, use_slo, resume, progress)
 
     def _upload_object(self, endpoint, filename, headers):
-        return self._object_store_client.put(
-            endpoint, headers=headers, data=open(filename, 'r'))
+        with open(filename, 'rb') as data:
+            return self._object_store_client.put(
+                endpoint, headers=headers, data=data)
+
+    def _upload_stream(
+            self, endpoint, data, headers, segment_size, use_slo, progress):
+        stream = _segment_uploader.StreamSegments(data, segment_size)
+        pieces = iter(stream)
+        first = next(pieces)
+        second = next(pieces, None)
+        if second is None:
+            # It all fits in one object
+            headers[OBJECT_MD5_KEY] = stream.md5
+            headers[OBJECT_SHA256_KEY] = stream.sha256
+            return self._object_store_client.put(
+                endpoint, headers=headers, data=first)
+
+        self.log.debug(
+            "swift uploading stream to %(endpoint)s in segments of"
+            " %(segment_size)d bytes",
+            {'endpoint': endpoint, 'segment_size': segment_size})
+        pieces = itertools.chain((first, second), pieces)
+        # Don't hold on to them once they are uploaded
+        first = second = None
+        manifest = []
+
+        def named_segments():
+            for (index, piece) in enumerate(pieces):
+                name = '{endpoint}/{index:0>6}'.format(
+                    endpoint=endpoint, index=index)
+                manifest.append(dict(
+                    path='/{name}'.format(name=name),
+                    size_bytes=len(piece)))
+                yield (name, _segment_uploader.BufferSegment(piece))
+
+        uploaded_bytes = [0]
+
+        def segment_done(name, etag, segment):
+            uploaded_bytes[0] += segment.length
+            if progress:
+                progress(uploaded_bytes[0], None)
+
+        uploader = _segment_uploader.SegmentUploader(
+            functools.partial(self._put_segment, headers=headers),
+            concurrency=self.upload_concurrency)
+        etags = uploader.upload(named_segments(), done=segment_done)
+        for (entry, etag) in zip(manifest, etags):
+            if etag:
+                entry['etag'] = etag
+
+        headers[OBJECT_MD5_KEY] = stream.md5
+        headers[OBJECT_SHA256_KEY] = stream.sha256
+        return self._finish_large_object(endpoint, headers, manifest, use_slo)
 
     def _get_file_segments(self, endpoint, filename, file_size, segment_size):
         # Use an ordered dict here so that testing can replicate things
@@ -5944,81 +6619,130 @@ class OpenStackCloud(_normalize.Normalizer):
             segments[name] = segment
         return segments
 
-    def _object_name_from_url(self, url):
-        '''Get container_name/object_name from the full URL called.
-
-        Remove the Swift endpoint from the front of the URL, and remove
-        the leaving / that will leave behind.'''
-        endpoint = self._object_store_client.get_endpoint()
-        object_name = url.replace(endpoint, '')
-        if object_name.startswith('/'):
-            object_name = object_name[1:]
-        return object_name
-
-    def _add_etag_to_manifest(self, segment_results, manifest):
-        for result in segment_results:
-            if 'Etag' not in result.headers:
-                continue
-            name = self._object_name_from_url(result.url)
-            for entry in manifest:
-                if entry['path'] == '/{name}'.format(name=name):
-                    entry['etag'] = result.headers['Etag']
-
     def _upload_large_object(
-        self, endpoint, filename, headers, file_size, segment_size, use_slo):
+            self, endpoint, filename, headers, file_size, segment_size,
+            use_slo, resume=False, progress=None):
         # If the object is big, we need to break it up into segments that
         # are no larger than segment_size, upload each of them individually
-        # and then upload a manifest object. The segments can be uploaded in
-        # parallel, so we'll use the async feature of the TaskManager.
+        # and then upload a manifest object.
+        journal = self._get_upload_journal(
+            endpoint, filename, segment_size, resume)
+        manifest = self._upload_segments(
+            endpoint, filename, headers, file_size, segment_size,
+            journal=journal, progress=progress)
+        return self._finish_resumed_large_object(
+            endpoint, headers, manifest, use_slo, journal)
+
+    def _get_upload_journal(self, endpoint, filename, segment_size, resume):
+        if not resume:
+            return None
+        return _upload_journal.UploadJournal(
+            self._upload_journal_dir, endpoint, filename, segment_size)
 
-        segment_futures = []
-        segment_results = []
-        retry_results = []
-        retry_futures = []
-        manifest = []
+    def _finish_resumed_large_object(
+            self, endpoint, headers, manifest, use_slo, journal):
+        try:
+            return self._finish_large_object(
+                endpoint, headers, manifest, use_slo)
+        finally:
+            # Whether or not the manifest made it, the next attempt should
+            # look at what is really in the container.
+            if journal:
+                journal.remove()
+
+    def _list_all_objects(self, container, prefix=None):
+        objects = []
+        marker = None
+        while True:
+            params = dict(format='json')
+            if prefix:
+                params['prefix'] = prefix
+            if marker:
+                params['marker'] = marker
+            page = self._object_store_client.get(container, params=params)
+            if not page:
+                return objects
+            objects.extend(page)
+            marker = page[-1]['name']
+
+    def _get_uploaded_segments(self, endpoint, segments, journal):
+        """Find the segments that an earlier upload left in the container.
+
+        :returns: dict of segment name to etag, for the segments whose size
+                  and etag match the local file.
+        """
+        uploaded = journal.load()
+        if uploaded:
+            self.log.debug(
+                "swift resuming %(endpoint)s from journal, %(count)d of"
+                " %(total)d segments uploaded",
+                {'endpoint': endpoint, 'count': len(uploaded),
+                 'total': len(segments)})
+            return uploaded
+
+        (container, name) = endpoint.split('/', 1)
+        for obj in self._list_all_objects(container, name + '/'):
+            segment_name = '{container}/{name}'.format(
+                container=container, name=obj['name'])
+            segment = segments.get(segment_name)
+            if segment is None or segment.length != obj['bytes']:
+                continue
+            if _utils.segment_md5(segment) == obj['hash']:
+                uploaded[segment_name] = obj['hash']
+        self.log.debug(
+            "swift resuming %(endpoint)s, %(count)d of %(total)d segments"
+            " uploaded",
+            {'endpoint': endpoint, 'count': len(uploaded),
+             'total': len(segments)})
+        journal.start(uploaded)
+        return uploaded
+
+    def _put_segment(self, name, segment, headers):
+        return self._object_store_client.put(
+            name, headers=headers, data=segment)
 
+    def _upload_segments(
+            self, endpoint, filename, headers, file_size, segment_size,
+            journal=None, progress=None):
         # Get an OrderedDict with keys being the swift location for the
         # segment, the value a FileSegment file-like object that is a
         # slice of the data for the segment.
         segments = self._get_file_segments(
             endpoint, filename, file_size, segment_size)
 
-        # Schedule the segments for upload
+        etags = {}
+        if journal:
+            etags = self._get_uploaded_segments(endpoint, segments, journal)
+        uploaded_bytes = [sum(
+            segments[name].length for name in etags if name in segments)]
+
+        def segment_done(name, etag, segment):
+            etags[name] = etag
+            if journal and etag:
+                journal.record(name, etag)
+            uploaded_bytes[0] += segment.length
+            if progress:
+                progress(uploaded_bytes[0], file_size)
+
+        uploader = _segment_uploader.SegmentUploader(
+            functools.partial(self._put_segment, headers=headers),
+            concurrency=self.upload_concurrency)
+        uploader.upload(
+            [(name, segment) for (name, segment) in segments.items()
+             if name not in etags],
+            done=segment_done)
+
+        manifest = []
         for name, segment in segments.items():
-            # Async call to put - schedules execution and returns a future
-            segment_future = self._object_store_client.put(
-                name, headers=headers, data=segment, run_async=True)
-            segment_futures.append(segment_future)
-            # TODO(mordred) Collect etags from results to add to this manifest
-            # dict. Then sort the list of dicts by path.
-            manifest.append(dict(
+            entry = dict(
                 path='/{name}'.format(name=name),
-                size_bytes=segment.length))
-
-        # Try once and collect failed results to retry
-        segment_results, retry_results = task_manager.wait_for_futures(
-            segment_futures, raise_on_error=False)
-
-        self._add_etag_to_manifest(segment_results, manifest)
-
-        for result in retry_results:
-            # Grab the FileSegment for the failed upload so we can retry
-            name = self._object_name_from_url(result.url)
-            segment = segments[name]
-            segment.seek(0)
-            # Async call to put - schedules execution and returns a future
-            segment_future = self._object_store_client.put(
-                name, headers=headers, data=segment, run_async=True)
-            # TODO(mordred) Collect etags from results to add to this manifest
-            # dict. Then sort the list of dicts by path.
-            retry_futures.append(segment_future)
-
-        # If any segments fail the second time, just throw the error
-        segment_results, retry_results = task_manager.wait_for_futures(
-            retry_futures, raise_on_error=True)
-
-        self._add_etag_to_manifest(segment_results, manifest)
+                size_bytes=segment.length)
+            if etags.get(name):
+                entry['etag'] = etags[name]
+            manifest.append(entry)
+        return manifest
 
+    def _finish_large_object(self, endpoint, headers, manifest, use_slo):
         if use_slo:
             return self._finish_large_object_slo(endpoint, headers, manifest)
         else:
@@ -6111,6 +6835,315 @@ class OpenStackCloud(_normalize.Normalizer):
         except OpenStackCloudHTTPError:
             return False
 
+    def sync_directory(
+            self, local_dir, container, prefix=None, delete=False,
+            dry_run=False, segment_size=None, use_slo=True):
+        """Make the objects in a container match the files in a directory.
+
+        The container is listed once and each file is compared with its
+        entry in the listing. A file whose size differs is stale without
+        its hashes being compared, though they are still worked out, or
+        taken from the hash cache, to be stored with the object when it is
+        uploaded. A file whose size matches is compared by its md5 with the
+        etag in the listing. Only when the listing cannot settle it is the
+        md5 and sha256 metadata shade stored with the object fetched with
+        a HEAD. That is the case for static large objects, which are
+        listed with the etag of their manifest, and dynamic large objects,
+        which are listed as 0 bytes. Files are compared and uploaded
+        upload_concurrency at a time, apart from large objects, which go
+        one after another since their segments are already uploaded in
+        parallel.
+
+        :param string local_dir: Path of the directory to upload.
+        :param string container: Name of the container to sync to. It is
+                                 created if it does not exist.
+        :param string prefix: (optional) Pseudo-directory of the container
+                              to sync to. Objects outside it are left
+                              alone.
+        :param bool delete: Whether to delete the objects that have no file
+                            in the directory. Segments of large objects
+                            that are kept are not deleted. (Default False)
+        :param bool dry_run: Only work out what would be uploaded and
+                             deleted. (Default False)
+        :param segment_size: See create_object.
+        :param use_slo: See create_object.
+
+        :returns: Munch with upload, the names of the objects uploaded,
+                  upload_bytes, their total size, delete, the names of the
+                  objects deleted, and unchanged, the names of the objects
+                  that were up to date. With dry_run, upload and delete are
+                  what would have been done.
+
+        :raises: OpenStackCloudException on operation error.
+        """
+        if prefix and not prefix.endswith('/'):
+            prefix += '/'
+        local = self._list_local_files(local_dir, prefix or '')
+        try:
+            remote = self._list_all_objects(container, prefix)
+        except OpenStackCloudHTTPError as e:
+            if e.response.status_code != 404:
+                raise
+            remote = []
+        listed = dict((obj['name'], obj) for obj in remote)
+
+        def is_kept_segment(name):
+            parts = name.split('/')
+            return any(
+                '/'.join(parts[:index]) in local
+                for index in range(1, len(parts)))
+
+        report = munch.Munch(
+            upload=[], upload_bytes=0, delete=[], unchanged=[])
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.upload_concurrency)
+        try:
+            names = sorted(local)
+            stale = executor.map(
+                lambda name: self._is_listed_object_stale(
+                    container, name, local[name][0], local[name][1],
+                    listed.get(name)),
+                names)
+            for (name, is_stale) in zip(names, stale):
+                if is_stale:
+                    report.upload.append(name)
+                    report.upload_bytes += local[name][1]
+                else:
+                    report.unchanged.append(name)
+            extras = []
+            if delete:
+                extras = [
+                    obj for obj in remote
+                    if obj['name'] not in local
+                    and not is_kept_segment(obj['name'])]
+                report.delete = [obj['name'] for obj in extras]
+            self.log.debug(
+                "swift sync %(local_dir)s to %(container)s: %(upload)d to"
+                " upload, %(delete)d to delete, %(unchanged)d up to date",
+                {'local_dir': local_dir, 'container': container,
+                 'upload': len(report.upload),
+                 'delete': len(report.delete),
+                 'unchanged': len(report.unchanged)})
+            if dry_run:
+                return report
+
+            if report.upload:
+                self.create_container(container)
+                if segment_size:
+                    segment_size = int(segment_size)
+                segment_size = self.get_object_segment_size(segment_size)
+                small = [
+                    name for name in report.upload
+                    if local[name][1] <= segment_size]
+                large = [
+                    name for name in report.upload
+                    if local[name][1] > segment_size]
+                list(executor.map(
+                    lambda name: self._upload_file(
+                        container, name, local[name][0], local[name][1],
+                        segment_size, use_slo),
+                    small))
+                for name in large:
+                    self._upload_file(
+                        container, name, local[name][0], local[name][1],
+                        segment_size, use_slo)
+            if extras:
+                self._delete_listed_objects(container, extras)
+        finally:
+            executor.shutdown(wait=True)
+        return report
+
+    def _list_local_files(self, local_dir, prefix):
+        """Find the files under local_dir.
+
+        :returns: dict of object name to the path and size of the file.
+        """
+        files = {}
+        for (dirpath, dirnames, filenames) in os.walk(local_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if not os.path.isfile(path):
+                    continue
+                name = prefix + os.path.relpath(path, local_dir).replace(
+                    os.sep, '/')
+                files[name] = (path, os.path.getsize(path))
+        return files
+
+    def _is_listed_object_stale(
+            self, container, name, filename, file_size, listed):
+        if not listed:
+            return True
+        # Dynamic large objects are listed as their empty manifest
+        maybe_manifest = listed.get('bytes') == 0 and file_size > 0
+        if listed.get('bytes') != file_size and not maybe_manifest:
+            return True
+        (md5, sha256) = self._get_file_hashes(filename)
+        if listed.get('hash') == md5:
+            return False
+        # Large objects are listed with the etag of their manifest, so only
+        # the hashes shade stored with them can tell
+        return self.is_object_stale(container, name, filename, md5, sha256)
+
+    def _upload_file(
+            self, container, name, filename, file_size, segment_size,
+            use_slo):
+        endpoint = '{container}/{name}'.format(container=container, name=name)
+        (md5, sha256) = self._get_file_hashes(filename)
+        headers = {OBJECT_MD5_KEY: md5, OBJECT_SHA256_KEY: sha256}
+        self.log.debug(
+            "swift uploading %(filename)s to %(endpoint)s",
+            {'filename': filename, 'endpoint': endpoint})
+        if file_size <= segment_size:
+            return self._upload_object(endpoint, filename, headers)
+        return self._upload_large_object(
+            endpoint, filename, headers, file_size, segment_size, use_slo)
+
+    def delete_objects(self, container, names=None, prefix=None):
+        """Delete many objects from a container.
+
+        Objects given by prefix, or all of them, are found with one listing
+        of the container, so that there is no HEAD for each of them, and
+        static large objects are deleted along with their segments when the
+        cloud marks them in its listings, which Swift does from 2.19.
+        Objects given by name are not looked up in a listing, which can lag
+        behind the objects written to the container. Instead there is a
+        HEAD of each, upload_concurrency at once, to find the static large
+        objects. Static large objects are deleted one at a time. The rest
+        are deleted with the bulk delete middleware, if
+        get_object_capabilities says the cloud has it, in batches as big as
+        the cloud allows. Otherwise they are deleted one DELETE at a time,
+        upload_concurrency at once.
+
+        :param string container: Name of the container holding the objects.
+        :param list names: (optional) Names of the objects to delete. Names
+                           that are not in the container are skipped.
+        :param string prefix: (optional) Only delete the objects whose names
+                              start with prefix. If neither names nor
+                              prefix are given, every object in the
+                              container is deleted.
+
+        :returns: The number of objects deleted.
+
+        :raises: OpenStackCloudException on operation error.
+        """
+        if names is not None and prefix:
+            raise OpenStackCloudException(
+                "Only one of names and prefix can be given")
+        if names is not None:
+            return self._delete_listed_objects(
+                container, self._get_named_objects(container, names))
+        try:
+            objects = self._list_all_objects(container, prefix)
+        except OpenStackCloudHTTPError as e:
+            if e.response.status_code == 404:
+                return 0
+            raise
+        return self._delete_listed_objects(container, objects)
+
+    def _get_named_objects(self, container, names):
+        """Make listing entries for the objects that exist out of names."""
+        names = sorted(set(names))
+        metadata = self._map_in_parallel(
+            lambda name: self.get_object_metadata(container, name), names)
+        objects = []
+        for (name, headers) in zip(names, metadata):
+            if headers is None:
+                continue
+            obj = dict(name=name)
+            if headers.get('X-Static-Large-Object') == 'True':
+                obj['slo_etag'] = headers.get('Etag')
+            objects.append(obj)
+        return objects
+
+    def _delete_listed_objects(self, container, objects):
+        """Delete objects given by their entries in a container listing."""
+        # Manifests go first, so that their segments are not found missing
+        manifests = [obj['name'] for obj in objects if 'slo_etag' in obj]
+        plain = [obj['name'] for obj in objects if 'slo_etag' not in obj]
+        deleted = self._delete_objects_one_by_one(
+            container, manifests, manifest=True)
+        bulk_size = self._get_bulk_delete_size()
+        if not bulk_size:
+            return deleted + self._delete_objects_one_by_one(container, plain)
+        for start in range(0, len(plain), bulk_size):
+            deleted += self._bulk_delete_objects(
+                container, plain[start:start + bulk_size])
+        return deleted
+
+    def _get_bulk_delete_size(self):
+        """How many objects a bulk delete can take, or 0 if there is none."""
+        try:
+            capabilities = self.get_object_capabilities()
+        except OpenStackCloudHTTPError as e:
+            # Clouds can turn off /info
+            self.log.debug(
+                "swift capabilities not available, not using bulk delete:"
+                " %(e)s", {'e': str(e)})
+            return 0
+        bulk_delete = capabilities.get('bulk_delete')
+        if not bulk_delete:
+            return 0
+        return int(bulk_delete.get(
+            'max_deletes_per_request', DEFAULT_MAX_BULK_DELETES))
+
+    def _bulk_delete_objects(self, container, names):
+        body = '\n'.join(
+            urllib.parse.quote('/{container}/{name}'.format(
+                container=container, name=name).encode('utf-8'))
+            for name in names)
+        result = self._object_store_client.post(
+            '', params={'bulk-delete': ''}, data=body, raw=True,
+            headers={
+                'Content-Type': 'text/plain',
+                'Accept': 'application/json'})
+        if not isinstance(result, dict):
+            # Without the JSON content type the body was left alone
+            result = result.json()
+        errors = result.get('Errors') or []
+        if errors:
+            raise OpenStackCloudException(
+                "Bulk delete from {container} failed for {count} objects,"
+                " {name} with {status}".format(
+                    container=container, count=len(errors),
+                    name=errors[0][0], status=errors[0][1]))
+        return int(result.get('Number Deleted', 0))
+
+    def _delete_object_request(self, container, name, manifest=False):
+        params = {}
+        if manifest:
+            params['multipart-manifest'] = 'delete'
+        try:
+            self._object_store_client.delete(
+                '{container}/{object}'.format(
+                    container=container, object=name),
+                params=params)
+        except OpenStackCloudHTTPError as e:
+            if e.response.status_code == 404:
+                return False
+            raise
+        return True
+
+    def _delete_objects_one_by_one(self, container, names, manifest=False):
+        results = self._map_in_parallel(
+            lambda name: self._delete_object_request(
+                container, name, manifest=manifest),
+            names)
+        return results.count(True)
+
+    def _map_in_parallel(self, func, items):
+        """Call func on each item, upload_concurrency at once.
+
+        :returns: list of the results, in the order of items.
+        """
+        if not items:
+            return []
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.upload_concurrency, len(items)))
+        try:
+            return list(executor.map(func, items))
+        finally:
+            executor.shutdown(wait=True)
+
     def get_object_metadata(self, container, name):
         try:
             return self._object_store_client.head(
@@ -6121,58 +7154,159 @@ class OpenStackCloud(_normalize.Normalizer):
                 return None
             raise
 
+    def _download(
+            self, get, size, md5, chunk_size,
+            output_path=None, output_file=None):
+        """Write the body that get fetches to output_path or output_file.
+
+        A body going to output_path that is bigger than one range is
+        fetched in ranges, download_concurrency at a time, unless the
+        server turns out not to do ranges.
+
+        :param get: Callable taking a dict of extra request headers that
+                    makes a streamed GET of the body and returns the
+                    response.
+        :param size: Size of the body in bytes, or None if not known.
+        :param md5: md5 hexdigest the body should have, or None if not
+                    known.
+        """
+        actual_md5 = None
+        if (output_path and size
+                and size > _range_download.DEFAULT_RANGE_SIZE
+                and self.download_concurrency > 1):
+            downloader = _range_download.RangeDownloader(
+                get, concurrency=self.download_concurrency,
+                range_size=_range_download.DEFAULT_RANGE_SIZE,
+                chunk_size=chunk_size)
+            try:
+                actual_md5 = downloader.download(output_path, size)
+            except _range_download.RangesNotSupported:
+                self.log.debug(
+                    "Ranged download not supported, downloading to"
+                    " %(path)s in one request", {'path': output_path})
+        if actual_md5 is None:
+            response = get({})
+            if output_path:
+                with open(output_path, 'wb') as outfile:
+                    actual_md5 = _range_download.write_response(
+                        response, outfile, chunk_size)
+            else:
+                actual_md5 = _range_download.write_response(
+                    response, output_file, chunk_size)
+        if md5 and actual_md5 != md5:
+            raise OpenStackCloudException(
+                "Downloaded data has md5 {actual} but {md5} was"
+                " expected".format(actual=actual_md5, md5=md5))
+
+    def _get_object_md5(self, headers):
+        if headers.get(OBJECT_MD5_KEY):
+            return headers[OBJECT_MD5_KEY]
+        # The etag of a large object is not the md5 of its content
+        if ('x-static-large-object' in headers
+                or 'x-object-manifest' in headers):
+            return None
+        etag = headers.get('etag')
+        if etag:
+            return etag.strip('"')
+        return None
+
     def get_object(self, container, obj, query_string=None,
-                   resp_chunk_size=1024, outfile=None):
+                   resp_chunk_size=_range_download.DEFAULT_CHUNK_SIZE,
+                   outfile=None):
         """Get the headers and body of an object from swift
 
+        Large objects written to an outfile given as a path are downloaded
+        in byte ranges, download_concurrency of them at once. Objects
+        written to an outfile are checked against their md5 as they are
+        written, if it is known.
+
         :param string container: name of the container.
         :param string obj: name of the object.
         :param string query_string: query args for uri.
                                     (delimiter, prefix, etc.)
         :param int resp_chunk_size: chunk size of data to read. Only used
                                     if the results are being written to a
-                                    file. (optional, defaults to 1k)
+                                    file. (optional, defaults to 64k)
         :param outfile: Write the object to a file instead of
                         returning the contents. If this option is
                         given, body in the return tuple will be None. outfile
                         can either be a file path given as a string, or a
                         File like object.
 
-        :returns: Tuple (headers, body) of the object, or None if the object
-                  is not found (404)
+        :returns: Tuple (headers, body) of the object, with the body as
+                  bytes, or None if the object is not found (404)
         :raises: OpenStackCloudException on operation error.
         """
-        # TODO(mordred) implement resp_chunk_size
         try:
             endpoint = '{container}/{object}'.format(
                 container=container, object=obj)
             if query_string:
                 endpoint = '{endpoint}?{query_string}'.format(
                     endpoint=endpoint, query_string=query_string)
-            response = self._object_store_client.get(
-                endpoint, stream=True)
+            if not outfile:
+                response = self._object_store_client.get(
+                    endpoint, stream=True)
+                response_headers = {
+                    k.lower(): v for k, v in response.headers.items()}
+                return (response_headers, response.content)
+
+            response = self._object_store_client.head(endpoint)
             response_headers = {
                 k.lower(): v for k, v in response.headers.items()}
-            if outfile:
-                if isinstance(outfile, six.string_types):
-                    outfile_handle = open(outfile, 'wb')
-                else:
-                    outfile_handle = outfile
-                for chunk in response.iter_content(
-                        resp_chunk_size, decode_unicode=False):
-                    outfile_handle.write(chunk)
-                if isinstance(outfile, six.string_types):
-                    outfile_handle.close()
-                else:
-                    outfile_handle.flush()
-                return (response_headers, None)
+            size = None
+            md5 = None
+            # A query string can ask for something other than the content
+            if not query_string:
+                if response_headers.get('accept-ranges') == 'bytes':
+                    size = int(response_headers.get('content-length', 0))
+                md5 = self._get_object_md5(response_headers)
+
+            def get(headers):
+                return self._object_store_client.get(
+                    endpoint, stream=True, headers=headers)
+
+            if isinstance(outfile, six.string_types):
+                self._download(
+                    get, size, md5, resp_chunk_size, output_path=outfile)
             else:
-                return (response_headers, response.text)
+                self._download(
+                    get, size, md5, resp_chunk_size, output_file=outfile)
+                outfile.flush()
+            return (response_headers, None)
         except OpenStackCloudHTTPError as e:
             if e.response.status_code == 404:
                 return None
             raise
 
+    def stream_object(
+            self, container, obj, query_string=None,
+            resp_chunk_size=_range_download.DEFAULT_CHUNK_SIZE):
+        """Get the body of an object from swift a chunk at a time
+
+        :param string container: name of the container.
+        :param string obj: name of the object.
+        :param string query_string: query args for uri.
+                                    (delimiter, prefix, etc.)
+        :param int resp_chunk_size: chunk size of data to read.
+                                    (optional, defaults to 64k)
+
+        :returns: An iterator of the body of the object as bytes.
+        :raises: OpenStackCloudResourceNotFound if the object is not found.
+        :raises: OpenStackCloudException on operation error.
+        """
+        endpoint = '{container}/{object}'.format(
+            container=container, object=obj)
+        if query_string:
+            endpoint = '{endpoint}?{query_string}'.format(
+                endpoint=endpoint, query_string=query_string)
+        response = self._object_store_client.get(endpoint, stream=True)
+        try:
+            for chunk in response.iter_content(
+                    resp_chunk_size, decode_unicode=False):
+                yield chunk
+        finally:
+            response.close()
+
     def create_subnet(self, network_name_or_id, cidr=None, ip_version=4,
                       enable_dhcp=False, subnet_name=None, tenant_id=None,
                       allocation_pools=None,
@@ -12,16 +12,16 @@
 
 import jsonpatch
 
-from ironicclient import client as ironic_client
-from ironicclient import exceptions as ironic_exceptions
-from novaclient import exceptions as nova_exceptions
-from cinderclient import exceptions as cinder_exceptions
-
 from shade.exc import *  # noqa
 from shade import openstackcloud
 from shade import _tasks
 from shade import _utils
 
+# The client libraries are only imported when they are used
+cinder_exceptions = _utils.LazyModule('cinderclient.exceptions')
+ironic_exceptions = _utils.LazyModule('ironicclient.exceptions')
+nova_exceptions = _utils.LazyModule('novaclient.exceptions')
+
 
 class OperatorCloud(openstackcloud.OpenStackCloud):
     """Represent a privileged/operator connection to an OpenStack Cloud.
@@ -50,6 +50,7 @@ class OperatorCloud(openstackcloud.OpenStackCloud):
 
     @property
     def ironic_client(self):
+        from ironicclient import client as ironic_client
         if self._ironic_client is None:
             self._ironic_client = self._get_client(
                 'baremetal', ironic_client.Client,
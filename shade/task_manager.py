@@ -216,6 +216,7 @@ class TaskManager(object):
     def __init__(
             self, client, name, result_filter_cb=None, workers=5, **kwargs):
         self.name = name
+        self.workers = workers
         self._client = client
         self._executor = concurrent.futures.ThreadPoolExecutor(
             max_workers=workers)
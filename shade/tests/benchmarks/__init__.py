@@ -0,0 +1,30 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""
+benchmarks
+----------
+
+Micro-benchmarks for the CPU bound parts of shade. These are not unit tests
+and are not collected by the test runner. Run one with, for instance::
+
+    tox -e benchmarks -- shade.tests.benchmarks.meta
+"""
+
+import timeit
+
+
+def report(name, func, number=10, repeat=3):
+    """Time func and print the best per-call time in milliseconds."""
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    print('{name:<50} {ms:>10.3f} ms'.format(name=name, ms=best * 1000))
+    return best
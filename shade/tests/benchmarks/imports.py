@@ -0,0 +1,69 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark how long ``import shade`` takes in a fresh interpreter.
+
+Uses ``python -X importtime``, so needs python 3.7 or later. Each run is in
+a new process since imports are cached after the first one. The slowest
+top level packages are listed along with any python-*client libraries that
+were imported, which should be none.
+"""
+
+import subprocess
+import sys
+
+RUNS = 5
+SHOW = 10
+CLIENTS = (
+    'cinderclient', 'designateclient', 'glanceclient', 'heatclient',
+    'ironicclient', 'keystoneclient', 'magnumclient', 'neutronclient',
+    'novaclient', 'swiftclient', 'troveclient')
+
+
+def _import_times(module):
+    """Return {module name: cumulative microseconds} for one import."""
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.STDOUT, universal_newlines=True)
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    if sys.version_info < (3, 7):
+        print('python -X importtime needs python 3.7 or later')
+        return
+    runs = [_import_times('shade') for run in range(RUNS)]
+    best = min(runs, key=lambda times: times['shade'])
+
+    print('import shade, best of {runs} runs'.format(runs=RUNS))
+    print('{name:<50} {ms:>10.3f} ms'.format(
+        name='shade', ms=best['shade'] / 1000.0))
+    top_level = dict(
+        (name, cumulative) for name, cumulative in best.items()
+        if '.' not in name and name != 'shade')
+    for name in sorted(top_level, key=top_level.get, reverse=True)[:SHOW]:
+        print('  {name:<48} {ms:>10.3f} ms'.format(
+            name=name, ms=top_level[name] / 1000.0))
+
+    clients = [name for name in CLIENTS if name in best]
+    print('client libraries imported: {clients}'.format(
+        clients=', '.join(clients) or 'none'))
+
+
+if __name__ == '__main__':
+    main()
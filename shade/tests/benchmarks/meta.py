@@ -0,0 +1,77 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark meta.obj_list_to_dict on client objects and on plain dicts."""
+
+from cinderclient.v3 import volumes
+import munch
+
+from shade import meta
+from shade.tests import benchmarks
+
+COUNT = 1000
+
+
+def _make_volume_info(index):
+    return {
+        'id': 'volume-{index}'.format(index=index),
+        'name': 'Volume {index}'.format(index=index),
+        'status': 'available',
+        'size': index % 100,
+        'availability_zone': 'nova',
+        'bootable': 'false',
+        'encrypted': False,
+        'multiattach': False,
+        'attachments': [],
+        'metadata': {'index': str(index)},
+        'created_at': '2016-10-15T15:49:29Z',
+        'os-vol-tenant-attr:tenant_id': 'db92b20496ae4fbda850a689ea9d563f',
+    }
+
+
+def _dir_obj_to_dict(obj):
+    # The attribute scanning obj_to_dict did before it cached a per-class
+    # plan, kept here as the reference point.
+    instance = munch.Munch()
+    for key in dir(obj):
+        try:
+            value = getattr(obj, key)
+        except AttributeError:
+            continue
+        if isinstance(value, meta.NON_CALLABLES) and not key.startswith('_'):
+            instance[key] = value
+    return meta._log_request_id(instance, None)
+
+
+def main():
+    infos = [_make_volume_info(index) for index in range(COUNT)]
+    objects = [
+        volumes.Volume(manager=None, info=info, loaded=True)
+        for info in infos]
+
+    assert ([_dir_obj_to_dict(obj) for obj in objects]
+            == meta.obj_list_to_dict(objects))
+
+    print('Converting {count} volumes'.format(count=COUNT))
+    benchmarks.report(
+        'client objects, dir() scan',
+        lambda: [_dir_obj_to_dict(obj) for obj in objects])
+    benchmarks.report(
+        'client objects, obj_list_to_dict',
+        lambda: meta.obj_list_to_dict(objects))
+    benchmarks.report(
+        'plain dicts, obj_list_to_dict',
+        lambda: meta.obj_list_to_dict(infos))
+
+
+if __name__ == '__main__':
+    main()
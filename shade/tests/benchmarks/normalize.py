@@ -0,0 +1,69 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark normalizing a large server list in process and in workers.
+
+Sending the records to the workers and the results back costs about half of
+what normalizing them does, so the workers only pay off with several idle
+cores.
+"""
+
+import multiprocessing
+
+import mock
+import munch
+import os_client_config
+from os_client_config import cloud_config
+
+import shade
+from shade.tests import benchmarks
+from shade.tests.benchmarks import raw
+
+COUNT = 20000
+WORKERS = 4
+
+
+def main():
+    servers = [
+        munch.Munch.fromDict(raw._make_server(index))
+        for index in range(COUNT)]
+    config = os_client_config.OpenStackConfig(
+        config_files=[], vendor_files=[]).get_one_cloud(
+            auth=dict(
+                auth_url='https://identity.example.com',
+                username='admin', password='secret', project_name='admin'),
+            region_name='RegionOne')
+    project_id = mock.patch.object(
+        shade.OpenStackCloud, 'current_project_id',
+        new_callable=mock.PropertyMock,
+        return_value='db92b20496ae4fbda850a689ea9d563f')
+    with mock.patch.object(cloud_config.CloudConfig, 'get_session'), \
+            project_id:
+        cloud = shade.OpenStackCloud(
+            cloud_config=config, normalize_workers=WORKERS)
+        # Start the workers outside of the timed runs
+        cloud._normalize_list('_normalize_servers', servers)
+
+        print('Normalizing {count} servers on {cpus} CPUs'.format(
+            count=COUNT, cpus=multiprocessing.cpu_count()))
+        benchmarks.report(
+            'in process', lambda: cloud._normalize_servers(servers),
+            number=1)
+        benchmarks.report(
+            '{workers} worker processes'.format(workers=WORKERS),
+            lambda: cloud._normalize_list('_normalize_servers', servers),
+            number=1)
+        cloud._normalize_executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
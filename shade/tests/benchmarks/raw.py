@@ -0,0 +1,165 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the client side cost of listing with and without raw.
+
+Servers, ports and images are measured, as those are the listings that
+take raw. Only the in-process work is measured: decoding has already
+happened, the interface lookups that a normal list_servers also does are
+not counted, and no requests are sent.
+"""
+
+import json
+
+import mock
+import os_client_config
+from os_client_config import cloud_config
+
+import shade
+from shade import _adapter
+from shade.tests import benchmarks
+
+COUNT = 1000
+
+
+def _make_server(index):
+    return {
+        'id': 'server-{index}'.format(index=index),
+        'name': 'server{index}'.format(index=index),
+        'status': 'ACTIVE',
+        'tenant_id': 'db92b20496ae4fbda850a689ea9d563f',
+        'user_id': 'e9b21dc437d149858faee0898fb08e92',
+        'hostId': 'c3fc1d2e1bc4c3b8fc5e1e2b0d0e4f1c',
+        'created': '2016-10-15T15:49:29Z',
+        'updated': '2016-10-15T15:49:35Z',
+        'accessIPv4': '',
+        'accessIPv6': '',
+        'addresses': {
+            'private': [{
+                'OS-EXT-IPS:type': 'fixed',
+                'addr': '10.0.0.{index}'.format(index=index % 250),
+                'version': 4,
+            }],
+        },
+        'flavor': {'id': '1'},
+        'image': {'id': 'cirros'},
+        'key_name': None,
+        'metadata': {'group': 'web'},
+        'security_groups': [{'name': 'default'}],
+        'OS-EXT-AZ:availability_zone': 'nova',
+        'OS-EXT-STS:power_state': 1,
+        'OS-EXT-STS:task_state': None,
+        'OS-EXT-STS:vm_state': 'active',
+        'os-extended-volumes:volumes_attached': [],
+        'links': [],
+    }
+
+
+def _make_port(index):
+    return {
+        'id': 'port-{index}'.format(index=index),
+        'name': 'port{index}'.format(index=index),
+        'status': 'ACTIVE',
+        'admin_state_up': True,
+        'network_id': '70c1db1f-b701-45bd-96e0-a313ee3430b3',
+        'tenant_id': 'db92b20496ae4fbda850a689ea9d563f',
+        'device_owner': 'compute:nova',
+        'device_id': 'server-{index}'.format(index=index),
+        'mac_address': 'fa:16:3e:00:{high:02x}:{low:02x}'.format(
+            high=index // 256 % 256, low=index % 256),
+        'fixed_ips': [{
+            'subnet_id': '008ba151-0b8c-4a67-98b5-0d2b87666062',
+            'ip_address': '10.0.0.{index}'.format(index=index % 250),
+        }],
+        'allowed_address_pairs': [],
+        'extra_dhcp_opts': [],
+        'security_groups': ['f0ac4394-7e4a-4409-9701-ba8be283dbc3'],
+        'binding:host_id': 'compute-{index}'.format(index=index % 20),
+        'binding:vif_type': 'ovs',
+        'binding:vnic_type': 'normal',
+        'port_security_enabled': True,
+        'created_at': '2016-10-15T15:49:29Z',
+        'updated_at': '2016-10-15T15:49:35Z',
+    }
+
+
+def _make_image(index):
+    return {
+        'id': 'image-{index}'.format(index=index),
+        'name': 'image{index}'.format(index=index),
+        'status': 'active',
+        'visibility': 'private',
+        'owner': 'db92b20496ae4fbda850a689ea9d563f',
+        'checksum': 'ee1eca47dc88f4879d8a229cc70a07c6',
+        'container_format': 'bare',
+        'disk_format': 'qcow2',
+        'min_disk': 0,
+        'min_ram': 0,
+        'size': 13287936,
+        'virtual_size': None,
+        'protected': False,
+        'tags': [],
+        'created_at': '2016-10-15T15:49:29Z',
+        'updated_at': '2016-10-15T15:49:35Z',
+        'file': '/v2/images/image-{index}/file'.format(index=index),
+        'schema': '/v2/schemas/image',
+        'self': '/v2/images/image-{index}'.format(index=index),
+        'owner_specified.shade.md5': 'ee1eca47dc88f4879d8a229cc70a07c6',
+    }
+
+
+def _make_response(body):
+    response = mock.Mock(
+        status_code=200, content=b'-',
+        headers={'Content-Type': 'application/json'})
+    response.json.side_effect = lambda: json.loads(body)
+    return response
+
+
+def _compare(cloud, adapter, key, make_item, normalize):
+    body = json.dumps({key: [make_item(index) for index in range(COUNT)]})
+
+    def normalized():
+        items = adapter._munch_response(
+            _make_response(body), result_key=key)
+        return normalize(items)
+
+    def raw():
+        return adapter._munch_response(_make_response(body), raw=True)[key]
+
+    print('Listing {count} {key}'.format(count=COUNT, key=key))
+    benchmarks.report('json decode only', lambda: json.loads(body))
+    benchmarks.report('munch and normalize', normalized)
+    benchmarks.report('raw', raw)
+
+
+def main():
+    config = os_client_config.OpenStackConfig(
+        config_files=[], vendor_files=[]).get_one_cloud(
+            auth=dict(
+                auth_url='https://identity.example.com',
+                username='admin', password='secret', project_name='admin'),
+            region_name='RegionOne')
+    # No requests are sent, so the session is never used for real
+    with mock.patch.object(cloud_config.CloudConfig, 'get_session'):
+        cloud = shade.OpenStackCloud(cloud_config=config)
+        adapter = _adapter.ShadeAdapter(
+            shade_logger=None, manager=None, session=mock.Mock())
+        _compare(
+            cloud, adapter, 'servers', _make_server, cloud._normalize_servers)
+        _compare(cloud, adapter, 'ports', _make_port, cloud._normalize_ports)
+        _compare(
+            cloud, adapter, 'images', _make_image, cloud._normalize_images)
+
+
+if __name__ == '__main__':
+    main()
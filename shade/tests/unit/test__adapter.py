@@ -10,6 +10,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
+import mock
+import requests
+from six.moves import BaseHTTPServer
 from testscenarios import load_tests_apply_scenarios as load_tests  # noqa
 
 from shade import _adapter
@@ -36,3 +41,79 @@ class TestExtractName(base.TestCase):
 
         results = _adapter.extract_name(self.url)
         self.assertEqual(self.parts, results)
+
+
+class TestMunchResponse(base.TestCase):
+
+    def setUp(self):
+        super(TestMunchResponse, self).setUp()
+        self.adapter = _adapter.ShadeAdapter(
+            shade_logger=None, manager=None, session=mock.Mock())
+        self.response = mock.Mock(
+            status_code=200, content=b'{}',
+            headers={'Content-Type': 'application/json'})
+        self.response.json.return_value = {
+            'servers': [{'id': '1'}], 'servers_links': []}
+
+    def test_munch_response(self):
+        result = self.adapter._munch_response(
+            self.response, result_key='servers')
+        self.assertEqual([{'id': '1'}], result)
+        self.assertEqual('1', result[0].id)
+
+    def test_munch_response_raw(self):
+        result = self.adapter._munch_response(self.response, raw=True)
+        self.assertEqual({'servers': [{'id': '1'}], 'servers_links': []},
+                         result)
+        self.assertIs(dict, type(result['servers'][0]))
+
+    def test_stream_response_not_read(self):
+        self.adapter.service_type = 'object-store'
+        self.adapter.manager = mock.Mock()
+        self.adapter.manager.submit_task.return_value = self.response
+
+        result = self.adapter.request('/objects', 'GET', stream=True)
+
+        self.assertIs(self.response, result)
+        self.assertFalse(self.response.json.called)
+
+
+class _KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledHTTPAdapter(base.TestCase):
+
+    def test_get_pool_stats(self):
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        adapter = _adapter.PooledHTTPAdapter(pool_maxsize=2)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        self.assertEqual({}, adapter.get_pool_stats())
+
+        url = 'http://127.0.0.1:{port}/'.format(port=server.server_port)
+        for i in range(3):
+            session.get(url).raise_for_status()
+
+        stats = adapter.get_pool_stats()
+        host = '127.0.0.1:{port}'.format(port=server.server_port)
+        self.assertEqual([host], list(stats))
+        self.assertEqual(3, stats[host]['requests'])
+        self.assertEqual(1, stats[host]['connections'])
+        self.assertEqual(2, stats[host]['reused'])
+        self.assertGreaterEqual(stats[host]['wait_time'], 0.0)
@@ -0,0 +1,104 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import itertools
+import os
+
+import fixtures
+import mock
+
+import shade
+from shade import _hash_cache
+from shade import _utils
+from shade.tests.unit import base
+
+
+class TestFileHashCache(base.TestCase):
+
+    def setUp(self):
+        super(TestFileHashCache, self).setUp()
+        self.tempdir = self.useFixture(fixtures.TempDir()).path
+        self.db_path = os.path.join(self.tempdir, 'hashes.db')
+        self.filename = self._make_file('image.qcow2', b'content')
+        self.hash_func = mock.Mock(side_effect=_utils.hash_file)
+
+    def _make_file(self, name, content):
+        filename = os.path.join(self.tempdir, name)
+        with open(filename, 'wb') as new_file:
+            new_file.write(content)
+        return filename
+
+    def test_shared_between_instances(self):
+        expected = _utils.hash_file(self.filename)
+        cache = _hash_cache.FileHashCache(self.db_path)
+        self.assertEqual(
+            expected, cache.get_file_hashes(self.filename, self.hash_func))
+
+        # As a new process would
+        cache = _hash_cache.FileHashCache(self.db_path)
+        self.assertEqual(
+            expected, cache.get_file_hashes(self.filename, self.hash_func))
+        self.hash_func.assert_called_once_with(self.filename)
+
+    def test_changed_file_hashed_again(self):
+        cache = _hash_cache.FileHashCache(self.db_path)
+        cache.get_file_hashes(self.filename, self.hash_func)
+        with open(self.filename, 'ab') as changed_file:
+            changed_file.write(b' and more')
+
+        self.assertEqual(
+            _utils.hash_file(self.filename),
+            cache.get_file_hashes(self.filename, self.hash_func))
+        self.assertEqual(2, self.hash_func.call_count)
+
+    def test_file_changed_while_hashing_not_kept(self):
+        cache = _hash_cache.FileHashCache(self.db_path)
+
+        def hash_and_change(filename):
+            hashes = _utils.hash_file(filename)
+            with open(filename, 'ab') as changed_file:
+                changed_file.write(b' and more')
+            return hashes
+
+        cache.get_file_hashes(self.filename, hash_and_change)
+        self.assertIsNone(cache.get(os.stat(self.filename)))
+
+    def test_max_entries(self):
+        cache = _hash_cache.FileHashCache(self.db_path, max_entries=2)
+        filenames = [
+            self._make_file(str(index), str(index).encode('ascii'))
+            for index in range(3)]
+        with mock.patch('time.time', side_effect=itertools.count()):
+            for filename in filenames:
+                cache.set(os.stat(filename), 'md5', 'sha256')
+
+        self.assertIsNone(cache.get(os.stat(filenames[0])))
+        self.assertEqual(('md5', 'sha256'), cache.get(os.stat(filenames[1])))
+        self.assertEqual(('md5', 'sha256'), cache.get(os.stat(filenames[2])))
+
+    def test_unusable_database(self):
+        cache = _hash_cache.FileHashCache(self.tempdir)
+        self.assertEqual(
+            _utils.hash_file(self.filename),
+            cache.get_file_hashes(self.filename, self.hash_func))
+
+    def test_cloud_uses_cache(self):
+        for attempt in range(2):
+            cloud = shade.OpenStackCloud(
+                cloud_config=self.cloud.cloud_config,
+                hash_cache_path=self.db_path)
+            with mock.patch.object(
+                    cloud, '_hash_file', self.hash_func):
+                self.assertEqual(
+                    _utils.hash_file(self.filename),
+                    cloud._get_file_hashes(self.filename))
+        self.hash_func.assert_called_once_with(self.filename)
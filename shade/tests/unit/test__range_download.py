@@ -0,0 +1,107 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import os
+import re
+
+import fixtures
+import mock
+import six
+
+from shade import _range_download
+from shade import exc
+from shade.tests.unit import base
+
+
+class TestRangeDownload(base.TestCase):
+
+    def setUp(self):
+        super(TestRangeDownload, self).setUp()
+        self.path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'image')
+        self.body = b''.join(
+            six.int2byte(index % 251) for index in range(1000))
+        self.md5 = hashlib.md5(self.body).hexdigest()
+        self.ranges = []
+        self.get = mock.Mock(side_effect=self._get)
+
+    def _get(self, headers):
+        body = self.body
+        status_code = 200
+        if 'Range' in headers:
+            self.ranges.append(headers['Range'])
+            (start, end) = re.match(
+                r'bytes=(\d+)-(\d+)$', headers['Range']).groups()
+            body = body[int(start):int(end) + 1]
+            status_code = 206
+
+        def iter_content(chunk_size, decode_unicode=False):
+            for offset in range(0, len(body), chunk_size):
+                yield body[offset:offset + chunk_size]
+        return mock.Mock(status_code=status_code, iter_content=iter_content)
+
+    def _read(self):
+        with open(self.path, 'rb') as downloaded:
+            return downloaded.read()
+
+    def test_download(self):
+        downloader = _range_download.RangeDownloader(
+            self.get, concurrency=3, range_size=300, chunk_size=7)
+
+        self.assertEqual(
+            self.md5, downloader.download(self.path, len(self.body)))
+        self.assertEqual(self.body, self._read())
+        self.assertEqual(
+            ['bytes=0-299', 'bytes=300-599', 'bytes=600-899',
+             'bytes=900-999'],
+            sorted(self.ranges))
+
+    def test_ranges_not_supported(self):
+        self.get.side_effect = lambda headers: self._get({})
+        downloader = _range_download.RangeDownloader(
+            self.get, range_size=300)
+
+        self.assertRaises(
+            _range_download.RangesNotSupported,
+            downloader.download, self.path, len(self.body))
+
+    def test_short_range(self):
+        self.body = self.body[:900]
+        downloader = _range_download.RangeDownloader(
+            self.get, range_size=300)
+
+        self.assertRaises(
+            exc.OpenStackCloudException,
+            downloader.download, self.path, 1000)
+
+    def test_cloud_download_falls_back(self):
+        self.useFixture(fixtures.MockPatchObject(
+            _range_download, 'DEFAULT_RANGE_SIZE', 300))
+        self.get.side_effect = lambda headers: self._get({})
+
+        self.cloud._download(
+            self.get, len(self.body), self.md5, 64, output_path=self.path)
+
+        self.assertEqual(self.body, self._read())
+        # The first ranged request showed ranges are not supported
+        self.get.assert_called_with({})
+
+    def test_cloud_download_checksum_mismatch(self):
+        output_file = six.BytesIO()
+
+        self.assertRaises(
+            exc.OpenStackCloudException,
+            self.cloud._download, self.get, len(self.body),
+            hashlib.md5(b'something else').hexdigest(), 64,
+            output_file=output_file)
+        self.assertEqual(self.body, output_file.getvalue())
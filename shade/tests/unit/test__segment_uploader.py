@@ -0,0 +1,185 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import os
+import threading
+import time
+
+import fixtures
+import keystoneauth1.exceptions
+import mock
+import six
+
+from shade import _segment_uploader
+from shade import _utils
+from shade import exc
+from shade.tests.unit import base
+
+
+class TestSegmentUploader(base.TestCase):
+
+    def setUp(self):
+        super(TestSegmentUploader, self).setUp()
+        tempdir = self.useFixture(fixtures.TempDir()).path
+        self.filename = os.path.join(tempdir, 'object')
+        with open(self.filename, 'wb') as object_file:
+            object_file.write(b'0123456789')
+        self.segments = [
+            ('container/object/{index:0>6}'.format(index=index),
+             _utils.FileSegment(self.filename, offset, min(4, 10 - offset)))
+            for (index, offset) in enumerate(range(0, 10, 4))]
+        self.sleep = self.useFixture(fixtures.MockPatchObject(
+            time, 'sleep')).mock
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+
+    def _put(self, name, segment):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            # Let the other threads catch up
+            time.sleep(0)
+            return mock.Mock(headers={'Etag': segment.read().decode('ascii')})
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def _http_error(self, status_code):
+        return exc.OpenStackCloudHTTPError(
+            'error', response=mock.Mock(status_code=status_code))
+
+    def test_etags_in_order(self):
+        done = mock.Mock()
+        uploader = _segment_uploader.SegmentUploader(self._put)
+
+        self.assertEqual(
+            ['0123', '4567', '89'], uploader.upload(self.segments, done=done))
+        self.assertEqual(
+            sorted(name for (name, segment) in self.segments),
+            sorted(done_call[0][0] for done_call in done.call_args_list))
+
+    def test_concurrency(self):
+        # Hold the segments until they are all going
+        barrier = threading.Semaphore(0)
+        put = self._put
+
+        def blocking_put(name, segment):
+            barrier.acquire()
+            return put(name, segment)
+
+        uploader = _segment_uploader.SegmentUploader(
+            blocking_put, concurrency=2)
+        thread = threading.Thread(
+            target=uploader.upload, args=(self.segments,))
+        thread.start()
+        for segment in self.segments:
+            barrier.release()
+        thread.join()
+
+        self.assertLessEqual(self.most_running, 2)
+        # No segment is left holding its file open
+        for (name, segment) in self.segments:
+            self.assertIsNone(segment._file)
+
+    def test_retry_with_backoff(self):
+        put = mock.Mock(side_effect=[
+            keystoneauth1.exceptions.ConnectFailure(),
+            self._http_error(503),
+            mock.Mock(headers={'Etag': 'etag'}),
+        ])
+        uploader = _segment_uploader.SegmentUploader(
+            put, attempts=3, backoff=2)
+
+        self.assertEqual(['etag'], uploader.upload(self.segments[:1]))
+        self.assertEqual(
+            [mock.call(2), mock.call(4)], self.sleep.call_args_list)
+
+    def test_retries_run_out(self):
+        put = mock.Mock(side_effect=self._http_error(500))
+        uploader = _segment_uploader.SegmentUploader(put, attempts=3)
+
+        self.assertRaises(
+            exc.OpenStackCloudHTTPError, uploader.upload, self.segments[:1])
+        self.assertEqual(3, put.call_count)
+
+    def test_client_error_not_retried(self):
+        put = mock.Mock(side_effect=self._http_error(401))
+        uploader = _segment_uploader.SegmentUploader(put, attempts=3)
+
+        self.assertRaises(
+            exc.OpenStackCloudHTTPError, uploader.upload, self.segments[:1])
+        self.assertEqual(1, put.call_count)
+        self.assertFalse(self.sleep.called)
+
+    def test_segments_taken_as_there_is_room(self):
+        taken = []
+
+        def segments():
+            for (name, segment) in self.segments:
+                # Never more than two out at once
+                self.assertLessEqual(len(taken) - len(done.call_args_list), 2)
+                taken.append(name)
+                yield (name, segment)
+
+        done = mock.Mock()
+        uploader = _segment_uploader.SegmentUploader(
+            self._put, concurrency=2)
+
+        self.assertEqual(
+            ['0123', '4567', '89'], uploader.upload(segments(), done=done))
+        self.assertEqual(3, len(taken))
+
+
+class TestStreamSegments(base.TestCase):
+
+    def _segments(self, data, segment_size=4, chunk_size=3):
+        stream = _segment_uploader.StreamSegments(
+            data, segment_size, chunk_size=chunk_size)
+        return (list(stream), stream)
+
+    def test_bytes(self):
+        (segments, stream) = self._segments(b'0123456789')
+
+        self.assertEqual([b'0123', b'4567', b'89'], segments)
+        self.assertEqual(10, stream.size)
+        self.assertEqual(hashlib.md5(b'0123456789').hexdigest(), stream.md5)
+        self.assertEqual(
+            hashlib.sha256(b'0123456789').hexdigest(), stream.sha256)
+
+    def test_file(self):
+        (segments, stream) = self._segments(six.BytesIO(b'01234567'))
+
+        self.assertEqual([b'0123', b'4567'], segments)
+
+    def test_iterable(self):
+        (segments, stream) = self._segments(
+            iter([b'0', b'123456', b'', b'789']))
+
+        self.assertEqual([b'0123', b'4567', b'89'], segments)
+
+    def test_empty(self):
+        (segments, stream) = self._segments(six.BytesIO())
+
+        self.assertEqual([b''], segments)
+        self.assertEqual(hashlib.md5().hexdigest(), stream.md5)
+
+    def test_buffer_segment_sent_again(self):
+        segment = _segment_uploader.BufferSegment(b'0123')
+        self.assertEqual(b'0123', segment.read())
+        segment.close()
+        segment.seek(0)
+
+        self.assertEqual(b'0123', segment.read())
+        self.assertEqual(4, segment.length)
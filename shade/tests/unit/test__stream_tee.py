@@ -0,0 +1,80 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+
+from shade import _stream_tee
+from shade import exc
+from shade.tests.unit import base
+
+
+class TestStreamTee(base.TestCase):
+
+    def setUp(self):
+        super(TestStreamTee, self).setUp()
+        self.chunks = [b'01', b'', b'2345', b'6789']
+        self.md5 = hashlib.md5(b'0123456789').hexdigest()
+        self.read = []
+
+    def _chunks(self):
+        for chunk in self.chunks:
+            self.read.append(chunk)
+            yield chunk
+
+    def test_all_consumers_fed(self):
+        tee = _stream_tee.StreamTee(
+            self._chunks(), md5=self.md5, buffer_chunks=1)
+
+        futures = tee.run([b''.join, b''.join, lambda data: len(list(data))])
+
+        self.assertEqual(
+            [b'0123456789', b'0123456789', 3],
+            [future.result() for future in futures])
+        # The stream was only read once
+        self.assertEqual(self.chunks, self.read)
+
+    def test_consumer_that_stops_reading(self):
+        def first_chunk(data):
+            return next(iter(data))
+
+        tee = _stream_tee.StreamTee(self._chunks(), buffer_chunks=1)
+        futures = tee.run([first_chunk, b''.join])
+
+        self.assertEqual(
+            [b'01', b'0123456789'], [future.result() for future in futures])
+
+    def test_checksum_mismatch(self):
+        tee = _stream_tee.StreamTee(
+            self._chunks(), md5=hashlib.md5(b'other').hexdigest())
+        results = []
+
+        def consumer(data):
+            results.append(b''.join(data))
+
+        self.assertRaises(
+            exc.OpenStackCloudException, tee.run, [consumer, consumer])
+        # Neither consumer got to the end of the stream
+        self.assertEqual([], results)
+
+    def test_stream_error(self):
+        def chunks():
+            yield b'01'
+            raise IOError('connection reset')
+
+        tee = _stream_tee.StreamTee(chunks())
+        results = []
+
+        def consumer(data):
+            results.append(b''.join(data))
+
+        self.assertRaises(IOError, tee.run, [consumer])
+        self.assertEqual([], results)
@@ -0,0 +1,79 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+
+import fixtures
+
+from shade import _upload_journal
+from shade.tests.unit import base
+
+
+class TestUploadJournal(base.TestCase):
+
+    def setUp(self):
+        super(TestUploadJournal, self).setUp()
+        self.tempdir = self.useFixture(fixtures.TempDir()).path
+        self.journal_dir = os.path.join(self.tempdir, 'journals')
+        self.filename = os.path.join(self.tempdir, 'image.qcow2')
+        with open(self.filename, 'wb') as new_file:
+            new_file.write(b'0123456789')
+
+    def _journal(self):
+        return _upload_journal.UploadJournal(
+            self.journal_dir, 'container/object', self.filename, 4)
+
+    def test_shared_between_instances(self):
+        journal = self._journal()
+        self.assertEqual({}, journal.load())
+        journal.start({'container/object/000000': 'etag0'})
+        journal.record('container/object/000001', 'etag1')
+
+        # As a new process would
+        self.assertEqual(
+            {'container/object/000000': 'etag0',
+             'container/object/000001': 'etag1'},
+            self._journal().load())
+
+    def test_unfinished_line_ignored(self):
+        journal = self._journal()
+        journal.start({'container/object/000000': 'etag0'})
+        with open(journal.path, 'a') as journal_file:
+            journal_file.write('{"name": "container/obj')
+
+        self.assertEqual(
+            {'container/object/000000': 'etag0'}, self._journal().load())
+
+    def test_changed_file_not_resumed(self):
+        self._journal().start({'container/object/000000': 'etag0'})
+        with open(self.filename, 'ab') as changed_file:
+            changed_file.write(b' and more')
+
+        self.assertEqual({}, self._journal().load())
+
+    def test_remove(self):
+        journal = self._journal()
+        journal.start({})
+        journal.remove()
+
+        self.assertFalse(os.path.exists(journal.path))
+        # Removing it twice is fine
+        journal.remove()
+
+    def test_no_directory(self):
+        journal = _upload_journal.UploadJournal(
+            None, 'container/object', self.filename, 4)
+        journal.start({'container/object/000000': 'etag0'})
+        journal.record('container/object/000001', 'etag1')
+
+        self.assertEqual({}, journal.load())
+        self.assertFalse(os.path.exists(self.journal_dir))
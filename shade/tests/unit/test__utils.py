@@ -10,10 +10,18 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+import importlib
+import os
 import random
 import string
+import sys
 import tempfile
+import threading
 
+import fixtures
+import mock
+import six
 import testtools
 
 from shade import _utils
@@ -251,6 +259,35 @@ class TestUtils(base.TestCase):
         ):
             _utils.range_filter(RANGE_DATA, "key1", "<>100")
 
+    def test_hash_file(self):
+        content = b''.join(
+            six.int2byte(index % 256) for index in range(10000))
+        with tempfile.NamedTemporaryFile(delete=False) as hashed_file:
+            hashed_file.write(content)
+        self.addCleanup(os.unlink, hashed_file.name)
+        expected = (
+            hashlib.md5(content).hexdigest(),
+            hashlib.sha256(content).hexdigest())
+
+        # One chunk, and many chunks hashed on their own threads
+        self.assertEqual(expected, _utils.hash_file(hashed_file.name))
+        self.assertEqual(
+            expected, _utils.hash_file(hashed_file.name, chunk_size=1000))
+        self.assertEqual(
+            expected, _utils.hash_file(hashed_file.name, chunk_size=999))
+
+    def test_lazy_module(self):
+        name = 'shade.tests.unit.lazy_module_not_imported'
+        module = _utils.LazyModule(name)
+        self.assertNotIn(name, sys.modules)
+        fake_module = mock.Mock(NotFound=exc.OpenStackCloudResourceNotFound)
+        self.useFixture(fixtures.MonkeyPatch(
+            'importlib.import_module', mock.Mock(return_value=fake_module)))
+
+        self.assertIs(exc.OpenStackCloudResourceNotFound, module.NotFound)
+        self.assertIs(exc.OpenStackCloudResourceNotFound, module.NotFound)
+        importlib.import_module.assert_called_once_with(name)
+
     def test_file_segment(self):
         file_size = 4200
         content = ''.join(random.SystemRandom().choice(
@@ -273,3 +310,38 @@ class TestUtils(base.TestCase):
                 name)
             segment_content += segment.read()
         self.assertEqual(content, segment_content)
+
+    def test_file_segment_read_again(self):
+        with tempfile.NamedTemporaryFile(delete=False) as segmented_file:
+            segmented_file.write(b'0123456789')
+        self.addCleanup(os.unlink, segmented_file.name)
+        segment = _utils.FileSegment(segmented_file.name, 4, 4)
+
+        self.assertEqual(b'4567', segment.read())
+        # As a retried upload would
+        segment.seek(0)
+        self.assertEqual(b'4567', segment.read())
+        self.assertEqual(hashlib.md5(b'4567').hexdigest(),
+                         _utils.segment_md5(segment, chunk_size=3))
+        self.assertEqual(b'4567', segment.read())
+
+    def test_daemon_future(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        threads = []
+
+        def call(value):
+            threads.append(threading.current_thread())
+            release.wait(5)
+            if value is None:
+                raise exc.OpenStackCloudException('no value')
+            return value
+
+        future = _utils.daemon_future(call, 'value')
+        failing = _utils.daemon_future(call, None)
+        release.set()
+
+        self.assertEqual('value', future.result(5))
+        self.assertRaises(exc.OpenStackCloudException, failing.result, 5)
+        # Neither thread would hold up the exit of the interpreter
+        self.assertTrue(all(thread.daemon for thread in threads))
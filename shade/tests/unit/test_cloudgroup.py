@@ -0,0 +1,129 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+
+import mock
+import munch
+
+from shade import cloudgroup
+from shade import exc
+from shade.tests.unit import base
+
+
+class TestCloudGroup(base.TestCase):
+
+    def setUp(self):
+        super(TestCloudGroup, self).setUp()
+        self.clouds = []
+        for name in ('one', 'two', 'three'):
+            cloud = mock.Mock(region_name='region')
+            cloud.name = name
+            cloud.current_location = munch.Munch(cloud=name)
+            self.clouds.append(cloud)
+        self.group = cloudgroup.CloudGroup(self.clouds, timeout=5)
+
+    def test_list_merged_in_cloud_order(self):
+        first_asked = threading.Event()
+
+        def list_slow(filters):
+            # Only answer once the last cloud has answered
+            first_asked.wait(5)
+            return [munch.Munch(id='a', location=dict(cloud='elsewhere'))]
+
+        def list_fast(filters):
+            first_asked.set()
+            return [munch.Munch(id='c')]
+        self.clouds[0].list_images.side_effect = list_slow
+        self.clouds[1].list_images.return_value = []
+        self.clouds[2].list_images.side_effect = list_fast
+
+        ret = self.group.list_images(filters={'name': 'foo'})
+
+        self.assertEqual(['a', 'c'], [image['id'] for image in ret])
+        # Existing locations are kept, missing ones are filled in
+        self.assertEqual('elsewhere', ret[0]['location']['cloud'])
+        self.assertEqual('three', ret[1]['location']['cloud'])
+        for cloud in self.clouds:
+            cloud.list_images.assert_called_once_with(filters={'name': 'foo'})
+        self.assertEqual([], ret.failures)
+
+    def test_search_partial_failure(self):
+        error = exc.OpenStackCloudException('broken')
+        self.clouds[0].search_servers.side_effect = error
+        self.clouds[1].search_servers.return_value = [munch.Munch(id='b')]
+        self.clouds[2].search_servers.return_value = []
+
+        ret = self.group.search_servers('web*')
+
+        self.assertEqual(['b'], [server['id'] for server in ret])
+        self.assertEqual([(self.clouds[0], error)], ret.failures)
+
+    def test_list_all_failed(self):
+        for cloud in self.clouds:
+            cloud.list_servers.side_effect = exc.OpenStackCloudException(
+                cloud.name)
+        e = self.assertRaises(
+            cloudgroup.CloudGroupFailure, self.group.list_servers)
+        self.assertIsInstance(e, exc.OpenStackCloudException)
+        self.assertEqual(
+            self.clouds, [cloud for (cloud, error) in e.failures])
+
+    def test_get_returns_first_hit(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def get_stuck(name_or_id):
+            release.wait(5)
+            return munch.Munch(id='late')
+        self.clouds[0].get_server.side_effect = get_stuck
+        self.clouds[1].get_server.return_value = None
+        self.clouds[2].get_server.return_value = munch.Munch(id='found')
+
+        # Doesn't wait for the stuck cloud
+        self.assertEqual('found', self.group.get_server('web1')['id'])
+
+    def test_get_not_found(self):
+        for cloud in self.clouds:
+            cloud.get_server.return_value = None
+        self.assertIsNone(self.group.get_server('web1'))
+
+    def test_get_not_found_with_failures(self):
+        error = exc.OpenStackCloudException('broken')
+        self.clouds[0].get_server.side_effect = error
+        self.clouds[1].get_server.return_value = None
+        self.clouds[2].get_server.return_value = None
+
+        # The server might have been on the cloud that failed
+        e = self.assertRaises(
+            cloudgroup.CloudGroupFailure, self.group.get_server, 'web1')
+        self.assertEqual([(self.clouds[0], error)], e.failures)
+
+    def test_timeout(self):
+        self.group.timeout = 0.1
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.clouds[0].list_servers.side_effect = (
+            lambda: release.wait(5) and [])
+        self.clouds[1].list_servers.return_value = [munch.Munch(id='b')]
+        self.clouds[2].list_servers.return_value = []
+
+        ret = self.group.list_servers()
+
+        self.assertEqual(['b'], [server['id'] for server in ret])
+        self.assertEqual(1, len(ret.failures))
+        self.assertIs(self.clouds[0], ret.failures[0][0])
+        self.assertIsInstance(ret.failures[0][1], exc.OpenStackCloudTimeout)
+
+    def test_other_methods_not_fanned_out(self):
+        self.assertRaises(AttributeError, getattr, self.group, 'delete_server')
+        self.assertRaises(AttributeError, getattr, self.group, 'name')
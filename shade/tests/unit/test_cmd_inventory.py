@@ -0,0 +1,72 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+
+import six
+import yaml
+
+from shade.cmd import inventory
+from shade.tests.unit import base
+
+
+class TestInventoryOutput(base.TestCase):
+
+    def setUp(self):
+        super(TestInventoryOutput, self).setUp()
+        self.hostvars = [
+            ('db', dict(id='2', metadata={}, volumes=['a', 'b'])),
+            ('web', dict(id='1', metadata=dict(group='web'))),
+        ]
+        self.groups = dict(web=set(['web']), cloud=set(['web', 'db']))
+        self.expected = dict(
+            _meta=dict(hostvars=dict(self.hostvars)),
+            web=['web'], cloud=['db', 'web'])
+
+    def _hostvars(self):
+        # Check the hosts are written as they come, not gathered up first
+        for host_name, host in self.hostvars:
+            yield host_name, host
+            self.assertIn(json.dumps(host_name), self.out.getvalue())
+
+    def test_write_json_inventory(self):
+        self.out = six.StringIO()
+        inventory.write_json_inventory(
+            self.out, self._hostvars(), self.groups)
+        self.assertEqual(
+            inventory.output_format_dict(self.expected, False) + '\n',
+            self.out.getvalue())
+
+    def test_write_json_inventory_compact(self):
+        self.out = six.StringIO()
+        inventory.write_json_inventory(
+            self.out, self._hostvars(), self.groups, compact=True)
+        self.assertEqual(
+            inventory.output_format_dict(self.expected, False, True),
+            self.out.getvalue())
+
+    def test_write_json_inventory_no_hosts(self):
+        out = six.StringIO()
+        inventory.write_json_inventory(out, [], {})
+        self.assertEqual({'_meta': {'hostvars': {}}}, json.loads(
+            out.getvalue()))
+
+    def test_write_yaml_inventory(self):
+        out = six.StringIO()
+        inventory.write_yaml_inventory(out, self.hostvars, self.groups)
+        self.assertEqual(self.expected, yaml.safe_load(out.getvalue()))
+
+    def test_write_yaml_inventory_no_hosts(self):
+        out = six.StringIO()
+        inventory.write_yaml_inventory(out, [], {})
+        self.assertEqual(
+            {'_meta': {'hostvars': {}}}, yaml.safe_load(out.getvalue()))
@@ -12,6 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
 import operator
 import tempfile
 import uuid
@@ -117,6 +118,10 @@ class TestImage(BaseTestImage):
         self.assert_calls()
 
     def _register_image_mocks(self):
+        # The download is checked against these
+        self.fake_image_dict['size'] = len(self.output)
+        self.fake_image_dict['checksum'] = hashlib.md5(
+            self.output).hexdigest()
         self.register_uri(
             'GET', 'https://image.example.com/v2/images',
             json=self.fake_search_return)
@@ -784,3 +789,210 @@ class TestImageVolume(BaseTestImage):
             volume={'id': volume_id}, allow_duplicates=True)
 
         self.assert_calls()
+
+
+class TestCreateImageFromStream(base.TestCase):
+
+    def setUp(self):
+        super(TestCreateImageFromStream, self).setUp()
+        for name in ('get_image', '_get_file_hashes', '_upload_image_put',
+                     '_upload_image_task'):
+            patcher = mock.patch.object(self.cloud, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.get_image.return_value = None
+
+    def test_create_image_put(self):
+        self.cloud.image_api_use_tasks = False
+        data = six.BytesIO(b'image data')
+
+        self.cloud.create_image('fake_image', data=data)
+
+        self.assertFalse(self._get_file_hashes.called)
+        self._upload_image_put.assert_called_once_with(
+            'fake_image', None, meta={}, wait=False, timeout=3600,
+            data=data, properties=mock.ANY, disk_format=mock.ANY,
+            container_format=mock.ANY)
+
+    def test_create_image_task(self):
+        self.cloud.image_api_use_tasks = True
+        data = iter([b'image ', b'data'])
+
+        self.cloud.create_image('fake_image', data=data)
+
+        self.assertEqual(
+            data, self._upload_image_task.call_args[1]['data'])
+
+    def test_create_image_filename_and_data(self):
+        self.assertRaises(
+            exc.OpenStackCloudException, self.cloud.create_image,
+            'fake_image', filename='fake_image.qcow2', data=b'image data')
+
+
+class TestImageChecksumIndex(base.TestCase):
+
+    def setUp(self):
+        super(TestImageChecksumIndex, self).setUp()
+        self.md5 = hashlib.md5(b'image data').hexdigest()
+        self.sha256 = hashlib.sha256(b'image data').hexdigest()
+        self.images = [
+            munch.Munch(
+                id='queued', status='queued', checksum=self.md5,
+                properties={}),
+            munch.Munch(
+                id='glance', status='active', checksum=self.md5,
+                disk_format='qcow2', container_format='bare',
+                properties={}),
+            munch.Munch(
+                id='shade', status='active', checksum=None,
+                disk_format='qcow2', container_format='bare',
+                owner='project-id',
+                properties={shade.openstackcloud.IMAGE_SHA256_KEY: 'abc'}),
+            munch.Munch(
+                id='multihash', status='active', checksum='123',
+                properties={
+                    'os_hash_algo': 'sha256', 'os_hash_value': 'def'}),
+            munch.Munch(
+                id='foreign', status='active', checksum=None,
+                owner='other-project-id',
+                properties={
+                    shade.openstackcloud.IMAGE_MD5_KEY: 'claimed',
+                    shade.openstackcloud.IMAGE_SHA256_KEY: 'claimed'}),
+        ]
+        patcher = mock.patch.object(
+            shade.OpenStackCloud, 'current_project_id',
+            new_callable=mock.PropertyMock, return_value='project-id')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name in ('list_images', 'get_image', '_upload_image_put',
+                     '_upload_image_task'):
+            patcher = mock.patch.object(self.cloud, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.list_images.return_value = self.images
+        self.get_image.return_value = None
+
+    def test_get_image_by_checksum(self):
+        self.assertEqual(
+            'glance', self.cloud.get_image_by_checksum(md5=self.md5)['id'])
+        self.assertEqual(
+            'shade', self.cloud.get_image_by_checksum(sha256='abc')['id'])
+        self.assertEqual(
+            'multihash',
+            self.cloud.get_image_by_checksum(md5='123', sha256='def')['id'])
+        self.assertIsNone(self.cloud.get_image_by_checksum(md5='def'))
+
+    def test_both_hashes_have_to_match(self):
+        self.assertIsNone(
+            self.cloud.get_image_by_checksum(md5='123', sha256='other'))
+        # The glance image has no known sha256 to agree with
+        self.assertIsNone(
+            self.cloud.get_image_by_checksum(md5=self.md5, sha256='other'))
+
+    def test_properties_of_other_projects_not_trusted(self):
+        self.assertIsNone(self.cloud.get_image_by_checksum(md5='claimed'))
+        self.assertIsNone(self.cloud.get_image_by_checksum(sha256='claimed'))
+
+    def test_index_built_once_per_list(self):
+        self.cloud.get_image_by_checksum(sha256='abc')
+        index = self.cloud._image_checksum_index[1]
+        self.cloud.get_image_by_checksum(sha256='def')
+
+        self.assertIs(index, self.cloud._image_checksum_index[1])
+        self.list_images.return_value = list(self.images[:1])
+        self.assertIsNone(self.cloud.get_image_by_checksum(sha256='abc'))
+
+    def test_create_image_deduplicate(self):
+        image = self.cloud.create_image(
+            'other_name', data=b'image data', md5=self.md5,
+            disk_format='qcow2', container_format='bare', deduplicate=True)
+
+        self.assertEqual('glance', image['id'])
+        self.assertFalse(self._upload_image_put.called)
+        self.assertFalse(self._upload_image_task.called)
+
+    def test_create_image_deduplicate_other_format(self):
+        self.cloud.create_image(
+            'other_name', data=b'image data', md5=self.md5,
+            disk_format='raw', container_format='bare', deduplicate=True)
+
+        self.assertTrue(
+            self._upload_image_put.called or self._upload_image_task.called)
+
+    def test_create_image_without_deduplicate(self):
+        self.cloud.create_image(
+            'other_name', data=b'image data', md5=self.md5,
+            disk_format='qcow2', container_format='bare')
+
+        self.assertFalse(self.list_images.called)
+
+
+class TestReplicateImage(base.TestCase):
+
+    def setUp(self):
+        super(TestReplicateImage, self).setUp()
+        self.body = b'image data'
+        self.image = munch.Munch(
+            id='image-id', name='fake_image', disk_format='qcow2',
+            container_format='bare', min_disk=1, min_ram=None,
+            checksum=hashlib.md5(self.body).hexdigest())
+        patcher = mock.patch.object(
+            self.cloud, 'get_image', return_value=self.image)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.image_client = mock.Mock()
+        self.image_client.get.side_effect = self._get
+        self.cloud._raw_clients['image'] = self.image_client
+        self.uploaded = {}
+
+    def _get(self, endpoint, stream):
+        body = self.body
+
+        def iter_content(chunk_size, decode_unicode=False):
+            for offset in range(0, len(body), chunk_size):
+                yield body[offset:offset + chunk_size]
+        return mock.Mock(iter_content=iter_content)
+
+    def _destination(self, name):
+        destination = mock.Mock(region_name='RegionOne')
+        destination.name = name
+
+        def create_image(image_name, data, **kwargs):
+            self.uploaded[name] = (image_name, b''.join(data), kwargs)
+            return munch.Munch(id=name)
+        destination.create_image.side_effect = create_image
+        return destination
+
+    def test_replicate_image(self):
+        destinations = [self._destination('one'), self._destination('two')]
+
+        images = self.cloud.replicate_image(
+            'fake_image', destinations, chunk_size=3, visibility='public')
+
+        self.assertEqual(['one', 'two'], [image.id for image in images])
+        self.assertEqual(
+            ('fake_image', self.body, dict(
+                wait=False, timeout=3600, disk_format='qcow2',
+                container_format='bare', min_disk=1, visibility='public',
+                md5=self.image.checksum)),
+            self.uploaded['one'])
+        self.assertEqual(self.body, self.uploaded['two'][1])
+        self.assertEqual(1, self.image_client.get.call_count)
+
+    def test_replicate_image_bad_data(self):
+        self.body = b'image dat!'
+
+        self.assertRaises(
+            exc.OpenStackCloudException, self.cloud.replicate_image,
+            'fake_image', self._destination('one'))
+        self.assertEqual({}, self.uploaded)
+
+    def test_replicate_image_one_destination_fails(self):
+        failing = self._destination('two')
+        failing.create_image.side_effect = exc.OpenStackCloudException(
+            'no quota')
+
+        self.assertRaises(
+            exc.OpenStackCloudException, self.cloud.replicate_image,
+            'fake_image', [self._destination('one'), failing], name='copy')
+        self.assertEqual(('copy', self.body), self.uploaded['one'][:2])
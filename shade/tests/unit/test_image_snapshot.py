@@ -17,6 +17,7 @@ import uuid
 import mock
 
 import shade
+from shade import _normalize
 from shade import exc
 from shade.tests.unit import base
 
@@ -54,6 +55,19 @@ class TestImageSnapshot(base.TestCase):
             'test-snapshot', dict(id='fake-server'), wait=True, timeout=2)
         self.assertEqual(image['id'], self.image_id)
 
+    @mock.patch.object(shade.OpenStackCloud, 'get_server')
+    @mock.patch.object(shade.OpenStackCloud, 'nova_client')
+    @mock.patch.object(shade.OpenStackCloud, 'get_image')
+    def test_create_image_snapshot_compact_server(
+            self, mock_get, mock_nova, mock_get_server):
+        mock_nova.servers.create_image.return_value = self.image_id
+        mock_get.return_value = {'status': 'queued', 'id': self.image_id}
+        server = _normalize.ServerResource(id='fake-server')
+        self.cloud.create_image_snapshot('test-snapshot', server)
+        mock_get_server.assert_not_called()
+        mock_nova.servers.create_image.assert_called_once_with(
+            image_name='test-snapshot', server=server, metadata={})
+
     @mock.patch.object(shade.OpenStackCloud, 'get_server')
     def test_create_image_snapshot_bad_name_exception(
             self, mock_get_server):
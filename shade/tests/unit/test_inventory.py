@@ -11,6 +11,11 @@
 # under the License.
 
 
+import os
+import threading
+import time
+
+import fixtures
 import mock
 import os_client_config
 
@@ -143,3 +148,281 @@ class TestInventory(base.TestCase):
 
         ret = inv.get_host('server_id')
         self.assertEqual(server, ret)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_list_hosts_many_clouds(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}, {}, {}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+
+        inv = inventory.OpenStackInventory()
+
+        slow_cloud_listed = threading.Event()
+
+        def list_slow(detailed):
+            # Only answer once the other clouds have been asked
+            slow_cloud_listed.wait(5)
+            return [dict(id='server_0')]
+
+        def list_fast(detailed):
+            slow_cloud_listed.set()
+            return [dict(id='server_1')]
+        inv.clouds[0].list_servers.side_effect = list_slow
+        inv.clouds[1].list_servers.side_effect = list_fast
+        inv.clouds[2].list_servers.return_value = [dict(id='server_2')]
+
+        ret = inv.list_hosts()
+
+        self.assertEqual(
+            ['server_0', 'server_1', 'server_2'],
+            [host['id'] for host in ret])
+        self.assertEqual([], inv.failures)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_list_hosts_partial_failure(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}, {}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+
+        inv = inventory.OpenStackInventory()
+
+        error = exc.OpenStackCloudException('broken')
+        inv.clouds[0].list_servers.side_effect = error
+        inv.clouds[1].list_servers.return_value = [dict(id='server_1')]
+
+        self.assertRaises(exc.OpenStackCloudException, inv.list_hosts)
+
+        ret = inv.list_hosts(fail_on_cloud_config=False)
+        self.assertEqual([dict(id='server_1')], ret)
+        self.assertEqual([(inv.clouds[0], error)], inv.failures)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_iter_hosts_timeout(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}, {}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+
+        inv = inventory.OpenStackInventory(timeout=0.1)
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def list_stuck(detailed):
+            release.wait(5)
+            return []
+        inv.clouds[0].list_servers.side_effect = list_stuck
+        inv.clouds[1].list_servers.return_value = [dict(id='server_1')]
+
+        hosts = inv.iter_hosts()
+        # The cloud that answered is not held up by the stuck one
+        self.assertEqual(dict(id='server_1'), next(hosts))
+        self.assertRaises(exc.OpenStackCloudTimeout, next, hosts)
+
+        ret = list(inv.iter_hosts(fail_on_cloud_config=False))
+        self.assertEqual([dict(id='server_1')], ret)
+        self.assertEqual(1, len(inv.failures))
+        self.assertIs(inv.clouds[0], inv.failures[0][0])
+        self.assertIsInstance(inv.failures[0][1], exc.OpenStackCloudTimeout)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_iter_hosts_timeout_not_spent_by_caller(
+            self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}, {}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+
+        inv = inventory.OpenStackInventory(timeout=0.5)
+
+        answer = threading.Event()
+        self.addCleanup(answer.set)
+
+        def list_late(detailed):
+            answer.wait(5)
+            return [dict(id='server_2')]
+        inv.clouds[0].list_servers.return_value = [dict(id='server_1')]
+        inv.clouds[1].list_servers.side_effect = list_late
+
+        hosts = inv.iter_hosts()
+        self.assertEqual(dict(id='server_1'), next(hosts))
+        # The caller takes longer than the timeout over the first host,
+        # but the other cloud answers soon after it asks again
+        time.sleep(0.6)
+        threading.Timer(0.1, answer.set).start()
+        self.assertEqual(dict(id='server_2'), next(hosts))
+        self.assertEqual([], inv.failures)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_list_hosts_cached(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+        cache_path = self.useFixture(fixtures.TempDir()).path
+
+        inv = inventory.OpenStackInventory(
+            cache_ttl=300, cache_path=cache_path)
+        server = dict(id='server_id', name='server_name')
+        inv.clouds[0].list_servers.return_value = [server]
+
+        self.assertEqual([server], inv.list_hosts())
+        self.assertEqual([server], inv.list_hosts())
+        inv.clouds[0].list_servers.assert_called_once_with(detailed=True)
+
+        # A later run uses the file written by the first one
+        inv = inventory.OpenStackInventory(
+            cache_ttl=300, cache_path=cache_path)
+        self.assertEqual([server], inv.list_hosts())
+        self.assertFalse(inv.clouds[0].list_servers.called)
+
+        inv = inventory.OpenStackInventory(
+            refresh=True, cache_ttl=300, cache_path=cache_path)
+        inv.clouds[0].list_servers.return_value = []
+        self.assertEqual([], inv.list_hosts())
+        inv.clouds[0].list_servers.assert_called_once_with(detailed=True)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_list_hosts_cache_directory_missing(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}]
+        cache_path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'not', 'there')
+
+        inv = inventory.OpenStackInventory(
+            cache_ttl=300, cache_path=cache_path)
+        server = dict(id='server_id', name='server_name')
+        inv.clouds[0].list_servers.return_value = [server]
+
+        self.assertEqual(server, inv.get_host('server_id'))
+        self.assertEqual([server], inv.list_hosts())
+        self.assertTrue(os.path.isdir(cache_path))
+        inv.clouds[0].list_servers.assert_called_once_with(detailed=True)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_list_hosts_cache_expired(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}]
+        cache_path = self.useFixture(fixtures.TempDir()).path
+
+        inv = inventory.OpenStackInventory(
+            cache_ttl=300, cache_path=cache_path)
+        inv.clouds[0].list_servers.return_value = [dict(id='server_id')]
+
+        with mock.patch('time.time', return_value=1000):
+            inv.list_hosts()
+        with mock.patch('time.time', return_value=1300):
+            inv.list_hosts()
+        self.assertEqual(2, inv.clouds[0].list_servers.call_count)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_list_hosts_cache_partial_failure(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}, {}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+        cache_path = self.useFixture(fixtures.TempDir()).path
+
+        inv = inventory.OpenStackInventory(
+            cache_ttl=300, cache_path=cache_path)
+        inv.clouds[0].list_servers.side_effect = exc.OpenStackCloudException(
+            'broken')
+        inv.clouds[1].list_servers.return_value = [dict(id='server_1')]
+
+        ret = inv.list_hosts(fail_on_cloud_config=False)
+        self.assertEqual([dict(id='server_1')], ret)
+        self.assertEqual(1, inv.clouds[1].list_servers.call_count)
+
+        # The partial listing was not kept
+        inv.list_hosts(fail_on_cloud_config=False)
+        self.assertEqual(2, inv.clouds[1].list_servers.call_count)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_get_host_cached(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}]
+        cache_path = self.useFixture(fixtures.TempDir()).path
+
+        inv = inventory.OpenStackInventory(
+            cache_ttl=300, cache_path=cache_path)
+        inv.clouds[0].list_servers.return_value = [
+            dict(id='server_1', name='server_name'),
+            dict(id='server_2', name='server_name'),
+            dict(id='server_3', name='other_name'),
+        ]
+
+        self.assertEqual(
+            dict(id='server_1', name='server_name'),
+            inv.get_host('server_1'))
+        self.assertEqual(
+            dict(id='server_3', name='other_name'),
+            inv.get_host('other_name'))
+        self.assertIsNone(inv.get_host('missing'))
+        self.assertRaises(
+            exc.OpenStackCloudException, inv.get_host, 'server_name')
+        inv.clouds[0].list_servers.assert_called_once_with(detailed=True)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_get_ansible_inventory(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}]
+
+        inv = inventory.OpenStackInventory()
+        inv.clouds[0].name = 'cloud'
+        inv.clouds[0].region_name = 'region'
+
+        def make_host(id, name, metadata):
+            return dict(
+                id=id, name=name, metadata=metadata, az='az1',
+                flavor=dict(id='1', name='small'), image=dict(id='2'),
+                location=dict(cloud='cloud', region_name='region'))
+        one = make_host('id1', 'web', {'group': 'web'})
+        two = make_host('id2', 'db', {})
+        three = make_host('id3', 'db', {})
+        inv.clouds[0].list_servers.return_value = [one, two, three]
+
+        ret = inv.get_ansible_inventory()
+
+        self.assertEqual(
+            {'web': one, 'db': two, 'id3': three}, ret['_meta']['hostvars'])
+        self.assertEqual(['db', 'id3', 'web'], ret['cloud'])
+        self.assertEqual(['db', 'id3', 'web'], ret['cloud_region_az1'])
+        self.assertEqual(['db', 'id3', 'web'], ret['flavor-small'])
+        self.assertEqual(['web'], ret['web'])
+        self.assertEqual(['web'], ret['meta-group_web'])
+        self.assertEqual(['db'], ret['instance-id2'])
+        self.assertNotIn('image-2', ret)
+
+    @mock.patch("os_client_config.config.OpenStackConfig")
+    @mock.patch("shade.OpenStackCloud")
+    def test_ansible_names_in_cloud_order(self, mock_cloud, mock_config):
+        mock_config.return_value.get_all_clouds.return_value = [{}, {}, {}]
+        mock_cloud.side_effect = lambda **kwargs: mock.Mock()
+
+        inv = inventory.OpenStackInventory(timeout=5)
+        for index, cloud in enumerate(inv.clouds):
+            cloud.name = 'cloud{index}'.format(index=index)
+            cloud.region_name = 'region'
+        last_answered = threading.Event()
+        self.addCleanup(last_answered.set)
+
+        def list_late(detailed):
+            # Only answer once a later cloud has
+            last_answered.wait(5)
+            return [dict(
+                id='id0', name='web',
+                location=dict(cloud='cloud0', region_name='region'))]
+
+        def list_early(detailed):
+            last_answered.set()
+            return [dict(
+                id='id2', name='web',
+                location=dict(cloud='cloud2', region_name='region'))]
+        inv.clouds[0].list_servers.side_effect = list_late
+        inv.clouds[1].list_servers.side_effect = exc.OpenStackCloudException(
+            'broken')
+        inv.clouds[2].list_servers.side_effect = list_early
+
+        with mock.patch.object(meta, 'get_groups_from_server') as get_groups:
+            get_groups.return_value = []
+            ret = list(inv.iter_ansible_hostvars(
+                {}, expand=False, fail_on_cloud_config=False))
+
+        # The first cloud keeps the name, though it answered last
+        self.assertEqual(['web', 'id2'], [name for (name, host) in ret])
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+
 import mock
 
 import shade
+from shade import exc
 from shade import meta
 from shade.tests import fakes
 from shade.tests.unit import base
@@ -42,6 +45,16 @@ class FakeCloud(object):
     def get_volumes(self, server):
         return []
 
+    def list_flavors(self, get_extra=True):
+        return [{'id': '101', 'name': 'test-flavor-name'}]
+
+    def list_images(self):
+        return [{'id': '471c2475-da2f-47ac-aba5-cb4aa3d546f5',
+                 'name': 'test-image-name'}]
+
+    def list_volumes(self):
+        return []
+
     def has_service(self, service_name):
         return self.service_val
 
@@ -72,6 +85,11 @@ class FakeCloud(object):
     def list_server_security_groups(self, server):
         return []
 
+    def _list_servers_security_groups(self, servers):
+        return dict(
+            (server['id'], self.list_server_security_groups(server))
+            for server in servers)
+
     def get_default_network(self):
         return None
 
@@ -988,6 +1006,119 @@ class TestMeta(base.RequestsMockTestCase):
             mock_cloud,
             meta.obj_to_dict(standard_fake_server))
 
+    def test_add_server_list_interfaces(self):
+        ports = [
+            {'id': 'port-0', 'device_id': 'test-id-0',
+             'mac_address': 'fa:16:3e:00:00:00'},
+            {'id': 'port-1', 'device_id': 'test-id-1',
+             'mac_address': 'fa:16:3e:00:00:01'},
+        ]
+        fips = [
+            {'id': 'fip-0', 'port_id': 'port-0',
+             'fixed_ip_address': '10.0.0.3',
+             'floating_ip_address': '172.24.4.3'},
+        ]
+
+        def search_ports(filters):
+            return [
+                port for port in ports
+                if port['device_id'] == filters['device_id']]
+
+        def search_floating_ips(filters):
+            return [
+                fip for fip in fips if fip['port_id'] == filters['port_id']]
+
+        mock_cloud = mock.MagicMock()
+        mock_cloud.private = False
+        mock_cloud.force_ipv4 = False
+        mock_cloud._has_floating_ips.return_value = True
+        mock_cloud.list_ports.return_value = ports
+        mock_cloud.list_floating_ips.return_value = fips
+        mock_cloud.search_ports.side_effect = search_ports
+        mock_cloud.search_floating_ips.side_effect = search_floating_ips
+        mock_cloud.get_external_ipv4_networks.return_value = []
+        mock_cloud.get_internal_ipv4_networks.return_value = []
+        servers = []
+        for index in range(2):
+            servers.append(meta.obj_to_dict(fakes.FakeServer(
+                id='test-id-{index}'.format(index=index),
+                name='test-id-{index}'.format(index=index),
+                status='ACTIVE',
+                addresses={'private': [{
+                    'OS-EXT-IPS:type': 'fixed',
+                    'addr': '10.0.0.{index}'.format(index=index + 3),
+                    'version': 4}]})))
+        with mock.patch.object(meta, '_get_interface_ip', return_value=''):
+            expected = [
+                meta.add_server_interfaces(
+                    mock_cloud, copy.deepcopy(server))
+                for server in servers]
+            retval = meta.add_server_list_interfaces(mock_cloud, servers)
+
+        self.assertEqual(expected, retval)
+        self.assertEqual(
+            '172.24.4.3', retval[0]['addresses']['private'][1]['addr'])
+        self.assertEqual(1, len(retval[1]['addresses']['private']))
+        mock_cloud.list_ports.assert_called_once_with()
+        mock_cloud.list_floating_ips.assert_called_once_with()
+
+    @mock.patch.object(shade.meta, 'get_server_external_ipv6')
+    @mock.patch.object(shade.meta, 'get_server_external_ipv4')
+    def test_get_hostvars_from_servers(
+            self, mock_get_server_external_ipv4,
+            mock_get_server_external_ipv6):
+        mock_get_server_external_ipv4.return_value = PUBLIC_V4
+        mock_get_server_external_ipv6.return_value = PUBLIC_V6
+        servers = []
+        for index, image in enumerate((
+                {'id': '471c2475-da2f-47ac-aba5-cb4aa3d546f5'},
+                '471c2475-da2f-47ac-aba5-cb4aa3d546f5')):
+            server = meta.obj_to_dict(standard_fake_server)
+            server['id'] = 'test-id-{index}'.format(index=index)
+            server['image'] = copy.deepcopy(image)
+            server['flavor'] = {'id': '101'}
+            servers.append(server)
+        expected = [
+            meta.get_hostvars_from_server(FakeCloud(), copy.deepcopy(server))
+            for server in servers]
+
+        hostvars = meta.get_hostvars_from_servers(FakeCloud(), servers)
+
+        self.assertEqual(expected, hostvars)
+        self.assertEqual('test-flavor-name', hostvars[0]['flavor']['name'])
+        self.assertEqual('test-image-name', hostvars[0]['image']['name'])
+        self.assertEqual('test-image-name', hostvars[1]['image']['name'])
+
+    @mock.patch.object(FakeCloud, 'list_volumes')
+    def test_get_hostvars_from_servers_volumes(self, mock_list_volumes):
+        volume = {
+            'id': 'volume1',
+            'attachments': [
+                {'server_id': 'test-id-0', 'device': '/dev/sda0'}]}
+        other_volume = {
+            'id': 'volume2',
+            'attachments': [{'server_id': 'other', 'device': '/dev/sdb'}]}
+        mock_list_volumes.return_value = [volume, other_volume]
+
+        server = meta.obj_to_dict(standard_fake_server)
+        hostvars = meta.get_hostvars_from_servers(FakeCloud(), [server])
+
+        mock_list_volumes.assert_called_once_with()
+        self.assertEqual([volume], hostvars[0]['volumes'])
+        self.assertEqual('/dev/sda0', hostvars[0]['volumes'][0]['device'])
+
+    @mock.patch.object(FakeCloud, 'list_flavors')
+    def test_get_hostvars_from_servers_ambiguous_flavor(
+            self, mock_list_flavors):
+        mock_list_flavors.return_value = [
+            {'id': '101', 'name': 'm1.tiny'},
+            {'id': '102', 'name': '101'}]
+        server = meta.obj_to_dict(standard_fake_server)
+        server['flavor'] = {'id': '101'}
+        self.assertRaises(
+            exc.OpenStackCloudException,
+            meta.get_hostvars_from_servers, FakeCloud(), [server])
+
     def test_obj_to_dict(self):
         cloud = FakeCloud()
         cloud.server = standard_fake_server
@@ -1008,3 +1139,43 @@ class TestMeta(base.RequestsMockTestCase):
         self.assertIn('foo', obj_dict)
         self.assertEqual(obj_dict['additional'], 1)
         self.assertEqual(obj_dict['foo'], 'bar')
+
+    def test_obj_to_dict_attribute_plan(self):
+        class FakeResource(object):
+            kind = 'fake'
+            _private = 'hidden'
+
+            def __init__(self, **kwargs):
+                for key, value in kwargs.items():
+                    setattr(self, key, value)
+
+            @property
+            def broken(self):
+                raise AttributeError('broken')
+
+            @property
+            def human_id(self):
+                return 'human-%s' % self.id
+
+            def method(self):
+                pass
+
+        first = meta.obj_to_dict(FakeResource(id='1', name='first'))
+        second = meta.obj_to_dict(FakeResource(id='2', extra=[1]))
+        self.assertIn(FakeResource, meta._attribute_plans)
+        self.assertEqual(
+            ('broken', 'human_id', 'kind'),
+            meta._attribute_plans[FakeResource])
+        self.assertEqual(
+            {'id': '1', 'name': 'first', 'kind': 'fake',
+             'human_id': 'human-1'}, first)
+        self.assertEqual(
+            {'id': '2', 'extra': [1], 'kind': 'fake',
+             'human_id': 'human-2'}, second)
+
+    def test_obj_to_dict_plain_dict(self):
+        obj = {'id': 'abc', 'x_openstack_request_ids': ['req-1']}
+        obj_dict = meta.obj_to_dict(obj)
+        self.assertEqual({'id': 'abc'}, obj_dict)
+        self.assertTrue(hasattr(obj_dict, 'id'))
+        self.assertNotIn(dict, meta._attribute_plans)
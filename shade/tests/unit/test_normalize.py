@@ -10,8 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import copy
 import mock
+import munch
+import pickle
 
+import shade
+from shade import _normalize
 from shade.tests.unit import base
 
 RAW_SERVER_DICT = {
@@ -1034,3 +1039,136 @@ class TestUtils(base.TestCase):
         }
         retval = self.strict_cloud._normalize_volume(vol)
         self.assertEqual(expected, retval)
+
+    def test_normalize_servers_compact(self):
+        compact_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config, compact=True)
+        raw_server = RAW_SERVER_DICT.copy()
+        expected = self.cloud._normalize_server(raw_server)
+        retval = compact_cloud._normalize_server(raw_server)
+        self.assertIsInstance(retval, _normalize.ServerResource)
+        self.assertEqual(expected, retval)
+        self.assertEqual(sorted(expected.keys()), sorted(retval.keys()))
+        self.assertEqual(u'mordred-irc', retval.name)
+        self.assertEqual(u'bd37', retval.hostId)
+        self.assertEqual(u'MANUAL', retval['OS-DCF:diskConfig'])
+        self.assertEqual([], retval.properties.request_ids)
+        self.assertFalse(hasattr(retval, '__dict__'))
+
+    def test_normalize_servers_compact_strict(self):
+        compact_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config, compact=True, strict=True)
+        raw_server = RAW_SERVER_DICT.copy()
+        expected = self.strict_cloud._normalize_server(raw_server)
+        retval = compact_cloud._normalize_server(raw_server)
+        self.assertEqual(expected, retval)
+        self.assertNotIn('request_ids', retval)
+        self.assertRaises(KeyError, retval.__getitem__, 'request_ids')
+
+    def test_normalize_glance_images_compact(self):
+        compact_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config, compact=True)
+        raw_image = RAW_GLANCE_IMAGE_DICT.copy()
+        expected = self.cloud._normalize_image(raw_image)
+        retval = compact_cloud._normalize_image(raw_image)
+        self.assertIsInstance(retval, _normalize.ImageResource)
+        self.assertEqual(expected, retval)
+        self.assertEqual(u'hvm', retval.vm_mode)
+
+    def test_compact_resource_mutation(self):
+        compact_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config, compact=True)
+        server = compact_cloud._normalize_server(
+            copy.deepcopy(RAW_SERVER_DICT))
+        server['public_v4'] = '192.0.2.1'
+        server.flavor['name'] = 'm1.small'
+        server.extra = 'value'
+        del server['OS-DCF:diskConfig']
+        self.assertEqual('192.0.2.1', server.public_v4)
+        self.assertEqual('m1.small', server['flavor']['name'])
+        self.assertEqual('value', server['extra'])
+        self.assertNotIn('OS-DCF:diskConfig', server)
+        self.assertIn('OS-DCF:diskConfig', server.properties)
+        plain = server.toDict()
+        self.assertIs(dict, type(plain))
+        self.assertEqual('value', plain['extra'])
+        self.assertEqual(server, pickle.loads(pickle.dumps(server)))
+
+    def test_normalize_ports_compact(self):
+        compact_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config, compact=True)
+        raw_port = {
+            'id': 'port-id',
+            'name': 'port-name',
+            'device_id': 'server-id',
+            'binding:vnic_type': 'normal',
+        }
+        self.assertEqual([raw_port], self.cloud._normalize_ports([raw_port]))
+        retval = compact_cloud._normalize_ports([raw_port])[0]
+        self.assertIsInstance(retval, _normalize.PortResource)
+        self.assertEqual(raw_port, retval)
+        self.assertEqual('server-id', retval.device_id)
+        self.assertNotIn('properties', retval)
+
+    def test_normalize_servers_shared_location(self):
+        raw_servers = [
+            copy.deepcopy(RAW_SERVER_DICT),
+            copy.deepcopy(RAW_SERVER_DICT)]
+        first, second = self.cloud._normalize_servers(raw_servers)
+        self.assertIs(first.location, second.location)
+        self.assertIs(
+            self.cloud._get_project_info(first.location.project.id),
+            first.location.project)
+
+        self.assertRaises(
+            TypeError, setattr, first.location, 'zone', 'other')
+        self.assertRaises(
+            TypeError, first.location.project.__setitem__, 'name', 'other')
+
+        location = first.location.copy()
+        location.project.name = 'other'
+        self.assertIsInstance(location.project, munch.Munch)
+        self.assertNotEqual('other', second.location.project.name)
+
+    def test_current_location_is_modifiable(self):
+        location = self.cloud.current_location
+        location.zone = 'other'
+        self.assertIsNone(self.cloud.current_location.zone)
+        location = self.cloud._get_current_location('project-id', 'az1')
+        self.assertEqual(location, pickle.loads(pickle.dumps(location)))
+
+    @mock.patch.object(
+        shade.OpenStackCloud, 'current_project_id',
+        new_callable=mock.PropertyMock, return_value='project-id')
+    def test_normalize_list_worker_processes(self, mock_project_id):
+        pool_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config,
+            normalize_workers=2, normalize_threshold=2)
+        self.addCleanup(pool_cloud._normalize_executor.shutdown)
+        raw_servers = []
+        for index in range(5):
+            raw_server = copy.deepcopy(RAW_SERVER_DICT)
+            raw_server['id'] = 'server-{index}'.format(index=index)
+            raw_servers.append(raw_server)
+
+        expected = self.cloud._normalize_servers(raw_servers)
+        retval = pool_cloud._normalize_list('_normalize_servers', raw_servers)
+        self.assertEqual(expected, retval)
+        self.assertIsNotNone(pool_cloud._normalize_pool)
+
+    def test_normalize_list_worker_processes_fallback(self):
+        pool_cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud_config,
+            normalize_workers=2, normalize_threshold=2)
+        raw_servers = [
+            copy.deepcopy(RAW_SERVER_DICT),
+            copy.deepcopy(RAW_SERVER_DICT)]
+        # The mocked current project cannot be sent to a worker process
+        with mock.patch.object(
+                pool_cloud, '_normalize_servers',
+                wraps=pool_cloud._normalize_servers) as mock_normalize:
+            retval = pool_cloud._normalize_list(
+                '_normalize_servers', raw_servers)
+        mock_normalize.assert_called_once_with(raw_servers)
+        self.assertEqual(self.cloud._normalize_servers(raw_servers), retval)
+        self.assertIsNone(pool_cloud._normalize_pool)
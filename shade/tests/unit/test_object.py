@@ -12,12 +12,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+import json
+import os
 import tempfile
 
+import fixtures
+import mock
+import six
 import testtools
 
 import shade
 import shade.openstackcloud
+from shade import _range_download
 from shade import exc
 from shade.tests.unit import base
 
@@ -323,7 +330,7 @@ class TestObject(BaseTestObject):
             'X-Object-Meta-Mtime': '1481513709.168512',
         }
         response_headers = {k.lower(): v for k, v in headers.items()}
-        text = 'test body'
+        body = b'test body'
         self.register_uri(
             'GET', self.object_endpoint,
             headers={
@@ -344,7 +351,7 @@ class TestObject(BaseTestObject):
 
         self.assert_calls()
 
-        self.assertEqual((response_headers, text), resp)
+        self.assertEqual((response_headers, body), resp)
 
     def test_get_object_not_found(self):
         self.register_uri('GET', self.object_endpoint, status_code=404)
@@ -363,6 +370,113 @@ class TestObject(BaseTestObject):
 
         self.assert_calls()
 
+    def _register_download(self, body, etag=None, ranges=True):
+        self.register_uri(
+            'HEAD', self.object_endpoint,
+            headers={
+                'Content-Length': str(len(body)),
+                'Accept-Ranges': 'bytes',
+                'Etag': '"{etag}"'.format(
+                    etag=etag or hashlib.md5(body).hexdigest()),
+            })
+
+        def get(request, context):
+            byte_range = request.headers.get('Range')
+            if not (ranges and byte_range):
+                return body
+            (start, end) = byte_range[len('bytes='):].split('-')
+            context.status_code = 206
+            return body[int(start):int(end) + 1]
+
+        self.register_uri('GET', self.object_endpoint, content=get)
+
+    def _object_requests(self, method=None):
+        return [
+            request for request in self.adapter.request_history
+            if request.url == self.object_endpoint
+            and method in (None, request.method)]
+
+    def test_get_object_to_path_in_ranges(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            'shade._range_download.DEFAULT_RANGE_SIZE', 4))
+        body = b'0123456789'
+        self._register_download(body)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'obj')
+
+        (headers, content) = self.cloud.get_object(
+            self.container, self.object, outfile=path)
+
+        self.assertIsNone(content)
+        self.assertEqual('10', headers['content-length'])
+        self.assertEqual('HEAD', self._object_requests()[0].method)
+        self.assertEqual(
+            ['bytes=0-3', 'bytes=4-7', 'bytes=8-9'],
+            sorted(request.headers['Range']
+                   for request in self._object_requests('GET')))
+        with open(path, 'rb') as outfile:
+            self.assertEqual(body, outfile.read())
+
+    def test_get_object_to_path_ranges_ignored(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            'shade._range_download.DEFAULT_RANGE_SIZE', 4))
+        body = b'0123456789'
+        self._register_download(body, ranges=False)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'obj')
+
+        self.cloud.get_object(self.container, self.object, outfile=path)
+
+        # Once the server sends the whole body for a range, it is fetched
+        # again in one request
+        requests = self._object_requests('GET')
+        self.assertTrue(
+            all('Range' in request.headers for request in requests[:-1]))
+        self.assertNotIn('Range', requests[-1].headers)
+        with open(path, 'rb') as outfile:
+            self.assertEqual(body, outfile.read())
+
+    def test_get_object_to_file(self):
+        body = b'0123456789' * (_range_download.DEFAULT_CHUNK_SIZE // 4)
+        self._register_download(body)
+        outfile = six.BytesIO()
+
+        (headers, content) = self.cloud.get_object(
+            self.container, self.object, outfile=outfile)
+
+        self.assertIsNone(content)
+        self.assertEqual(body, outfile.getvalue())
+        self.assertEqual(
+            ['HEAD', 'GET'],
+            [request.method for request in self._object_requests()])
+        self.assertNotIn('Range', self._object_requests('GET')[0].headers)
+
+    def test_get_object_to_file_md5_mismatch(self):
+        self._register_download(b'0123456789', etag=hashlib.md5(
+            b'something else').hexdigest())
+
+        self.assertRaises(
+            exc.OpenStackCloudException,
+            self.cloud.get_object,
+            self.container, self.object, outfile=six.BytesIO())
+
+    def test_stream_object(self):
+        body = b'0123456789'
+        self.register_uri('GET', self.object_endpoint, content=body)
+
+        chunks = list(self.cloud.stream_object(
+            self.container, self.object, resp_chunk_size=4))
+
+        self.assertEqual([b'0123', b'4567', b'89'], chunks)
+        self.assert_calls()
+
+    def test_stream_object_not_found(self):
+        self.register_uri('GET', self.object_endpoint, status_code=404)
+
+        self.assertRaises(
+            exc.OpenStackCloudResourceNotFound,
+            list, self.cloud.stream_object(self.container, self.object))
+
+        self.assert_calls()
+
     def test_get_object_segment_size_below_min(self):
         # Register directly becuase we make multiple calls. The number
         # of calls we make isn't interesting - what we do with the return
@@ -913,3 +1027,470 @@ class TestObjectUploads(BaseTestObject):
                 'etag': 'etag3',
             },
         ], self.adapter.request_history[-1].json())
+
+
+class TestCreateObjectHashes(base.TestCase):
+
+    def setUp(self):
+        super(TestCreateObjectHashes, self).setUp()
+        self.object_file = tempfile.NamedTemporaryFile(delete=False)
+        self.object_file.write(b'0123456789')
+        self.object_file.close()
+        self.addCleanup(os.unlink, self.object_file.name)
+        for name in ('create_container', 'get_object_metadata',
+                     '_upload_object', '_upload_segments',
+                     '_finish_large_object'):
+            patcher = mock.patch.object(self.cloud, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            self.cloud, 'get_object_segment_size', return_value=4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        (self.md5, self.sha256) = self.cloud._get_file_hashes(
+            self.object_file.name)
+
+    def test_new_large_object_hashed_during_upload(self):
+        self.get_object_metadata.return_value = {}
+        # Nothing is hashed before the segments are uploaded
+        self.cloud._file_hash_cache.clear()
+
+        def upload_segments(endpoint, filename, headers, *args, **kwargs):
+            self.assertNotIn(
+                shade.openstackcloud.OBJECT_MD5_KEY, headers)
+            return ['manifest']
+        self._upload_segments.side_effect = upload_segments
+
+        self.cloud.create_object(
+            'container', 'object', filename=self.object_file.name)
+
+        self._finish_large_object.assert_called_once_with(
+            'container/object', mock.ANY, ['manifest'], True)
+        headers = self._finish_large_object.call_args[0][1]
+        self.assertEqual(
+            self.md5, headers[shade.openstackcloud.OBJECT_MD5_KEY])
+        self.assertEqual(
+            self.sha256, headers[shade.openstackcloud.OBJECT_SHA256_KEY])
+
+    def test_existing_large_object_up_to_date(self):
+        self.get_object_metadata.return_value = {
+            shade.openstackcloud.OBJECT_MD5_KEY: self.md5,
+            shade.openstackcloud.OBJECT_SHA256_KEY: self.sha256,
+        }
+
+        self.cloud.create_object(
+            'container', 'object', filename=self.object_file.name)
+
+        self.get_object_metadata.assert_called_once_with(
+            'container', 'object')
+        self.assertFalse(self._upload_segments.called)
+        self.assertFalse(self._finish_large_object.called)
+
+
+class TestResumeLargeObject(base.TestCase):
+
+    def setUp(self):
+        super(TestResumeLargeObject, self).setUp()
+        self.tempdir = self.useFixture(fixtures.TempDir()).path
+        self.object_file = os.path.join(self.tempdir, 'object')
+        with open(self.object_file, 'wb') as object_file:
+            object_file.write(b'0123456789')
+        self.etags = [
+            hashlib.md5(content).hexdigest()
+            for content in (b'0123', b'4567', b'89')]
+        self.client = mock.Mock()
+        self.client.put.side_effect = self._put
+        self.cloud._raw_clients['object-store'] = self.client
+        self.failing = set()
+        patcher = mock.patch.object(self.cloud, '_finish_large_object')
+        self._finish_large_object = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _put(self, name, headers, data):
+        if name in self.failing:
+            raise RuntimeError('lost connection')
+        return mock.Mock(
+            status_code=201,
+            headers={'Etag': hashlib.md5(data.read()).hexdigest()})
+
+    def _upload(self, resume=True, progress=None):
+        self.client.put.reset_mock()
+        self.cloud._upload_large_object(
+            'container/object', self.object_file, {}, 10, 4, True,
+            resume=resume, progress=progress)
+        return sorted(
+            put_call[0][0] for put_call in self.client.put.call_args_list)
+
+    def _manifest(self):
+        return self._finish_large_object.call_args[0][2]
+
+    def test_resume_uploads_missing_segments(self):
+        self.client.get.side_effect = [
+            [{'name': 'object/000000', 'bytes': 4, 'hash': self.etags[0]},
+             {'name': 'object/000001', 'bytes': 4, 'hash': 'stale'}],
+            [],
+        ]
+
+        self.assertEqual(
+            ['container/object/000001', 'container/object/000002'],
+            self._upload())
+
+        self.client.get.assert_called_with(
+            'container', params={
+                'format': 'json', 'prefix': 'object/',
+                'marker': 'object/000001'})
+        self.assertEqual(
+            [{'path': '/container/object/{index:0>6}'.format(index=index),
+              'size_bytes': size, 'etag': etag}
+             for (index, (size, etag)) in enumerate(
+                 zip((4, 4, 2), self.etags))],
+            self._manifest())
+
+    def test_resume_from_journal(self):
+        self.cloud._upload_journal_dir = self.tempdir
+        self.client.get.return_value = []
+        self.failing.add('container/object/000002')
+        self.assertRaises(RuntimeError, self._upload)
+        self.assertEqual(1, self.client.get.call_count)
+
+        self.failing.clear()
+        self.assertEqual(['container/object/000002'], self._upload())
+
+        # The journal had the first two segments, so there was no listing
+        self.assertEqual(1, self.client.get.call_count)
+        self.assertEqual(
+            self.etags, [entry['etag'] for entry in self._manifest()])
+        self.assertEqual(
+            [], [name for name in os.listdir(self.tempdir)
+                 if name.endswith('.journal')])
+
+    def test_manifest_in_order_with_progress(self):
+        progress = mock.Mock()
+
+        self.assertEqual(
+            ['container/object/{index:0>6}'.format(index=index)
+             for index in range(3)],
+            self._upload(resume=False, progress=progress))
+
+        self.assertFalse(self.client.get.called)
+        self.assertEqual(
+            self.etags, [entry['etag'] for entry in self._manifest()])
+        self.assertEqual(3, progress.call_count)
+        progress.assert_called_with(10, 10)
+
+
+class TestCreateObjectFromStream(base.TestCase):
+
+    def setUp(self):
+        super(TestCreateObjectFromStream, self).setUp()
+        self.client = mock.Mock()
+        self.client.put.side_effect = self._put
+        self.cloud._raw_clients['object-store'] = self.client
+        for name in ('create_container', 'get_object_metadata'):
+            patcher = mock.patch.object(self.cloud, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.get_object_metadata.return_value = None
+        patcher = mock.patch.object(
+            self.cloud, 'get_object_segment_size',
+            side_effect=lambda segment_size: segment_size)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.uploaded = {}
+
+    def _put(self, name, headers, data=None, params=None):
+        if hasattr(data, 'read'):
+            data = data.read()
+        self.uploaded[name] = (headers, data, params)
+        if params:
+            # The manifest
+            return mock.Mock(status_code=201, headers={})
+        return mock.Mock(
+            status_code=201, headers={'Etag': hashlib.md5(data).hexdigest()})
+
+    def test_small_stream(self):
+        self.cloud.create_object(
+            'container', 'object', data=six.BytesIO(b'0123'), segment_size=4)
+
+        (headers, data, params) = self.uploaded['container/object']
+        self.assertEqual(b'0123', data)
+        self.assertEqual(
+            hashlib.md5(b'0123').hexdigest(),
+            headers[shade.openstackcloud.OBJECT_MD5_KEY])
+        self.assertEqual(['container/object'], list(self.uploaded))
+
+    def test_large_stream(self):
+        progress = mock.Mock()
+
+        self.cloud.create_object(
+            'container', 'object', data=iter([b'01234', b'56789']),
+            segment_size=4, progress=progress)
+
+        (headers, data, params) = self.uploaded['container/object']
+        self.assertEqual({'multipart-manifest': 'put'}, params)
+        self.assertEqual(
+            [{'path': '/container/object/{index:0>6}'.format(index=index),
+              'size_bytes': len(content),
+              'etag': hashlib.md5(content).hexdigest()}
+             for (index, content) in enumerate((b'0123', b'4567', b'89'))],
+            json.loads(data))
+        self.assertEqual(
+            hashlib.sha256(b'0123456789').hexdigest(),
+            headers[shade.openstackcloud.OBJECT_SHA256_KEY])
+        self.assertEqual(b'89', self.uploaded['container/object/000002'][1])
+        progress.assert_called_with(10, None)
+
+    def test_up_to_date_stream_not_read(self):
+        md5 = hashlib.md5(b'0123').hexdigest()
+        self.get_object_metadata.return_value = {
+            shade.openstackcloud.OBJECT_MD5_KEY: md5}
+        data = mock.Mock()
+
+        self.cloud.create_object('container', 'object', data=data, md5=md5)
+
+        self.assertFalse(data.read.called)
+        self.assertFalse(self.client.put.called)
+
+    def test_filename_and_data(self):
+        self.assertRaises(
+            exc.OpenStackCloudException, self.cloud.create_object,
+            'container', 'object', filename='object', data=b'0123')
+
+
+class TestDeleteObjects(base.TestCase):
+
+    def setUp(self):
+        super(TestDeleteObjects, self).setUp()
+        self.client = mock.Mock()
+        self.client.get.side_effect = self._get
+        self.client.post.side_effect = self._post
+        self.cloud._raw_clients['object-store'] = self.client
+        self.listing = [
+            {'name': 'big', 'bytes': 0, 'hash': 'etag', 'slo_etag': 'etag'},
+            {'name': 'big/000000', 'bytes': 4, 'hash': 'etag'},
+            {'name': 'dir/a', 'bytes': 1, 'hash': 'etag'},
+            {'name': 'dir/b', 'bytes': 1, 'hash': 'etag'},
+            {'name': 'small', 'bytes': 1, 'hash': 'etag'},
+        ]
+        self.bulk_deleted = []
+        patcher = mock.patch.object(
+            self.cloud, 'get_object_capabilities',
+            return_value={'bulk_delete': {'max_deletes_per_request': 2}})
+        self.get_object_capabilities = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, container, params):
+        prefix = params.get('prefix', '')
+        return [
+            obj for obj in sorted(self.listing, key=lambda obj: obj['name'])
+            if obj['name'].startswith(prefix)
+            and obj['name'] > params.get('marker', '')][:2]
+
+    def _post(self, url, params, data, raw, headers):
+        self.bulk_deleted.append(data.split('\n'))
+        return {'Number Deleted': len(data.split('\n')), 'Errors': []}
+
+    def _deleted(self):
+        return sorted(
+            (delete_call[0][0], delete_call[1]['params'])
+            for delete_call in self.client.delete.call_args_list)
+
+    def test_bulk_delete(self):
+        self.assertEqual(5, self.cloud.delete_objects('container'))
+
+        self.assertEqual(
+            [('container/big', {'multipart-manifest': 'delete'})],
+            self._deleted())
+        self.assertEqual(
+            [['/container/big/000000', '/container/dir/a'],
+             ['/container/dir/b', '/container/small']],
+            self.bulk_deleted)
+        self.client.post.assert_called_with(
+            '', params={'bulk-delete': ''}, data=mock.ANY, raw=True,
+            headers={
+                'Content-Type': 'text/plain', 'Accept': 'application/json'})
+
+    def test_delete_named_objects(self):
+        existing = {
+            'container/big': {'X-Static-Large-Object': 'True'},
+            'container/dir/a b': {},
+            # Not in the listing yet
+            'container/new': {},
+        }
+
+        def head(name):
+            if name not in existing:
+                raise exc.OpenStackCloudHTTPError(
+                    'not found', response=mock.Mock(status_code=404))
+            return mock.Mock(headers=existing[name])
+        self.client.head.side_effect = head
+
+        self.assertEqual(
+            3, self.cloud.delete_objects(
+                'container', names=['big', 'dir/a b', 'new', 'missing']))
+
+        self.assertFalse(self.client.get.called)
+        self.assertEqual(
+            [('container/big', {'multipart-manifest': 'delete'})],
+            self._deleted())
+        self.assertEqual(
+            [['/container/dir/a%20b', '/container/new']], self.bulk_deleted)
+
+    def test_bulk_delete_errors(self):
+        self.client.post.side_effect = None
+        self.client.post.return_value = {
+            'Number Deleted': 0,
+            'Errors': [['/container/dir/a', '401 Unauthorized']]}
+
+        self.assertRaises(
+            exc.OpenStackCloudException,
+            self.cloud.delete_objects, 'container', prefix='dir/')
+
+    def test_delete_one_by_one(self):
+        self.get_object_capabilities.return_value = {}
+
+        self.assertEqual(
+            2, self.cloud.delete_objects('container', prefix='dir/'))
+
+        self.assertFalse(self.client.post.called)
+        self.assertEqual(
+            [('container/dir/a', {}), ('container/dir/b', {})],
+            self._deleted())
+
+    def test_names_and_prefix(self):
+        self.assertRaises(
+            exc.OpenStackCloudException, self.cloud.delete_objects,
+            'container', names=['a'], prefix='dir/')
+
+    def test_delete_container_recursive(self):
+        self.assertTrue(
+            self.cloud.delete_container('container', recursive=True))
+
+        self.assertEqual(4, sum(len(batch) for batch in self.bulk_deleted))
+        self.client.delete.assert_called_with('container')
+
+
+class TestSyncDirectory(base.TestCase):
+
+    def setUp(self):
+        super(TestSyncDirectory, self).setUp()
+        self.local_dir = self.useFixture(fixtures.TempDir()).path
+        os.mkdir(os.path.join(self.local_dir, 'dir'))
+        self.files = {
+            'same': b'same',
+            'changed': b'new!',
+            'big': b'0123456789',
+            'new': b'new',
+            'dir/sub': b'longer now',
+        }
+        for (name, content) in self.files.items():
+            with open(os.path.join(self.local_dir, name), 'wb') as f:
+                f.write(content)
+        self.listing = [
+            self._listed('big', b'0123456789', hash='manifest-etag'),
+            self._listed('big/000000', b'01234'),
+            self._listed('changed', b'old!'),
+            self._listed('dir/sub', b'short'),
+            self._listed('gone', b'gone'),
+            self._listed('same', b'same'),
+        ]
+        self.metadata = {
+            'container/big': {
+                shade.openstackcloud.OBJECT_MD5_KEY:
+                hashlib.md5(b'0123456789').hexdigest(),
+                shade.openstackcloud.OBJECT_SHA256_KEY:
+                hashlib.sha256(b'0123456789').hexdigest()},
+            'container/changed': {
+                shade.openstackcloud.OBJECT_MD5_KEY:
+                hashlib.md5(b'old!').hexdigest()},
+        }
+        self.client = mock.Mock()
+        self.client.get.side_effect = self._get
+        self.client.head.side_effect = self._head
+        self.cloud._raw_clients['object-store'] = self.client
+        patcher = mock.patch.object(
+            self.cloud, 'get_object_capabilities',
+            return_value={'swift': {'max_file_size': 1000}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _listed(self, name, content, hash=None):
+        return {
+            'name': name, 'bytes': len(content),
+            'hash': hash or hashlib.md5(content).hexdigest()}
+
+    def _get(self, container, params):
+        if 'marker' in params:
+            return []
+        return [
+            obj for obj in self.listing
+            if obj['name'].startswith(params.get('prefix', ''))]
+
+    def _head(self, name):
+        return mock.Mock(headers=self.metadata.get(name, {}))
+
+    def test_dry_run(self):
+        report = self.cloud.sync_directory(
+            self.local_dir, 'container', delete=True, dry_run=True)
+
+        self.assertEqual(['changed', 'dir/sub', 'new'], report.upload)
+        self.assertEqual(17, report.upload_bytes)
+        self.assertEqual(['gone'], report.delete)
+        self.assertEqual(['big', 'same'], report.unchanged)
+        self.assertFalse(self.client.put.called)
+        self.assertFalse(self.client.delete.called)
+        # Only the objects the listing could not settle were looked at
+        self.assertEqual(
+            ['container/big', 'container/changed'],
+            sorted(head_call[0][0]
+                   for head_call in self.client.head.call_args_list))
+
+    def test_sync(self):
+        self.cloud.sync_directory(self.local_dir, 'container', delete=True)
+
+        self.assertEqual(
+            ['container/changed', 'container/dir/sub', 'container/new'],
+            sorted(put_call[0][0]
+                   for put_call in self.client.put.call_args_list
+                   if put_call[0][0] != 'container'))
+        put_headers = dict(
+            (put_call[0][0], put_call[1]['headers'])
+            for put_call in self.client.put.call_args_list
+            if put_call[0][0] != 'container')
+        self.assertEqual(
+            hashlib.md5(b'new').hexdigest(),
+            put_headers['container/new'][
+                shade.openstackcloud.OBJECT_MD5_KEY])
+        self.client.delete.assert_called_once_with(
+            'container/gone', params={})
+
+    def test_dynamic_large_object(self):
+        # The manifest of a dynamic large object is listed as empty
+        self.listing[0] = self._listed('big', b'')
+        self.metadata['container/big'][
+            shade.openstackcloud.OBJECT_MD5_KEY] = 'stale'
+
+        report = self.cloud.sync_directory(
+            self.local_dir, 'container', dry_run=True)
+        self.assertIn('big', report.upload)
+
+        self.metadata['container/big'][
+            shade.openstackcloud.OBJECT_MD5_KEY] = hashlib.md5(
+                b'0123456789').hexdigest()
+        report = self.cloud.sync_directory(
+            self.local_dir, 'container', dry_run=True)
+        self.assertIn('big', report.unchanged)
+
+    def test_prefix(self):
+        self.listing = []
+
+        report = self.cloud.sync_directory(
+            self.local_dir, 'container', prefix='backup')
+
+        self.assertEqual(
+            ['backup/big', 'backup/changed', 'backup/dir/sub', 'backup/new',
+             'backup/same'],
+            report.upload)
+        self.assertEqual(
+            'backup/',
+            self.client.get.call_args_list[0][1]['params']['prefix'])
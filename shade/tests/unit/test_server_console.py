@@ -15,6 +15,7 @@ import mock
 import novaclient.exceptions as nova_exceptions
 
 import shade
+from shade import _normalize
 from shade.tests.unit import base
 from shade.tests import fakes
 
@@ -30,6 +31,15 @@ class TestServerConsole(base.TestCase):
         mock_nova.servers.get_console_output.assert_called_once_with(
             server='12345', length=None)
 
+    @mock.patch.object(shade.OpenStackCloud, 'nova_client')
+    def test_get_server_console_compact(self, mock_nova):
+        server = _normalize.ServerResource(id='12345')
+        self.cloud.get_server_console(server)
+
+        mock_nova.servers.list.assert_not_called()
+        mock_nova.servers.get_console_output.assert_called_once_with(
+            server='12345', length=None)
+
     @mock.patch.object(shade.OpenStackCloud, 'has_service')
     @mock.patch.object(shade.OpenStackCloud, 'nova_client')
     def test_get_server_console_name_or_id(self, mock_nova, mock_has_service):
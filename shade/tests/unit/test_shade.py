@@ -10,6 +10,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
 import mock
 import munch
 
@@ -40,6 +42,81 @@ class TestShade(base.TestCase):
     def test_openstack_cloud(self):
         self.assertIsInstance(self.cloud, shade.OpenStackCloud)
 
+    @mock.patch.object(_utils, 'localhost_supports_ipv6')
+    def test_local_ipv6_lazy(self, mock_ipv6):
+        mock_ipv6.return_value = True
+        cloud = shade.OpenStackCloud(cloud_config=self.cloud.cloud_config)
+        self.assertFalse(mock_ipv6.called)
+        self.assertTrue(cloud._local_ipv6)
+        self.assertTrue(cloud._local_ipv6)
+        mock_ipv6.assert_called_once_with()
+
+    @mock.patch.object(_utils, 'localhost_supports_ipv6')
+    @mock.patch.object(shade.OpenStackCloud, 'has_service')
+    @mock.patch.object(shade.OpenStackCloud, 'keystone_session')
+    def test_warm_up(self, mock_session, mock_has_service, mock_ipv6):
+        self.cloud.warm_up(services=['compute', 'network'])
+        mock_session.get_token.assert_called_once_with()
+        mock_has_service.assert_has_calls(
+            [mock.call('compute'), mock.call('network')])
+        mock_ipv6.assert_called_once_with()
+
+    @mock.patch.object(shade.OpenStackCloud, 'keystone_session')
+    def test_warm_up_auth_failure(self, mock_session):
+        mock_session.get_token.side_effect = Exception('bad password')
+        self.assertRaises(exc.OpenStackCloudException, self.cloud.warm_up)
+
+    def test_warm_up_clouds(self):
+        clouds = [mock.Mock(), mock.Mock(), mock.Mock()]
+        error = exc.OpenStackCloudException('broken')
+        clouds[1].warm_up.side_effect = error
+
+        failures = shade.warm_up_clouds(clouds, services=['compute'])
+
+        self.assertEqual([(clouds[1], error)], failures)
+        for cloud in clouds:
+            cloud.warm_up.assert_called_once_with(services=['compute'])
+
+    def test_warm_up_clouds_timeout(self):
+        clouds = [mock.Mock(), mock.Mock()]
+        release = threading.Event()
+        self.addCleanup(release.set)
+        threads = []
+
+        def warm_up_stuck(services):
+            threads.append(threading.current_thread())
+            release.wait(5)
+        clouds[0].warm_up.side_effect = warm_up_stuck
+
+        failures = shade.warm_up_clouds(clouds, timeout=0.1)
+
+        self.assertEqual(1, len(failures))
+        self.assertIs(clouds[0], failures[0][0])
+        self.assertIsInstance(failures[0][1], exc.OpenStackCloudTimeout)
+        # The stuck cloud would not hold up the exit of the interpreter
+        self.assertTrue(threads[0].daemon)
+
+    def test_pool_maxsize(self):
+        # Room for the TaskManager workers on top of the requests default
+        self.assertEqual(15, self.cloud.pool_maxsize)
+        cloud = shade.OpenStackCloud(
+            cloud_config=self.cloud.cloud_config, pool_maxsize=40)
+        self.assertEqual(40, cloud.pool_maxsize)
+
+    def test_mount_http_adapter(self):
+        self.cloud.pool_block = True
+        keystone_session = mock.Mock()
+        self.assertEqual({}, self.cloud.get_connection_pool_stats())
+
+        self.cloud._mount_http_adapter(keystone_session)
+
+        adapter = self.cloud._http_adapter
+        self.assertEqual(15, adapter._pool_maxsize)
+        self.assertTrue(adapter._pool_block)
+        keystone_session.session.mount.assert_has_calls([
+            mock.call('https://', adapter), mock.call('http://', adapter)])
+        self.assertEqual({}, self.cloud.get_connection_pool_stats())
+
     @mock.patch.object(shade.OpenStackCloud, 'search_images')
     def test_get_images(self, mock_search):
         image1 = dict(id='123', name='mickey')
@@ -562,18 +639,18 @@ class TestShade(base.TestCase):
         self.assertEqual('testserver', r[0]['name'])
 
     @mock.patch.object(shade._tasks.ServerList, 'main')
-    @mock.patch('shade.meta.get_hostvars_from_server')
+    @mock.patch('shade.meta.get_hostvars_from_servers')
     def test_list_servers_detailed(self,
-                                   mock_get_hostvars_from_server,
+                                   mock_get_hostvars_from_servers,
                                    mock_serverlist):
         '''This test verifies that when list_servers is called with
-        `detailed=True` that it calls `get_hostvars_from_server` for each
-        server in the list.'''
+        `detailed=True` that it calls `get_hostvars_from_servers` once for
+        the whole list.'''
         mock_serverlist.return_value = [
             fakes.FakeServer('server1', '', 'ACTIVE'),
             fakes.FakeServer('server2', '', 'ACTIVE'),
         ]
-        mock_get_hostvars_from_server.side_effect = [
+        mock_get_hostvars_from_servers.return_value = [
             {'name': 'server1', 'id': '1'},
             {'name': 'server2', 'id': '2'},
         ]
@@ -581,10 +658,79 @@ class TestShade(base.TestCase):
         r = self.cloud.list_servers(detailed=True)
 
         self.assertEqual(2, len(r))
-        self.assertEqual(len(r), mock_get_hostvars_from_server.call_count)
+        self.assertEqual(1, mock_get_hostvars_from_servers.call_count)
         self.assertEqual('server1', r[0]['name'])
         self.assertEqual('server2', r[1]['name'])
 
+    @mock.patch.object(
+        shade._tasks.ServerListSecurityGroups, 'main', autospec=True)
+    def test__list_servers_security_groups(self, mock_list_secgroups):
+        group = {
+            'id': '1', 'name': 'default', 'description': '',
+            'tenant_id': '', 'rules': []}
+
+        def list_security_group(task, client):
+            if task.args['server'] == 'server2':
+                raise Exception('boom')
+            return [group]
+        mock_list_secgroups.side_effect = list_security_group
+
+        groups = self.cloud._list_servers_security_groups(
+            [{'id': 'server1'}, {'id': 'server2'}, {'id': 'server3'}])
+
+        self.assertEqual(3, mock_list_secgroups.call_count)
+        self.assertEqual([], groups['server2'])
+        self.assertEqual('default', groups['server1'][0]['name'])
+        self.assertEqual('default', groups['server3'][0]['name'])
+
+    @mock.patch.object(shade.OpenStackCloud, '_compute_client')
+    def test_list_servers_raw(self, mock_compute):
+        next_url = 'https://compute.example.com/servers/detail?marker=1'
+        mock_compute.get.side_effect = [
+            {'servers': [{'id': '1', 'name': 'server1'}],
+             'servers_links': [{'rel': 'next', 'href': next_url}]},
+            {'servers': [{'id': '2', 'name': 'server2'}]},
+        ]
+
+        r = self.cloud.list_servers(raw=True)
+
+        self.assertEqual(
+            [{'id': '1', 'name': 'server1'}, {'id': '2', 'name': 'server2'}],
+            r)
+        self.assertIs(dict, type(r[0]))
+        mock_compute.get.assert_has_calls([
+            mock.call('/servers/detail', params=None, raw=True),
+            mock.call(next_url, params=None, raw=True)])
+
+    @mock.patch.object(shade.OpenStackCloud, '_network_client')
+    def test_list_ports_raw(self, mock_network):
+        mock_network.get.return_value = {
+            'ports': [{'id': '1', 'device_id': 'abc'}]}
+
+        r = self.cloud.list_ports(filters={'device_id': 'abc'}, raw=True)
+
+        self.assertEqual([{'id': '1', 'device_id': 'abc'}], r)
+        mock_network.get.assert_called_once_with(
+            '/ports.json', params={'device_id': 'abc'}, raw=True)
+
+    @mock.patch.object(shade.OpenStackCloud, '_raw_image_client')
+    @mock.patch.object(shade.OpenStackCloud, '_image_client')
+    def test_list_images_raw(self, mock_image, mock_raw_image):
+        self.cloud.cloud_config.config['image_api_version'] = '2'
+        mock_image.get.return_value = {
+            'images': [{'id': '1', 'status': 'active'}],
+            'next': '/v2/images?marker=1'}
+        mock_raw_image.get.return_value = {
+            'images': [{'id': '2', 'status': 'deleted'}]}
+
+        r = self.cloud.list_images(raw=True)
+
+        self.assertEqual([{'id': '1', 'status': 'active'}], r)
+        mock_image.get.assert_called_once_with(
+            '/images', params=None, raw=True)
+        mock_raw_image.get.assert_called_once_with(
+            '/v2/images?marker=1', params=None, raw=True)
+
     def test_iterate_timeout_bad_wait(self):
         with testtools.ExpectedException(
                 exc.OpenStackCloudException,